@@ -7,10 +7,24 @@ from io import BytesIO
 import logging
 import difflib
 import json
+import contextvars
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-from resume_analyzer import analyze_resume, generate_improvement_tips, rewrite_resume_sections, extract_resume_details
+from resume_analyzer import analyze_resume, generate_improvement_tips, rewrite_resume_sections_streaming
 from resume_generator import generate_optimized_resume
-from pdf_utils import extract_text_from_document, create_document
+from section_rewriter import rewrite_resume_sections_parallel
+from resume_model import ResumeDocument
+from document_renderer import render_documents_cached, render_stats, render_cache
+from pdf_layout import pdf_template
+from session_store import session_artifacts
+from llm_cache import llm_cache
+from singleflight import llm_singleflight
+from llm_metrics import llm_metrics, start_run, summarize_run, start_metrics_server
+from rate_limiter import llm_limiter, bind, PRIORITY_INTERACTIVE
+from pdf_backends import pdf_backend_stats
+from extraction_cache import extract_document_cached, extraction_cache
+from log_config import setup_logging, Lazy, LOG_FILE
 
 # Set page config as the first Streamlit command
 st.set_page_config(
@@ -154,34 +168,40 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Set up logging
-logging.basicConfig(filename='resume_enhancer.log', level=logging.DEBUG, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+setup_logging()
+logger = logging.getLogger(__name__)
 
-# Session state initialization
-if 'resume_text' not in st.session_state:
-    st.session_state.resume_text = None
+# Expose Prometheus metrics for LLM calls when a port is configured
+if os.environ.get("METRICS_PORT"):
+    start_metrics_server(int(os.environ["METRICS_PORT"]))
+
+# "streaming" rewrites the whole resume in one streamed call, "sectioned" rewrites sections in parallel
+REWRITE_ENGINE = os.environ.get("REWRITE_ENGINE", "streaming")
+# (format, label, MIME type) for each download button
+DOWNLOAD_FORMATS = [
+    ("pdf", "PDF", "application/pdf"),
+    ("docx", "DOCX", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    ("txt", "TXT", "text/plain")
+]
+
+# Session state initialization. Large artifacts (resume text, analysis,
+# optimized resume, ...) live in the session artifact store instead.
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if 'job_role' not in st.session_state:
     st.session_state.job_role = None
-if 'analysis_results' not in st.session_state:
-    st.session_state.analysis_results = None
-if 'improvement_tips' not in st.session_state:
-    st.session_state.improvement_tips = None
-if 'rewritten_sections' not in st.session_state:
-    st.session_state.rewritten_sections = None
-if 'optimized_resume_text' not in st.session_state:
-    st.session_state.optimized_resume_text = None
-if 'optimized_resume_pdf' not in st.session_state:
-    st.session_state.optimized_resume_pdf = None
-if 'optimized_resume_docx' not in st.session_state:
-    st.session_state.optimized_resume_docx = None
+# Formats are rendered only once asked for; TXT costs nothing, so it is always offered
+if 'requested_formats' not in st.session_state:
+    st.session_state.requested_formats = {'txt'}
+if 'render_timings' not in st.session_state:
+    st.session_state.render_timings = {}
 if 'original_file_name' not in st.session_state:
     st.session_state.original_file_name = None
 if 'processing_complete' not in st.session_state:
     st.session_state.processing_complete = False
 if 'parsing_warnings' not in st.session_state:
     st.session_state.parsing_warnings = []
-if 'extracted_details' not in st.session_state:
-    st.session_state.extracted_details = None
+artifacts = session_artifacts.session(st.session_state.session_id)
 
 try:
     from sample_resume import create_sample_resume
@@ -191,32 +211,41 @@ except ImportError:
 
 st.title("Resume Enhancer")
 
+# Artifacts of idle sessions expire, and spilled ones can be evicted under disk pressure
+if st.session_state.processing_complete and not (artifacts.has('resume_text') and artifacts.has('optimized_resume_text')):
+    st.session_state.processing_complete = False
+    st.warning("The results of this session have expired. Please upload your resume again.")
+
 if st.session_state.processing_complete:
+    resume_text = artifacts.get('resume_text')
+    analysis_results = artifacts.get('analysis_results')
+    improvement_tips = artifacts.get('improvement_tips')
+    optimized_resume_text = artifacts.get('optimized_resume_text')
     tabs = st.tabs(["Original", "Analysis", "Enhanced", "Debug"])
     
     with tabs[0]:
         st.subheader("Original Resume")
-        st.text_area("", st.session_state.resume_text, height=400, disabled=True, label_visibility="collapsed")
+        st.text_area("", resume_text, height=400, disabled=True, label_visibility="collapsed")
     
     with tabs[1]:
         st.subheader("Analysis")
-        if st.session_state.analysis_results:
-            job_match = st.session_state.analysis_results.get('job_match_score', 0) * 100
+        if analysis_results:
+            job_match = analysis_results.get('job_match_score', 0) * 100
             st.markdown(f"#### Job Match Score: {job_match:.1f}%")
             st.progress(float(job_match/100))
             
             col1, col2 = st.columns(2, gap="medium")
             with col1:
                 st.markdown("### Strengths")
-                for strength in st.session_state.analysis_results.get('strengths', []):
+                for strength in analysis_results.get('strengths', []):
                     st.markdown(f"• {strength}")
             with col2:
                 st.markdown("### Areas for Improvement")
-                for weakness in st.session_state.analysis_results.get('weaknesses', []):
+                for weakness in analysis_results.get('weaknesses', []):
                     st.markdown(f"• {weakness}")
             
             st.markdown("### Weak Phrases")
-            weak_phrases = st.session_state.analysis_results.get('weak_phrases', [])
+            weak_phrases = analysis_results.get('weak_phrases', [])
             if weak_phrases:
                 for phrase in weak_phrases:
                     with st.expander(f"{phrase['phrase']}"):
@@ -226,7 +255,7 @@ if st.session_state.processing_complete:
                 st.info("No weak phrases identified.")
             
             st.markdown("### Missing Keywords")
-            missing_keywords = st.session_state.analysis_results.get('missing_keywords', [])
+            missing_keywords = analysis_results.get('missing_keywords', [])
             if missing_keywords:
                 for keyword in missing_keywords:
                     with st.expander(f"{keyword['keyword']} ({keyword['importance']})"):
@@ -236,7 +265,7 @@ if st.session_state.processing_complete:
                 st.info("No missing keywords identified.")
             
             st.markdown("### Quantification Opportunities")
-            quantification = st.session_state.analysis_results.get('quantification_opportunities', [])
+            quantification = analysis_results.get('quantification_opportunities', [])
             if quantification:
                 for opp in quantification:
                     with st.expander(f"{opp['current_text']}"):
@@ -246,8 +275,8 @@ if st.session_state.processing_complete:
                 st.info("No quantification opportunities identified.")
             
             st.markdown("### Improvement Tips")
-            if st.session_state.improvement_tips:
-                for tip in st.session_state.improvement_tips:
+            if improvement_tips:
+                for tip in improvement_tips:
                     st.markdown(f"• {tip}")
             else:
                 st.markdown("• Focus on quantifiable achievements.")
@@ -256,13 +285,13 @@ if st.session_state.processing_complete:
     
     with tabs[2]:
         st.subheader("Enhanced Resume")
-        if st.session_state.optimized_resume_text:
-            st.text_area("", st.session_state.optimized_resume_text, height=400, disabled=True, label_visibility="collapsed")
+        if optimized_resume_text:
+            st.text_area("", optimized_resume_text, height=400, disabled=True, label_visibility="collapsed")
             
             st.markdown("### Changes Made")
             diff = difflib.unified_diff(
-                st.session_state.resume_text.splitlines(),
-                st.session_state.optimized_resume_text.splitlines(),
+                resume_text.splitlines(),
+                optimized_resume_text.splitlines(),
                 lineterm='',
                 fromfile='Original Resume',
                 tofile='Enhanced Resume'
@@ -278,42 +307,37 @@ if st.session_state.processing_complete:
                 for warning in st.session_state.parsing_warnings:
                     st.markdown(f"• {warning}")
             
-            col1, col2, col3 = st.columns(3, gap="medium")
-            with col1:
-                if st.session_state.optimized_resume_pdf:
-                    original_name = st.session_state.original_file_name or "resume"
-                    base_name = os.path.splitext(original_name)[0]
-                    enhanced_filename = f"{base_name}_enhanced.pdf"
-                    st.download_button(
-                        label="Download PDF",
-                        data=st.session_state.optimized_resume_pdf,
-                        file_name=enhanced_filename,
-                        mime="application/pdf"
-                    )
-            with col2:
-                if st.session_state.optimized_resume_docx:
-                    original_name = st.session_state.original_file_name or "resume"
-                    base_name = os.path.splitext(original_name)[0]
-                    enhanced_filename = f"{base_name}_enhanced.docx"
-                    st.download_button(
-                        label="Download DOCX",
-                        data=st.session_state.optimized_resume_docx,
-                        file_name=enhanced_filename,
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-            with col3:
-                if st.session_state.optimized_resume_text:
-                    original_name = st.session_state.original_file_name or "resume"
-                    base_name = os.path.splitext(original_name)[0]
-                    enhanced_filename = f"{base_name}_enhanced.txt"
-                    st.download_button(
-                        label="Download TXT",
-                        data=st.session_state.optimized_resume_text.encode('utf-8'),
-                        file_name=enhanced_filename,
-                        mime="text/plain"
-                    )
+            original_name = st.session_state.original_file_name or "resume"
+            base_name = os.path.splitext(original_name)[0]
+            columns = st.columns(3, gap="medium")
+            for column, (output_format, label, _) in zip(columns, DOWNLOAD_FORMATS):
+                if output_format not in st.session_state.requested_formats:
+                    with column:
+                        if st.button(f"Prepare {label}", key=f"prepare_{output_format}"):
+                            st.session_state.requested_formats.add(output_format)
+            optimized_document = artifacts.get('optimized_document')
+            if optimized_document:
+                # Every requested format is rendered side by side in one pass and
+                # served from the shared render cache after the first render
+                formats = [output_format for output_format, _, _ in DOWNLOAD_FORMATS
+                           if output_format in st.session_state.requested_formats]
+                outputs, timings, cache_hits = render_documents_cached(optimized_document, formats)
+                for output_format in formats:
+                    if output_format not in cache_hits:
+                        st.session_state.render_timings[output_format] = timings[output_format]
+                for column, (output_format, label, mime) in zip(columns, DOWNLOAD_FORMATS):
+                    if output_format in outputs:
+                        with column:
+                            st.download_button(
+                                label=f"Download {label}",
+                                data=outputs[output_format],
+                                file_name=f"{base_name}_enhanced.{output_format}",
+                                mime=mime,
+                                key=f"download_{output_format}"
+                            )
             
             if st.button("Start Over"):
+                artifacts.clear()
                 for key in list(st.session_state.keys()):
                     del st.session_state[key]
                 st.rerun()
@@ -321,14 +345,56 @@ if st.session_state.processing_complete:
     with tabs[3]:
         st.subheader("Debug Info")
         st.markdown("### Extracted Details")
-        if st.session_state.extracted_details:
-            st.json(st.session_state.extracted_details)
+        extracted_details = artifacts.get('extracted_details')
+        if extracted_details:
+            st.json(extracted_details)
         else:
             st.info("No extracted details available.")
         
+        st.markdown("### LLM Calls (This Run)")
+        llm_run_summary = artifacts.get('llm_run_summary')
+        if llm_run_summary:
+            st.table(llm_run_summary)
+        else:
+            st.info("No LLM calls recorded for this run.")
+        
+        st.markdown("### LLM Latency by Stage (All Sessions)")
+        st.json(llm_metrics.stage_quantiles())
+        
+        st.markdown("### LLM Cache")
+        st.json(llm_cache.stats())
+        
+        st.markdown("### In-Flight Request Coalescing")
+        st.json(llm_singleflight.stats())
+        
+        st.markdown("### LLM Rate Limiter Queue")
+        st.json(llm_limiter.stats())
+        
+        st.markdown("### PDF Extraction Backends")
+        st.json(pdf_backend_stats.stats())
+        
+        st.markdown("### Document Extraction Cache")
+        st.json(extraction_cache.stats())
+        
+        st.markdown("### Document Rendering")
+        if st.session_state.render_timings:
+            st.table([{"format": name, "render_ms": round(seconds * 1000, 1)}
+                      for name, seconds in st.session_state.render_timings.items()])
+        st.json(render_stats.stats())
+        st.json(render_cache.stats())
+        st.json(pdf_template.stats())
+        
+        st.markdown("### Session Memory")
+        footprint = artifacts.footprint()
+        if footprint:
+            st.markdown(f"This session: {sum(row['stored_bytes'] for row in footprint) / 1024:.1f} KB stored "
+                        f"({sum(row['bytes'] for row in footprint) / 1024:.1f} KB uncompressed)")
+            st.table(footprint)
+        st.json(session_artifacts.stats())
+        
         st.markdown("### Log Entries")
         try:
-            with open('resume_enhancer.log', 'r') as log_file:
+            with open(LOG_FILE, 'r') as log_file:
                 log_content = log_file.read()
                 errors = [line for line in log_content.split('\n') if 'ERROR' in line]
                 if errors:
@@ -379,49 +445,80 @@ else:
     if process_resume:
         progress_text = "Processing resume..."
         progress_bar = st.progress(0)
+        llm_run = start_run()
+        bind(session=st.session_state.session_id, priority=PRIORITY_INTERACTIVE)
         
         progress_bar.progress(10, text=progress_text + " Extracting text...")
         try:
-            resume_text = extract_text_from_document(uploaded_file)
-            logging.debug(f"Extracted resume text:\n{resume_text}")
+            resume_text, extracted_details, extraction_cached = extract_document_cached(uploaded_file)
+            logger.debug("Extracted resume text (cached=%s):\n%s", extraction_cached, resume_text)
         except Exception as e:
             st.error(f"Failed to extract text: {str(e)}")
-            logging.error(f"Text extraction failed: {e}")
+            logger.error(f"Text extraction failed: {e}")
             st.stop()
-        st.session_state.resume_text = resume_text
+        artifacts.set('resume_text', resume_text)
         st.session_state.job_role = job_role
         
         progress_bar.progress(20, text=progress_text + " Extracting details...")
-        st.session_state.extracted_details = extract_resume_details(resume_text)
+        artifacts.set('extracted_details', extracted_details)
+        # Parsed once here and shared by analysis and rewriting
+        original_document = ResumeDocument.parse(resume_text, details=extracted_details)
         
         progress_bar.progress(30, text=progress_text + " Analyzing content...")
-        analysis_results = analyze_resume(resume_text, job_role)
-        st.session_state.analysis_results = analysis_results
-        
-        progress_bar.progress(50, text=progress_text + " Generating tips...")
-        improvement_tips = generate_improvement_tips(analysis_results, job_role)
-        st.session_state.improvement_tips = improvement_tips
+        analysis_results = analyze_resume(resume_text, job_role, document=original_document)
+        artifacts.set('analysis_results', analysis_results)
         
-        progress_bar.progress(70, text=progress_text + " Rewriting sections...")
-        rewritten_sections = rewrite_resume_sections(resume_text, analysis_results, job_role)
-        st.session_state.rewritten_sections = rewritten_sections
+        # Tips and rewrite only depend on the analysis, so run them side by side.
+        # The rewrite reports sections on the script thread so they can be shown as they arrive.
+        progress_bar.progress(50, text=progress_text + " Generating tips and rewriting sections...")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            tips_future = executor.submit(contextvars.copy_context().run, generate_improvement_tips,
+                                          analysis_results, job_role)
+            
+            st.markdown("### Enhanced Resume Preview")
+            preview = st.container()
+            streamed_sections = []
+            
+            def show_section(header, body):
+                streamed_sections.append(header)
+                preview.markdown(f"**{header.lstrip('# ')}**")
+                if body:
+                    preview.markdown(body)
+                progress_bar.progress(min(50 + 3 * len(streamed_sections), 77),
+                                      text=progress_text + f" Rewrote {header.lstrip('# ').title()}...")
+            
+            rewrite = rewrite_resume_sections_parallel if REWRITE_ENGINE == "sectioned" else rewrite_resume_sections_streaming
+            rewritten_sections = rewrite(
+                resume_text, analysis_results, job_role, on_section=show_section, document=original_document
+            )
+            progress_bar.progress(78, text=progress_text + " Sections rewritten, waiting for tips...")
+            artifacts.set('improvement_tips', tips_future.result())
+            progress_bar.progress(82, text=progress_text + " Tips ready...")
+        artifacts.set('llm_run_summary', summarize_run(llm_run))
         
         progress_bar.progress(85, text=progress_text + " Finalizing resume...")
         optimized_resume_text = rewritten_sections['full_optimized_resume']
-        st.session_state.optimized_resume_text = optimized_resume_text
+        artifacts.set('optimized_resume_text', optimized_resume_text)
         
-        progress_bar.progress(95, text=progress_text + " Creating documents...")
+        progress_bar.progress(95, text=progress_text + " Preparing documents...")
         try:
-            st.session_state.optimized_resume_pdf = create_document(optimized_resume_text, 'pdf')
-            st.session_state.optimized_resume_docx = create_document(optimized_resume_text, 'docx')
+            # Documents are rendered when a download is requested; parse the
+            # sections now so missing sections can be reported below
+            optimized_document = ResumeDocument.parse(optimized_resume_text)
+            logger.debug("Optimized resume sections: %s", Lazy(list, optimized_document.render_sections))
+            artifacts.set('optimized_document', optimized_document)
+            st.session_state.requested_formats = {'txt'}
+            st.session_state.render_timings = {}
             
-            with open('resume_enhancer.log', 'r') as log_file:
-                log_content = log_file.read()
-                warnings = [line for line in log_content.split('\n') if 'WARNING' in line and 'section not found or empty' in line]
-                st.session_state.parsing_warnings = warnings
+            # Read from the parsed sections, not the log file, which is written in the background
+            st.session_state.parsing_warnings = [
+                f"{key.capitalize()} section not found or empty in parsed resume"
+                for key, value in optimized_document.render_sections.items()
+                if isinstance(value, str) and value.startswith("[Missing ")
+            ]
         except Exception as e:
             st.error(f"Failed to create documents: {str(e)}")
-            logging.error(f"Document creation failed: {e}")
+            logger.error(f"Document creation failed: {e}")
             st.stop()
         
         progress_bar.progress(100, text="Complete!")
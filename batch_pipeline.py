@@ -0,0 +1,446 @@
+# batch_pipeline.py
+import os
+import io
+import json
+import time
+import logging
+import argparse
+
+from resume_analyzer import (
+    extract_resume_details, build_analysis_prompt, build_tips_prompt, build_rewrite_prompt,
+    default_analysis_results, default_improvement_tips, postprocess_rewrite, fallback_rewrite,
+    ANALYSIS_SYSTEM_PROMPT, TIPS_SYSTEM_PROMPT, REWRITE_SYSTEM_PROMPT
+)
+from pdf_utils import extract_text_from_document
+from bulk_renderer import BulkRenderer, BULK_RENDER_WORKERS
+from openai_client import get_openai_client, with_retries
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+BATCH_MODEL = "gpt-4o"
+
+
+def read_jsonl(path):
+    """
+    Read a JSONL file, skipping a truncated final line left by a crash.
+
+    Args:
+        path (str): Path to the JSONL file
+
+    Returns:
+        list: Parsed records (empty if the file does not exist)
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as jsonl_file:
+        for line in jsonl_file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping unreadable line in {path}")
+    return records
+
+
+def append_jsonl(path, record):
+    """Append one record to a JSONL file and flush it to disk."""
+    with open(path, 'a', encoding='utf-8') as jsonl_file:
+        jsonl_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        jsonl_file.flush()
+        os.fsync(jsonl_file.fileno())
+
+
+def write_jsonl_atomic(path, records):
+    """Write a complete JSONL file so readers never see a partial one."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as jsonl_file:
+        for record in records:
+            jsonl_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+    os.replace(tmp_path, path)
+
+
+def make_batch_request(custom_id, system_prompt, user_prompt):
+    """
+    Build one request line in the OpenAI Batch API input format.
+
+    Args:
+        custom_id (str): Identifier echoed back in the result line
+        system_prompt (str): The system message content
+        user_prompt (str): The user message content
+
+    Returns:
+        dict: Batch API request record
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": BATCH_MODEL,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "response_format": {"type": "json_object"}
+        }
+    }
+
+
+def batch_result_content(result):
+    """
+    Pull the message content out of a Batch API result line.
+
+    Args:
+        result (dict): Batch API output record
+
+    Returns:
+        str: The completion content, or None if the request failed
+    """
+    if not result or result.get("error"):
+        return None
+    response = result.get("response") or {}
+    if response.get("status_code") != 200:
+        return None
+    try:
+        return response["body"]["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def default_local_responder(request):
+    """
+    Produce a schema-valid but empty answer for a batch request. The rewrite
+    post-processing then fills every section from the extracted details, which
+    makes the whole pipeline runnable offline.
+
+    Args:
+        request (dict): Batch API request record
+
+    Returns:
+        str: JSON completion content
+    """
+    kind = request["custom_id"].split(':', 1)[0]
+    if kind == "analyze":
+        return json.dumps(default_analysis_results())
+    if kind == "tips":
+        return json.dumps(default_improvement_tips())
+    return json.dumps({"full_optimized_resume": "", "improvements_made": []})
+
+
+class LocalBatchEndpoint:
+    """
+    File-based stand-in for the OpenAI Batch API. Each request line is answered
+    by a responder callable and written to the result file in the Batch API
+    output format. Results already on disk are not recomputed.
+    """
+
+    def __init__(self, responder=default_local_responder):
+        self.responder = responder
+
+    def run(self, requests_path, results_path, state):
+        done = {record["custom_id"] for record in read_jsonl(results_path)}
+        for request in read_jsonl(requests_path):
+            if request["custom_id"] in done:
+                continue
+            try:
+                content = self.responder(request)
+                result = {
+                    "id": f"local-{request['custom_id']}",
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+                    },
+                    "error": None
+                }
+            except Exception as e:
+                logger.error(f"Local batch responder failed for {request['custom_id']}: {e}")
+                result = {
+                    "id": f"local-{request['custom_id']}",
+                    "custom_id": request["custom_id"],
+                    "response": None,
+                    "error": {"code": "local_error", "message": str(e)}
+                }
+            append_jsonl(results_path, result)
+
+
+class OpenAIBatchEndpoint:
+    """
+    Runs a request file through the OpenAI Batch API. The batch id is stored in
+    the pipeline state so an interrupted run resumes polling the same batch.
+    """
+
+    def __init__(self, client=None, poll_interval=30):
+        self.client = client or get_openai_client()
+        self.poll_interval = poll_interval
+
+    def run(self, requests_path, results_path, state):
+        state_key = f"batch_id:{os.path.basename(requests_path)}"
+        batch_id = state.get(state_key)
+        if batch_id is None:
+            with open(requests_path, 'rb') as requests_file:
+                uploaded = self.client.files.create(file=requests_file, purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=uploaded.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            batch_id = batch.id
+            state.set(state_key, batch_id)
+            logger.info(f"Submitted batch {batch_id} for {requests_path}")
+
+        while True:
+            batch = with_retries(lambda: self.client.batches.retrieve(batch_id), description="Batch status poll")
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Batch {batch_id} ended with status {batch.status}")
+            time.sleep(self.poll_interval)
+
+        # A batch whose requests all failed has only an error file
+        output = self.client.files.content(batch.output_file_id).text if batch.output_file_id else ""
+        failed = []
+        if batch.error_file_id:
+            for line in self.client.files.content(batch.error_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                record["error"] = record.get("error") or {
+                    "code": "batch_error",
+                    "message": f"status {(record.get('response') or {}).get('status_code')}"
+                }
+                failed.append(record)
+            logger.warning(f"Batch {batch_id}: {len(failed)} requests failed, their items use defaults")
+        tmp_path = f"{results_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as results_file:
+            results_file.write(output)
+            if output and not output.endswith('\n'):
+                results_file.write('\n')
+            for record in failed:
+                results_file.write(json.dumps(record) + '\n')
+        os.replace(tmp_path, results_path)
+
+
+class PipelineState:
+    """Small JSON checkpoint of which stages have finished."""
+
+    def __init__(self, path):
+        self.path = path
+        self._data = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as state_file:
+                self._data = json.load(state_file)
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def set(self, key, value):
+        self._data[key] = value
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as state_file:
+            json.dump(self._data, state_file, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def done(self, stage):
+        return self._data.get(f"stage:{stage}") == "done"
+
+    def mark_done(self, stage):
+        self.set(f"stage:{stage}", "done")
+
+
+class BatchPipeline:
+    """
+    Offline enhancement of a directory of resumes:
+
+    1. extract text and details from every resume
+    2. emit analysis requests and run them through the batch endpoint
+    3. emit tips and rewrite requests and run them through the batch endpoint
+    4. post-process the rewrites and render PDF/DOCX documents
+
+    Every stage checkpoints into work_dir, so rerunning after a crash picks up
+    where the previous run stopped.
+    """
+
+    def __init__(self, input_dir, work_dir, job_role, endpoint=None, output_formats=('pdf', 'docx')):
+        self.input_dir = input_dir
+        self.work_dir = work_dir
+        self.job_role = job_role
+        self.endpoint = endpoint or LocalBatchEndpoint()
+        self.output_formats = output_formats
+        self.output_dir = os.path.join(work_dir, "output")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.state = PipelineState(os.path.join(work_dir, "state.json"))
+
+    def _path(self, name):
+        return os.path.join(self.work_dir, name)
+
+    def run(self):
+        extracted = self.extract()
+        analyses = self.analyze(extracted)
+        tips, rewrites = self.tips_and_rewrite(extracted, analyses)
+        return self.render(extracted, analyses, tips, rewrites)
+
+    def extract(self):
+        """Extract text and details for every resume not yet extracted."""
+        path = self._path("extracted.jsonl")
+        records = {record["id"]: record for record in read_jsonl(path)}
+        if not self.state.done("extract"):
+            for file_name in sorted(os.listdir(self.input_dir)):
+                resume_id, extension = os.path.splitext(file_name)
+                if extension.lower() not in SUPPORTED_EXTENSIONS or resume_id in records:
+                    continue
+                file_path = os.path.join(self.input_dir, file_name)
+                with open(file_path, 'rb') as resume_file:
+                    document = io.BytesIO(resume_file.read())
+                document.name = file_name
+                resume_text = extract_text_from_document(document)
+                record = {
+                    "id": resume_id,
+                    "file_name": file_name,
+                    "resume_text": resume_text,
+                    "extracted_details": extract_resume_details(resume_text)
+                }
+                append_jsonl(path, record)
+                records[resume_id] = record
+            self.state.mark_done("extract")
+        logger.info(f"Batch extract: {len(records)} resumes")
+        return records
+
+    def analyze(self, extracted):
+        """Run the analysis prompts through the batch endpoint."""
+        requests_path = self._path("analyze_requests.jsonl")
+        results_path = self._path("analyze_results.jsonl")
+        if not self.state.done("analyze_requests"):
+            write_jsonl_atomic(requests_path, [
+                make_batch_request(f"analyze:{resume_id}", ANALYSIS_SYSTEM_PROMPT,
+                                   build_analysis_prompt(record["resume_text"], self.job_role))
+                for resume_id, record in extracted.items()
+            ])
+            self.state.mark_done("analyze_requests")
+        if not self.state.done("analyze_results"):
+            self.endpoint.run(requests_path, results_path, self.state)
+            self.state.mark_done("analyze_results")
+
+        analyses = {}
+        for result in read_jsonl(results_path):
+            resume_id = result["custom_id"].split(':', 1)[1]
+            content = batch_result_content(result)
+            try:
+                analyses[resume_id] = json.loads(content)
+            except (TypeError, ValueError):
+                logger.error(f"Batch analysis failed for {resume_id}, using default analysis")
+                analyses[resume_id] = default_analysis_results()
+        for resume_id in extracted:
+            analyses.setdefault(resume_id, default_analysis_results())
+        return analyses
+
+    def tips_and_rewrite(self, extracted, analyses):
+        """Run the tips and rewrite prompts through the batch endpoint."""
+        requests_path = self._path("followup_requests.jsonl")
+        results_path = self._path("followup_results.jsonl")
+        if not self.state.done("followup_requests"):
+            requests = []
+            for resume_id, record in extracted.items():
+                requests.append(make_batch_request(
+                    f"tips:{resume_id}", TIPS_SYSTEM_PROMPT,
+                    build_tips_prompt(analyses[resume_id], self.job_role)
+                ))
+                requests.append(make_batch_request(
+                    f"rewrite:{resume_id}", REWRITE_SYSTEM_PROMPT,
+                    build_rewrite_prompt(record["resume_text"], analyses[resume_id], self.job_role,
+                                         record["extracted_details"])
+                ))
+            write_jsonl_atomic(requests_path, requests)
+            self.state.mark_done("followup_requests")
+        if not self.state.done("followup_results"):
+            self.endpoint.run(requests_path, results_path, self.state)
+            self.state.mark_done("followup_results")
+
+        tips, rewrites = {}, {}
+        for result in read_jsonl(results_path):
+            kind, resume_id = result["custom_id"].split(':', 1)
+            content = batch_result_content(result)
+            try:
+                parsed = json.loads(content)
+            except (TypeError, ValueError):
+                logger.error(f"Batch {kind} request failed for {resume_id}")
+                parsed = None
+            if kind == "tips":
+                if parsed is None:
+                    tips[resume_id] = default_improvement_tips()
+                else:
+                    tips[resume_id] = parsed if isinstance(parsed, list) else []
+            else:
+                rewrites[resume_id] = parsed if isinstance(parsed, dict) else None
+        return tips, rewrites
+
+    def render(self, extracted, analyses, tips, rewrites):
+        """Post-process rewrites and render documents for unfinished resumes across the bulk renderer's processes."""
+        path = self._path("rendered.jsonl")
+        rendered = {record["id"]: record for record in read_jsonl(path)}
+        pending_ids = []
+        optimized_texts = []
+        for resume_id, record in extracted.items():
+            if resume_id in rendered:
+                continue
+            rewritten = rewrites.get(resume_id)
+            if rewritten is None:
+                logger.error(f"Batch rewrite failed for {resume_id}, using extracted details")
+                rewritten = fallback_rewrite(record["resume_text"], record["extracted_details"], self.job_role)
+            else:
+                rewritten = postprocess_rewrite(rewritten, record["resume_text"],
+                                                record["extracted_details"], self.job_role)
+            pending_ids.append(resume_id)
+            optimized_texts.append(rewritten["full_optimized_resume"])
+        if not pending_ids:
+            return rendered
+
+        formats = tuple(dict.fromkeys(list(self.output_formats) + ["txt"]))
+        with BulkRenderer(workers=min(BULK_RENDER_WORKERS, len(pending_ids))) as renderer:
+            # Results arrive in order, so each checkpoint is written as soon as its documents are
+            for result in renderer.render(optimized_texts, formats=formats):
+                resume_id = pending_ids[result["index"]]
+                outputs = {}
+                for output_format in formats:
+                    output_path = os.path.join(self.output_dir, f"{resume_id}_enhanced.{output_format}")
+                    with open(output_path, 'wb') as output_file:
+                        output_file.write(result["outputs"][output_format])
+                    if output_format in self.output_formats:
+                        outputs[output_format] = output_path
+
+                rendered_record = {
+                    "id": resume_id,
+                    "job_match_score": analyses[resume_id].get("job_match_score"),
+                    "improvement_tips": tips.get(resume_id, default_improvement_tips()),
+                    "outputs": outputs
+                }
+                append_jsonl(path, rendered_record)
+                rendered[resume_id] = rendered_record
+            logger.info(f"Batch render: {len(rendered)} resumes, {renderer.stats()}")
+        return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enhance a directory of resumes offline in batch.")
+    parser.add_argument("input_dir", help="Directory of PDF/DOCX resumes")
+    parser.add_argument("work_dir", help="Directory for checkpoints, request/result files and output")
+    parser.add_argument("--job-role", required=True, help="Target job role for every resume")
+    parser.add_argument("--endpoint", choices=["local", "openai"], default="local",
+                        help="Use the local stand-in or the OpenAI Batch API")
+    args = parser.parse_args()
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    endpoint = OpenAIBatchEndpoint() if args.endpoint == "openai" else LocalBatchEndpoint()
+    rendered = BatchPipeline(args.input_dir, args.work_dir, args.job_role, endpoint=endpoint).run()
+    print(f"Rendered {len(rendered)} resumes into {os.path.join(args.work_dir, 'output')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,584 @@
+# benchmark.py
+import io
+import time
+import random
+import argparse
+import statistics
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_openai_server import start_fake_server, add_config_arguments, config_from_args
+
+SKILLS = ["Python", "SQL", "Java", "Excel", "Tableau", "SEO", "Google Analytics", "Docker", "AWS",
+          "Figma", "Salesforce", "Agile", "Leadership", "Budgeting", "Machine Learning"]
+VERBS = ["Responsible for", "Led", "Worked on", "Built", "Helped with", "Managed", "Improved", "Delivered"]
+OBJECTS = ["the reporting pipeline", "a team of engineers", "customer onboarding", "the marketing site",
+           "quarterly forecasts", "internal tooling", "the data warehouse", "social media campaigns"]
+ROLES = ["Software Engineer", "Data Analyst", "Digital Marketing", "Product Manager", "Sales Manager"]
+
+
+def synthetic_resume(seed, jobs=4, bullets_per_job=5):
+    """
+    Build a deterministic plain-text resume shaped like extracted PDF text.
+
+    Args:
+        seed (int): Random seed, so corpora are reproducible
+        jobs (int): Number of experience entries
+        bullets_per_job (int): Bullets per experience entry
+
+    Returns:
+        str: Resume text
+    """
+    rng = random.Random(seed)
+    lines = [f"Candidate {seed}", "Contact", f"candidate{seed}@example.com | (555) 123-{seed % 10000:04d}",
+             "Summary", "Results-driven professional and team player with broad experience.", "Skills"]
+    lines.extend(f"- {skill}" for skill in rng.sample(SKILLS, 6))
+    lines.append("Experience")
+    for job in range(jobs):
+        lines.append(f"{rng.choice(ROLES)}, Company {job} ({2010 + job}-{2011 + job})")
+        for _ in range(bullets_per_job):
+            bullet = f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)}"
+            if rng.random() < 0.4:
+                bullet += f", improving throughput by {rng.randint(5, 60)}%"
+            lines.append(bullet)
+    lines.extend(["Education", "- B.S. Computer Science, State University, 2010"])
+    return '\n'.join(lines)
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of samples (nearest-rank)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def report(name, samples, unit_count=None):
+    """Print p50/p95/p99 latency and, optionally, throughput for a benchmark."""
+    total = sum(samples)
+    line = (f"{name:<32} n={len(samples):<5} p50={percentile(samples, 50) * 1000:8.2f}ms "
+            f"p95={percentile(samples, 95) * 1000:8.2f}ms p99={percentile(samples, 99) * 1000:8.2f}ms "
+            f"mean={statistics.mean(samples) * 1000:8.2f}ms")
+    if unit_count is not None and total > 0:
+        line += f" throughput={unit_count / total:,.1f}/s"
+    print(line)
+
+
+def time_calls(func, inputs):
+    """Time func over each input and return the per-call durations in seconds."""
+    samples = []
+    for item in inputs:
+        start = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_local_analysis(args):
+    from resume_analyzer import extract_resume_details
+    from local_analyzer import analyze_resume_local
+
+    corpus = [(synthetic_resume(seed, jobs=args.jobs), ROLES[seed % len(ROLES)]) for seed in range(args.count)]
+    details = [extract_resume_details(text) for text, _ in corpus]
+    samples = time_calls(lambda i: analyze_resume_local(corpus[i][0], corpus[i][1], details[i]), range(len(corpus)))
+    report("local analysis", samples, unit_count=len(samples))
+    samples = time_calls(lambda i: analyze_resume_local(corpus[i][0], corpus[i][1],
+                                                        extract_resume_details(corpus[i][0])), range(len(corpus)))
+    report("local analysis + details", samples, unit_count=len(samples))
+
+
+def synthetic_pdf(pages, seed=0):
+    """
+    Build a text PDF with the given number of pages of resume-like content.
+
+    Args:
+        pages (int): Page count
+        seed (int): Random seed for the content
+
+    Returns:
+        bytes: PDF data
+    """
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_font("Arial", size=10)
+    for page in range(pages):
+        pdf.add_page()
+        for line in synthetic_resume(seed + page, jobs=3, bullets_per_job=5).splitlines()[:45]:
+            pdf.cell(0, 5, txt=line, ln=True)
+    output = pdf.output(dest='S')
+    return output.encode('latin-1') if isinstance(output, str) else bytes(output)
+
+
+def legacy_extract_text_from_pdf(pdf_file):
+    """The sequential, concatenating extractor kept as the benchmark baseline."""
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(pdf_file)
+    text = ""
+    for page_num in range(len(pdf_reader.pages)):
+        page = pdf_reader.pages[page_num]
+        text += page.extract_text() or ""
+    return text
+
+
+def bench_pdf_extract(args):
+    from pdf_utils import iter_pdf_pages, extract_text_from_pdf
+    from pdf_backends import get_backend
+
+    pypdf2 = get_backend("pypdf2")
+    for pages in (1, 10, 100):
+        pdf_bytes = synthetic_pdf(pages)
+        repeats = max(3, args.count // (pages * 10))
+        streaming = lambda data: "".join(iter_pdf_pages(data, pypdf2))
+        streaming(pdf_bytes)  # start the worker pool outside the timing
+        assert streaming(pdf_bytes) == legacy_extract_text_from_pdf(io.BytesIO(pdf_bytes))
+        for name, func in (("legacy", lambda data: legacy_extract_text_from_pdf(io.BytesIO(data))),
+                           ("streaming", streaming),
+                           ("auto backend", lambda data: extract_text_from_pdf(io.BytesIO(data)))):
+            samples = time_calls(lambda _: func(pdf_bytes), range(repeats))
+            report(f"pdf extract {pages:>3}p {name}", samples, unit_count=len(samples) * pages)
+
+
+def bench_pdf_backends(args):
+    from pdf_utils import extract_text_from_pdf
+    from pdf_backends import available_backends, looks_degraded, pdf_backend_stats
+
+    corpus = [synthetic_pdf(1 + seed % 3, seed=seed) for seed in range(min(args.count, 200))]
+    for backend in available_backends():
+        degraded = sum(looks_degraded("".join(backend.extract_pages(pdf_bytes))) for pdf_bytes in corpus)
+        samples = time_calls(backend.extract_pages, corpus)
+        report(f"backend {backend.name}", samples, unit_count=len(samples))
+        print(f"  degraded outputs: {degraded}/{len(corpus)}")
+    samples = time_calls(lambda pdf_bytes: extract_text_from_pdf(io.BytesIO(pdf_bytes)), corpus)
+    report("auto-selected backend", samples, unit_count=len(samples))
+    print(f"  backend stats: {pdf_backend_stats.stats()}")
+
+
+def synthetic_docx(copies, seed=0):
+    """
+    Build a DOCX with copies of a resume laid out as paragraphs plus a
+    skills table containing merged cells.
+
+    Args:
+        copies (int): Number of resume copies in the document
+        seed (int): Random seed for the content
+
+    Returns:
+        bytes: DOCX data
+    """
+    from docx import Document
+
+    document = Document()
+    for copy in range(copies):
+        for line in synthetic_resume(seed + copy).splitlines():
+            document.add_paragraph(line)
+        table = document.add_table(rows=3, cols=3)
+        table.cell(0, 0).merge(table.cell(0, 2)).text = "Skills"
+        table.cell(1, 0).merge(table.cell(2, 0)).text = "Technical"
+        for row in (1, 2):
+            for col in (1, 2):
+                table.cell(row, col).text = SKILLS[(copy + row * 2 + col) % len(SKILLS)]
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def legacy_extract_text_from_docx(docx_file):
+    """The python-docx extractor kept as the benchmark baseline."""
+    from docx import Document
+
+    doc = Document(docx_file)
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                text += cell.text + "\n"
+    return text
+
+
+def peak_memory(func):
+    """Return the peak traced allocation in KiB while running func."""
+    import tracemalloc
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def bench_docx_extract(args):
+    from pdf_utils import extract_text_from_docx
+
+    for copies in (1, 20, 200):
+        docx_bytes = synthetic_docx(copies)
+        repeats = max(3, args.count // (copies * 5))
+        for name, func in (("python-docx", legacy_extract_text_from_docx), ("streaming", extract_text_from_docx)):
+            samples = time_calls(lambda _: func(io.BytesIO(docx_bytes)), range(repeats))
+            report(f"docx extract {copies:>3}x {name}", samples, unit_count=len(samples) * copies)
+            print(f"  peak memory {peak_memory(lambda: func(io.BytesIO(docx_bytes))):,.0f} KiB "
+                  f"for a {len(docx_bytes) / 1024:,.0f} KiB file")
+
+
+LEGACY_DETAIL_PATTERNS = [
+    r'^(contact|personal information|info):?$', r'^(summary|objective|professional summary):?$',
+    r'^(skills|key skills|technical skills):?$', r'^(experience|work experience|professional experience):?$',
+    r'^(education|academic background):?$', r'^(certifications|certificates):?$',
+    r'^(projects|portfolio):?$', r'^(hobbies|interests|hobbies & interests):?$'
+]
+LEGACY_MARKDOWN_PATTERNS = [
+    r'NAME', r'CONTACT', r'PROFESSIONAL SUMMARY|SUMMARY', r'SKILLS',
+    r'PROFESSIONAL EXPERIENCE|EXPERIENCE|WORK EXPERIENCE', r'EDUCATION', r'CERTIFICATIONS', r'PROJECTS',
+    r'HOBBIES\s*&\s*INTERESTS|HOBBIES|INTERESTS', r'AWARDS', r'PUBLICATIONS'
+]
+
+
+def legacy_section_scan(text):
+    """Header detection as the three parsers did it before the shared grammar."""
+    import re
+    from resume_analyzer import REQUIRED_REWRITE_SECTIONS
+
+    found = 0
+    for line in text.split('\n'):
+        line = line.strip()
+        found += any(re.match(pattern, line, re.IGNORECASE) for pattern in LEGACY_DETAIL_PATTERNS)
+        found += any(re.match(rf'^(#+)?\s*{pattern}[\s:]*$', line, re.IGNORECASE)
+                     for pattern in LEGACY_MARKDOWN_PATTERNS)
+        found += any(re.match(rf'^{header}$', line, re.IGNORECASE) for header in REQUIRED_REWRITE_SECTIONS)
+    return found
+
+
+def grammar_section_scan(text):
+    """The same three header checks through the shared section grammar."""
+    from section_grammar import match_section
+
+    found = 0
+    for line in text.split('\n'):
+        found += 3 * (match_section(line) is not None)
+    return found
+
+
+def bench_section_grammar(args):
+    from fake_openai_server import FAKE_REWRITE_RESUME
+    from resume_analyzer import extract_resume_details, postprocess_rewrite
+    from pdf_utils import parse_markdown_resume
+
+    corpus = [synthetic_resume(seed, jobs=args.jobs) for seed in range(args.count)]
+    corpus += [FAKE_REWRITE_RESUME] * (args.count // 4)
+    lines = sum(text.count('\n') + 1 for text in corpus)
+    for name, func in (("legacy regex chains", legacy_section_scan), ("shared grammar", grammar_section_scan)):
+        samples = time_calls(func, corpus)
+        report(f"section scan {name}", samples, unit_count=lines)
+
+    details = extract_resume_details(corpus[0])
+    for name, func in (("extract_resume_details", extract_resume_details),
+                       ("parse_markdown_resume", parse_markdown_resume),
+                       ("postprocess_rewrite", lambda text: postprocess_rewrite(
+                           {"full_optimized_resume": text}, "", details, ROLES[0]))):
+        samples = time_calls(func, corpus)
+        report(name, samples, unit_count=len(samples))
+
+
+def synthetic_markdown(seed, jobs=4, bullets_per_job=5):
+    """Build a deterministic optimized resume in the rewrite template's markdown."""
+    rng = random.Random(seed)
+    lines = ["# NAME", f"Candidate {seed}", "# CONTACT", f"candidate{seed}@example.com | (555) 123-{seed % 10000:04d}",
+             "# PROFESSIONAL SUMMARY", "Results-driven professional with broad, measurable experience.", "# SKILLS"]
+    lines.extend(rng.sample(SKILLS, 6))
+    lines.append("# PROFESSIONAL EXPERIENCE")
+    for job in range(jobs):
+        lines.append(f"## {rng.choice(ROLES)}, Company {job} ({2010 + job}-{2011 + job})")
+        lines.extend(f"• {rng.choice(VERBS)} {rng.choice(OBJECTS)}, improving throughput by {rng.randint(5, 60)}%"
+                     for _ in range(bullets_per_job))
+        lines.append("")
+    lines.extend(["# EDUCATION", "## B.S. Computer Science", "State University, 2010"])
+    return '\n'.join(lines)
+
+
+def bench_render(args):
+    """
+    Compare rendering PDF, DOCX and TXT one after another with a parse per
+    format (the old app flow) against render_documents' one parse rendered
+    in parallel, then time on-demand downloads through the render cache.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from pdf_utils import create_document
+    from resume_model import ResumeDocument
+    from document_renderer import (render_documents, render_documents_cached, render_document_cached,
+                                   render_cache, RENDER_FORMATS)
+
+    corpus = [synthetic_markdown(seed, jobs=args.jobs) for seed in range(args.count)]
+
+    def sequential(text):
+        return {output_format: create_document(text, output_format) for output_format in RENDER_FORMATS}
+
+    with ProcessPoolExecutor(max_workers=len(RENDER_FORMATS)) as process_pool:
+        variants = (("sequential, parse per format", sequential),
+                    ("parallel threads, one parse",
+                     lambda text: render_documents(ResumeDocument.parse(text))[0]),
+                    ("parallel processes, one parse",
+                     lambda text: render_documents(ResumeDocument.parse(text), executor=process_pool)[0]))
+        baseline = sequential(corpus[0])
+        for name, func in variants:
+            # fpdf embeds a creation date, so compare sizes rather than bytes
+            assert {k: len(v) for k, v in func(corpus[0]).items()} == {k: len(v) for k, v in baseline.items()}
+            samples = time_calls(func, corpus)
+            report(name, samples, unit_count=len(samples))
+
+    format_samples = {output_format: [] for output_format in RENDER_FORMATS}
+    for text in corpus:
+        for output_format, seconds in render_documents(ResumeDocument.parse(text))[1].items():
+            format_samples[output_format].append(seconds)
+    for output_format, samples in format_samples.items():
+        report(f"render {output_format}", samples, unit_count=len(samples))
+
+    # The download path: every format for each resume, served from the cache after the first pass
+    render_cache.clear()
+    documents = [ResumeDocument.parse(text) for text in corpus]
+    samples = time_calls(render_documents_cached, documents * 2)
+    report("all formats on demand, 2 passes", samples, unit_count=len(samples))
+
+    # On-demand downloads: a DOCX for every resume, asked for three times each
+    render_cache.clear()
+    documents = [ResumeDocument.parse(text) for text in corpus]
+    samples = time_calls(lambda document: render_document_cached(document, "docx"), documents * 3)
+    report("on-demand docx, 3 downloads each", samples, unit_count=len(samples))
+    print(f"render cache: {render_cache.stats()}")
+
+
+def legacy_create_pdf(sections):
+    """
+    The cell-by-cell create_pdf layout the template engine replaced. Text
+    goes through pdf_text so fpdf 1.7 renders the layout instead of failing
+    on the bullets, which is what the old renderer did.
+    """
+    from fpdf import FPDF
+    from pdf_layout import pdf_text, pdf_bytes
+
+    sections = {key: pdf_text(value) for key, value in sections.items()}
+    pdf = FPDF(orientation='P', unit='mm', format='A4')
+    pdf.add_page()
+    pdf.set_margins(15, 15, 15)
+    sidebar_width = 50
+    main_content_x = 70
+    main_content_width = pdf.w - pdf.r_margin - main_content_x
+
+    # Sidebar: Contact and Skills
+    pdf.set_xy(15, 15)
+    if 'contact' in sections:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(sidebar_width, 8, "CONTACT", ln=True)
+        pdf.set_font("Arial", size=9)
+        contact_lines = sections['contact'].split('\n')
+        contact_text = ' | '.join(line.strip() for line in contact_lines if line.strip())
+        pdf.multi_cell(sidebar_width, 5, contact_text)
+        pdf.ln(5)
+
+    if 'skills' in sections:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(sidebar_width, 8, "SKILLS", ln=True)
+        pdf.set_font("Arial", size=9)
+        skills = sections['skills'].split('\n')
+        for skill in skills:
+            if skill.strip():
+                pdf.multi_cell(sidebar_width, 5, pdf_text('•') + f" {skill.strip()}")
+        pdf.ln(5)
+
+    # Main Content: Name, Summary, Experience, Education, etc.
+    pdf.set_xy(main_content_x, 15)
+    if 'name' in sections:
+        pdf.set_font("Arial", 'B', 18)
+        pdf.cell(0, 12, sections['name'].upper(), ln=True)
+        pdf.ln(3)
+
+    pdf.line(main_content_x, pdf.get_y(), pdf.w - pdf.r_margin, pdf.get_y())
+    pdf.ln(3)
+
+    if 'summary' in sections:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 8, "PROFESSIONAL SUMMARY", ln=True)
+        pdf.set_font("Arial", size=10)
+        pdf.multi_cell(main_content_width, 5, sections['summary'])
+        pdf.ln(5)
+
+    if 'experience' in sections:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 8, "PROFESSIONAL EXPERIENCE", ln=True)
+        jobs = sections['experience'].split('\n\n')
+        for job in jobs:
+            if job.strip():
+                job_parts = job.split('\n', 1)
+                pdf.set_font("Arial", 'B', 10)
+                pdf.cell(0, 5, job_parts[0].strip(), ln=True)
+                if len(job_parts) > 1:
+                    pdf.set_font("Arial", size=10)
+                    details = job_parts[1].strip()
+                    for line in details.split('\n'):
+                        if line.strip():
+                            pdf.cell(5, 5, '', ln=0)
+                            pdf.cell(5, 5, pdf_text('•'), ln=0)
+                            pdf.multi_cell(main_content_width - 10, 5, line.strip()[1:] if line.strip().startswith('•') else line.strip())
+                pdf.ln(3)
+
+    if 'education' in sections:
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 8, "EDUCATION", ln=True)
+        edu_entries = sections['education'].split('\n\n')
+        for entry in edu_entries:
+            if entry.strip():
+                entry_parts = entry.split('\n', 1)
+                pdf.set_font("Arial", 'B', 10)
+                pdf.cell(0, 5, entry_parts[0].strip(), ln=True)
+                if len(entry_parts) > 1:
+                    pdf.set_font("Arial", size=10)
+                    details = entry_parts[1].strip()
+                    for line in details.split('\n'):
+                        if line.strip():
+                            pdf.multi_cell(main_content_width, 5, line.strip())
+                pdf.ln(3)
+
+    for section_name in ['certifications', 'projects', 'awards', 'publications', 'hobbies_interests']:
+        if section_name in sections:
+            pdf.set_font("Arial", 'B', 12)
+            pdf.cell(0, 8, section_name.upper(), ln=True)
+            pdf.set_font("Arial", size=10)
+            pdf.multi_cell(main_content_width, 5, sections[section_name])
+            pdf.ln(5)
+
+    return pdf_bytes(pdf)
+
+
+def bench_pdf_render(args):
+    """Compare the cell-by-cell PDF layout with the cached template engine on one-page and overflowing resumes."""
+    from resume_model import ResumeDocument
+    from pdf_layout import pdf_template
+
+    for jobs in (args.jobs, args.jobs * 4):
+        corpus = [ResumeDocument.parse(synthetic_markdown(seed, jobs=jobs)).render_sections for seed in range(args.count)]
+        pages = pdf_template.layout(corpus[0])[2]
+        for name, func in (("legacy cell layout", legacy_create_pdf), ("template engine", pdf_template.render)):
+            samples = time_calls(func, corpus)
+            report(f"{name} ({jobs} jobs, {pages}p)", samples, unit_count=len(samples))
+    print(f"width cache: {pdf_template.stats()}")
+
+
+def bench_bulk_render(args):
+    """Render a cohort through the warm process pool at 1, 4 and all cores and report pages per second."""
+    import os
+    from bulk_renderer import BulkRenderer
+
+    corpus = [synthetic_markdown(seed, jobs=args.jobs + seed % (args.jobs * 3)) for seed in range(args.count)]
+    cores = os.cpu_count() or 1
+    for workers in sorted({1, 4, cores}):
+        with BulkRenderer(workers=workers) as renderer:
+            for result in renderer.render(iter(corpus)):
+                assert result["outputs"]["pdf"] and result["outputs"]["docx"]
+            stats = renderer.stats()
+        print(f"{workers:>2} workers ({cores} cores): {stats['documents_per_s']:6.1f} resumes/s "
+              f"{stats['pages_per_s']:6.1f} pages/s, {stats['pages']} pages in {stats['seconds']:.2f}s, "
+              f"startup {stats['startup_s']:.2f}s")
+
+
+def bench_pipeline(args):
+    """
+    Drive the app's process_resume sequence against the local fake OpenAI
+    server and report per-stage and total latency percentiles.
+    """
+    from openai_client import configure_openai_client
+    from llm_cache import llm_cache
+    from rate_limiter import llm_limiter, bind
+    from resume_analyzer import analyze_resume, generate_improvement_tips, rewrite_resume_sections_streaming
+    from resume_model import ResumeDocument
+    from pdf_utils import extract_text_from_document, create_document, create_fallback_pdf
+
+    server, base_url = start_fake_server(config_from_args(args))
+    configure_openai_client(base_url=base_url, api_key="fake-key")
+    # Measure the pipeline, not the response cache
+    llm_cache.cache_dir = ""
+    llm_cache.max_entries = 0
+    llm_limiter.configure(args.rpm, args.tpm)
+
+    inputs = [(create_fallback_pdf(synthetic_resume(seed, jobs=args.jobs)), ROLES[seed % len(ROLES)])
+              for seed in range(args.count)]
+    stage_names = ["extract", "details", "analyze", "tips", "rewrite", "pdf", "docx", "total"]
+    samples = {name: [] for name in stage_names}
+
+    def timed(func, *func_args, **func_kwargs):
+        start = time.perf_counter()
+        result = func(*func_args, **func_kwargs)
+        return result, time.perf_counter() - start
+
+    def run_once(index):
+        pdf_bytes, job_role = inputs[index]
+        bind(session=f"bench-{index}")
+        timings = {}
+        start = time.perf_counter()
+        document = io.BytesIO(pdf_bytes)
+        document.name = "resume.pdf"
+        resume_text, timings["extract"] = timed(extract_text_from_document, document)
+        original, timings["details"] = timed(ResumeDocument.parse, resume_text)
+        # Time the details build along with the parse; later stages reuse it
+        _, details_time = timed(lambda: original.details)
+        timings["details"] += details_time
+        analysis, timings["analyze"] = timed(analyze_resume, resume_text, job_role, document=original)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            tips_future = executor.submit(contextvars.copy_context().run, timed,
+                                          generate_improvement_tips, analysis, job_role)
+            rewritten, timings["rewrite"] = timed(rewrite_resume_sections_streaming, resume_text, analysis, job_role,
+                                                  document=original)
+            _, timings["tips"] = tips_future.result()
+        optimized = ResumeDocument.parse(rewritten["full_optimized_resume"])
+        _, timings["pdf"] = timed(create_document, optimized.text, 'pdf', sections=optimized.render_sections)
+        _, timings["docx"] = timed(create_document, optimized.text, 'docx', sections=optimized.render_sections)
+        timings["total"] = time.perf_counter() - start
+        return timings
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as sessions:
+        for timings in sessions.map(run_once, range(len(inputs))):
+            for name in stage_names:
+                samples[name].append(timings[name])
+    wall = time.perf_counter() - wall_start
+    server.shutdown()
+
+    for name in stage_names:
+        report(name, samples[name])
+    print(f"{len(inputs)} resumes in {wall:.2f}s with {args.sessions} concurrent sessions "
+          f"({len(inputs) / wall:.2f} resumes/s, {server.config.requests} LLM requests)")
+    print(f"rate limiter: {llm_limiter.stats()}")
+
+
+BENCHMARKS = {
+    "bulk-render": bench_bulk_render,
+    "docx-extract": bench_docx_extract,
+    "local-analysis": bench_local_analysis,
+    "pdf-backends": bench_pdf_backends,
+    "pdf-extract": bench_pdf_extract,
+    "pdf-render": bench_pdf_render,
+    "pipeline": bench_pipeline,
+    "render": bench_render,
+    "section-grammar": bench_section_grammar
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro and pipeline benchmarks for the resume enhancer.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["all"])
+    parser.add_argument("--count", type=int, default=500, help="Number of documents in the corpus")
+    parser.add_argument("--jobs", type=int, default=4, help="Experience entries per synthetic resume")
+    parser.add_argument("--sessions", type=int, default=1, help="Concurrent sessions for the pipeline benchmark")
+    parser.add_argument("--rpm", type=int, default=0, help="Rate limiter requests per minute, 0 for unlimited")
+    parser.add_argument("--tpm", type=int, default=0, help="Rate limiter tokens per minute, 0 for unlimited")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    names = sorted(BENCHMARKS) if args.benchmark == "all" else [args.benchmark]
+    for name in names:
+        print(f"== {name}")
+        BENCHMARKS[name](args)
+
+
+if __name__ == "__main__":
+    main()
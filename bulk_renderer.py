@@ -0,0 +1,218 @@
+# bulk_renderer.py
+import os
+import re
+import time
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, CancelledError, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from pdf_utils import process_context, terminate_pool
+from document_renderer import render_documents
+from resume_model import ResumeDocument
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+BULK_RENDER_WORKERS = int(os.environ.get("BULK_RENDER_WORKERS", str(os.cpu_count() or 1)))
+# Resumes submitted but not yet handed back, per worker; bounds memory held in results
+BULK_RENDER_IN_FLIGHT_PER_WORKER = int(os.environ.get("BULK_RENDER_IN_FLIGHT_PER_WORKER", "2"))
+# Seconds to wait for one resume before treating its worker as stuck and rendering it in-process
+BULK_RENDER_TIMEOUT_SECONDS = float(os.environ.get("BULK_RENDER_TIMEOUT_SECONDS", "120"))
+# Page objects in an fpdf document ("/Type /Pages" is the page tree, not a page)
+PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page\b')
+
+WARMUP_RESUME = """# NAME
+Warm Up
+# CONTACT
+warm.up@example.com
+# PROFESSIONAL SUMMARY
+Renders once per worker so the first real resume does not pay for imports and font setup.
+# SKILLS
+Python
+# PROFESSIONAL EXPERIENCE
+## Engineer, Example (2020-Present)
+• Built things
+# EDUCATION
+## B.S. Computer Science
+"""
+
+
+def _init_worker():
+    """Load fpdf, python-docx, the PDF template's widths and the render pool once per worker process."""
+    render_documents(ResumeDocument.parse(WARMUP_RESUME), ("pdf", "docx"))
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+def render_resume(resume_text, formats):
+    """
+    Parse an optimized resume once and render its formats side by side in
+    the worker's render pool.
+
+    Args:
+        resume_text (str): The optimized resume markdown
+        formats (tuple): Output formats to produce
+
+    Returns:
+        tuple: (format -> bytes, format -> render seconds, PDF page count)
+    """
+    outputs, timings = render_documents(ResumeDocument.parse(resume_text), formats)
+    pages = len(PDF_PAGE_PATTERN.findall(outputs["pdf"])) if "pdf" in outputs else 0
+    return outputs, timings, pages
+
+
+class BulkRenderer:
+    """
+    Renders many optimized resumes across a warm pool of worker processes.
+
+    PDF and DOCX rendering is CPU-bound pure Python, so a cohort only uses
+    more than one core when it is spread over processes. Workers import the
+    renderers and render a warm-up resume when they start. render() keeps at
+    most max_in_flight resumes submitted at a time and streams results back
+    as they finish. A resume whose worker dies or exceeds
+    BULK_RENDER_TIMEOUT_SECONDS is rendered in-process, and the pool is
+    replaced with the other pending resumes resubmitted to it.
+    """
+
+    def __init__(self, workers=BULK_RENDER_WORKERS, max_in_flight=None):
+        self.workers = max(1, workers)
+        self.max_in_flight = max_in_flight or self.workers * BULK_RENDER_IN_FLIGHT_PER_WORKER
+        self.documents = 0
+        self.pages = 0
+        self.seconds = 0.0
+        self.render_seconds = {}
+        self._pool = None
+        # Bumped on every pool start, so one broken pool is only replaced once
+        self._generation = 0
+        start = time.perf_counter()
+        self._start_pool()
+        self.startup_seconds = time.perf_counter() - start
+        logger.info(f"Bulk renderer ready: {self.workers} workers in {self.startup_seconds:.2f}s")
+
+    def _start_pool(self):
+        # Not forked: a child forked from the threaded server can inherit a held lock
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                         mp_context=process_context())
+        self._generation += 1
+        # One task per worker starts every process now instead of on first use
+        for future in [self._pool.submit(_worker_ready) for _ in range(self.workers)]:
+            future.result()
+
+    def _restart_pool(self, pending, formats, generation):
+        """
+        Replace a pool that lost or stuck a worker so later resumes still
+        render in parallel, resubmitting pending resumes that had no result.
+        Does nothing if the pool of that generation was already replaced.
+        """
+        if generation != self._generation:
+            return
+        terminate_pool(self._pool)
+        self._start_pool()
+        for position, (index, resume_text, future) in enumerate(pending):
+            if not future.done() or future.cancelled() or future.exception() is not None:
+                pending[position] = (index, resume_text, self._pool.submit(render_resume, resume_text, formats))
+
+    def _result(self, index, resume_text, formats, future, pending, timeout=BULK_RENDER_TIMEOUT_SECONDS,
+                generation=None):
+        generation = generation or self._generation
+        try:
+            outputs, timings, pages = future.result(timeout=timeout)
+        except (BrokenProcessPool, CancelledError, FutureTimeoutError) as e:
+            reason = str(e) or f"no result in {BULK_RENDER_TIMEOUT_SECONDS:g}s"
+            logger.error(f"Bulk render worker failed on resume {index} ({reason}), rendering it in-process")
+            self._restart_pool(pending, formats, generation)
+            outputs, timings, pages = render_resume(resume_text, formats)
+        self.documents += 1
+        self.pages += pages
+        for output_format, seconds in timings.items():
+            self.render_seconds[output_format] = self.render_seconds.get(output_format, 0.0) + seconds
+        return {"index": index, "outputs": outputs, "timings": timings, "pages": pages}
+
+    def _submit(self, resume_text, formats, pending):
+        try:
+            return self._pool.submit(render_resume, resume_text, formats)
+        except BrokenProcessPool:
+            self._restart_pool(pending, formats, self._generation)
+            return self._pool.submit(render_resume, resume_text, formats)
+
+    def render(self, resume_texts, formats=("pdf", "docx"), ordered=True):
+        """
+        Render resumes, yielding each result as soon as it can be handed back.
+
+        Args:
+            resume_texts (iterable): Optimized resume markdown; consumed lazily
+            formats (tuple): Output formats to produce for every resume
+            ordered (bool): Yield in input order; otherwise in completion order
+
+        Yields:
+            dict: index, outputs (format -> bytes), timings (format -> seconds)
+                and pages (PDF page count)
+        """
+        formats = tuple(formats)
+        pending = deque()
+        start = time.perf_counter()
+        try:
+            for index, resume_text in enumerate(resume_texts):
+                if len(pending) >= self.max_in_flight:
+                    if ordered:
+                        yield self._pop_ordered(pending, formats)
+                    else:
+                        yield from self._pop_completed(pending, formats)
+                pending.append((index, resume_text, self._submit(resume_text, formats, pending)))
+            while pending:
+                if ordered:
+                    yield self._pop_ordered(pending, formats)
+                else:
+                    yield from self._pop_completed(pending, formats)
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+            self.seconds += time.perf_counter() - start
+
+    def _pop_ordered(self, pending, formats):
+        index, resume_text, future = pending.popleft()
+        return self._result(index, resume_text, formats, future, pending)
+
+    def _pop_completed(self, pending, formats):
+        done, _ = wait([future for _, _, future in pending], timeout=BULK_RENDER_TIMEOUT_SECONDS,
+                       return_when=FIRST_COMPLETED)
+        if not done:
+            # Nothing finished in time; give up on the oldest resume
+            index, resume_text, future = pending.popleft()
+            return [self._result(index, resume_text, formats, future, pending, timeout=0)]
+        finished = [item for item in pending if item[2] in done]
+        for item in finished:
+            pending.remove(item)
+        # These futures all came from the current pool: if it broke, the first
+        # failure replaces it and the rest render in-process without another restart
+        generation = self._generation
+        return [self._result(index, resume_text, formats, future, pending, generation=generation)
+                for index, resume_text, future in finished]
+
+    def stats(self):
+        """Return documents and pages rendered with wall-clock throughput."""
+        return {
+            "workers": self.workers,
+            "startup_s": round(self.startup_seconds, 3),
+            "documents": self.documents,
+            "pages": self.pages,
+            "seconds": round(self.seconds, 3),
+            "documents_per_s": round(self.documents / self.seconds, 1) if self.seconds else 0.0,
+            "pages_per_s": round(self.pages / self.seconds, 1) if self.seconds else 0.0,
+            "render_seconds": {name: round(seconds, 3) for name, seconds in self.render_seconds.items()}
+        }
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
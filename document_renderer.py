@@ -0,0 +1,251 @@
+# document_renderer.py
+import os
+import time
+import hashlib
+import functools
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from pdf_utils import create_document
+from singleflight import SingleFlight
+from log_config import setup_logging, Lazy
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+RENDER_FORMATS = ("pdf", "docx", "txt")
+# Shared by every session; one worker per format renders a resume's formats side by side
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", str(len(RENDER_FORMATS))))
+# Byte budget for rendered documents kept in memory across sessions
+RENDER_CACHE_MAX_MB = int(os.environ.get("RENDER_CACHE_MAX_MB", "64"))
+# Bump when renderer output changes so stale documents are not served
+RENDER_CACHE_VERSION = "2"
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def _get_render_pool():
+    """Return the shared render pool, starting it on first use."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+        return _render_pool
+
+def render_format(resume_text, output_format, sections):
+    """
+    Render one format and time it. Module-level so a process pool can run it.
+
+    Args:
+        resume_text (str): The optimized resume markdown
+        output_format (str): "pdf", "docx" or "txt"
+        sections (dict): Parsed sections from ResumeDocument.render_sections
+
+    Returns:
+        tuple: (document bytes, render seconds)
+    """
+    start = time.perf_counter()
+    data = create_document(resume_text, output_format, sections)
+    return data, time.perf_counter() - start
+
+
+class RenderStats:
+    """Per-format render counts, timings and output sizes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, output_format, seconds, size):
+        with self._lock:
+            row = self._stats.setdefault(output_format, {"renders": 0, "seconds": 0.0, "bytes": 0})
+            row["renders"] += 1
+            row["seconds"] += seconds
+            row["bytes"] += size
+
+    def stats(self):
+        """Return per-format totals with mean render time and renders per second."""
+        with self._lock:
+            return {
+                name: dict(row, seconds=round(row["seconds"], 3),
+                           mean_ms=round(row["seconds"] / row["renders"] * 1000, 2) if row["renders"] else 0.0,
+                           renders_per_s=round(row["renders"] / row["seconds"], 1) if row["seconds"] else 0.0)
+                for name, row in self._stats.items()
+            }
+
+
+class RenderCache:
+    """
+    In-memory LRU of rendered documents bounded by total bytes rather than
+    entry count, since a PDF and a TXT of the same resume differ in size by
+    orders of magnitude.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached document bytes for key, or None on a miss."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def set(self, key, data):
+        """Store document bytes, evicting least recently used entries to stay in budget."""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size against the budget."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
+
+
+def render_cache_key(resume_text, output_format):
+    """
+    Build the cache key for one rendered format of a resume.
+
+    Args:
+        resume_text (str): The optimized resume markdown
+        output_format (str): "pdf", "docx" or "txt"
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256(f"{RENDER_CACHE_VERSION}:{output_format.lower()}:".encode('utf-8'))
+    digest.update(resume_text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def render_documents(document, formats=RENDER_FORMATS, executor=None):
+    """
+    Render a parsed resume to several formats concurrently from one parse.
+
+    Args:
+        document (ResumeDocument): The optimized resume
+        formats (tuple): Output formats to produce
+        executor (Executor): Pool to render in; defaults to the shared thread
+            pool, a ProcessPoolExecutor also works
+
+    Returns:
+        tuple: (format -> bytes, format -> render seconds)
+    """
+    # Build the sections here so workers never race to parse the same document
+    sections = document.render_sections
+    executor = executor or _get_render_pool()
+    futures = {output_format: executor.submit(render_format, document.text, output_format, sections)
+               for output_format in formats}
+    outputs = {}
+    timings = {}
+    for output_format, future in futures.items():
+        outputs[output_format], timings[output_format] = future.result()
+        render_stats.record(output_format, timings[output_format], len(outputs[output_format]))
+    logger.debug("Rendered %s", Lazy(lambda: ', '.join(f'{name} in {seconds * 1000:.1f}ms'
+                                                       for name, seconds in timings.items())))
+    return outputs, timings
+
+
+def _render_and_cache(resume_text, output_format, sections, key):
+    data, seconds = render_format(resume_text, output_format, sections)
+    render_stats.record(output_format, seconds, len(data))
+    # A failed render comes back empty; do not pin it in the cache
+    if data:
+        render_cache.set(key, data)
+    return data, seconds
+
+
+def render_documents_cached(document, formats=RENDER_FORMATS):
+    """
+    Render formats on demand, serving repeat downloads and identical resumes
+    from other sessions out of the render cache. Formats that are not cached
+    are rendered side by side in the shared pool from one parse, and
+    concurrent requests for the same document and format render it once.
+
+    Args:
+        document (ResumeDocument): The optimized resume
+        formats (iterable): Output formats to produce
+
+    Returns:
+        tuple: (format -> bytes, format -> render seconds, set of formats served from the cache)
+    """
+    outputs, timings, hits = {}, {}, set()
+    missing = {}
+    for output_format in formats:
+        key = render_cache_key(document.text, output_format)
+        data = render_cache.get(key)
+        if data is None:
+            missing[output_format] = key
+            continue
+        outputs[output_format], timings[output_format] = data, 0.0
+        hits.add(output_format)
+    if missing:
+        sections = document.render_sections
+        pool = _get_render_pool()
+        futures = {
+            output_format: pool.submit(render_singleflight.do, key, functools.partial(
+                _render_and_cache, document.text, output_format, sections, key))
+            for output_format, key in missing.items()
+        }
+        for output_format, future in futures.items():
+            outputs[output_format], timings[output_format] = future.result()
+        logger.debug("Rendered %s on demand", Lazy(lambda: ', '.join(
+            f'{name} in {timings[name] * 1000:.1f}ms' for name in missing)))
+    return outputs, timings, hits
+
+
+def render_document_cached(document, output_format):
+    """
+    Render one format on demand through render_documents_cached.
+
+    Returns:
+        tuple: (document bytes, render seconds, cache hit)
+    """
+    outputs, timings, hits = render_documents_cached(document, (output_format,))
+    return outputs[output_format], timings[output_format], output_format in hits
+
+
+# Process-wide render timings shown in the Debug tab
+render_stats = RenderStats()
+
+# Process-wide rendered documents shared by every Streamlit session
+render_cache = RenderCache(RENDER_CACHE_MAX_MB * 1024 * 1024)
+render_singleflight = SingleFlight()
@@ -0,0 +1,126 @@
+# extraction_cache.py
+import io
+import os
+import time
+import hashlib
+import logging
+
+from llm_cache import LLMResponseCache
+from pdf_utils import extract_text_from_document
+from pdf_backends import count_section_headers, pdf_backend_stats, MIN_SECTION_HEADERS
+from layout_extractor import extract_layout_blocks, blocks_to_text, pdfplumber, LAYOUT_EXTRACTION
+from resume_analyzer import extract_resume_details
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Resume text is personal data, so the disk tier is off unless a directory is configured
+EXTRACTION_CACHE_DIR = os.environ.get("EXTRACTION_CACHE_DIR", "")
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.environ.get("EXTRACTION_CACHE_MAX_ENTRIES", "128"))
+EXTRACTION_CACHE_TTL_SECONDS = int(os.environ.get("EXTRACTION_CACHE_TTL_SECONDS", str(24 * 3600)))
+EXTRACTION_CACHE_MAX_DISK_MB = int(os.environ.get("EXTRACTION_CACHE_MAX_DISK_MB", "50"))
+# Bump when extraction output changes so stale entries are not served
+EXTRACTION_CACHE_VERSION = "3"
+
+
+def fingerprint_document(file_bytes, file_name):
+    """
+    Build the cache key for an uploaded document.
+
+    Args:
+        file_bytes (bytes): Raw upload
+        file_name (str): Upload name; its extension selects the parser
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{EXTRACTION_CACHE_VERSION}:{os.path.splitext(file_name)[1].lower()}:".encode('utf-8'))
+    digest.update(file_bytes)
+    return digest.hexdigest()
+
+
+def read_upload(file):
+    """Return the bytes of an uploaded file without consuming it."""
+    if hasattr(file, 'getvalue'):
+        return file.getvalue()
+    position = file.tell()
+    file_bytes = file.read()
+    file.seek(position)
+    return file_bytes
+
+
+def extract_with_layout(pdf_bytes, resume_text):
+    """
+    Run the layout pass for a PDF when configured, or (in "auto" mode) when
+    the plain text has too few recognizable section headers.
+
+    Args:
+        pdf_bytes (bytes): PDF data
+        resume_text (str): Text from the fast extraction backend
+
+    Returns:
+        tuple: (resume_text, extracted_details); the text comes from the
+            layout blocks when they were used
+    """
+    wanted = LAYOUT_EXTRACTION == "always" or (
+        LAYOUT_EXTRACTION == "auto" and count_section_headers(resume_text) < MIN_SECTION_HEADERS)
+    if not wanted or pdfplumber is None:
+        return resume_text, extract_resume_details(resume_text)
+
+    start = time.perf_counter()
+    try:
+        blocks = extract_layout_blocks(pdf_bytes)
+    except Exception as e:
+        pdf_backend_stats.record("pdfplumber-layout", time.perf_counter() - start, failed=True)
+        logger.warning(f"Layout extraction failed, using plain text: {e}")
+        return resume_text, extract_resume_details(resume_text)
+    pages = len({block.page for block in blocks})
+    sections = {block.section for block in blocks if block.section}
+    pdf_backend_stats.record("pdfplumber-layout", time.perf_counter() - start, pages=pages,
+                             degraded=len(sections) < MIN_SECTION_HEADERS)
+    if LAYOUT_EXTRACTION != "always" and len(sections) <= count_section_headers(resume_text):
+        return resume_text, extract_resume_details(resume_text)
+    return blocks_to_text(blocks), extract_resume_details(resume_text, layout_blocks=blocks)
+
+
+def extract_document_cached(file):
+    """
+    Extract text and resume details, reusing the result for a document that
+    was seen before (e.g. the same upload enhanced for another job role).
+
+    Args:
+        file: File object of the PDF or DOCX, with a name attribute
+
+    Returns:
+        tuple: (resume_text, extracted_details, cache_hit)
+    """
+    file_bytes = read_upload(file)
+    key = fingerprint_document(file_bytes, file.name)
+    cached = extraction_cache.get(key)
+    if cached is not None:
+        logger.debug(f"Extraction cache hit for {file.name} ({key[:12]})")
+        return cached["resume_text"], cached["extracted_details"], True
+
+    document = io.BytesIO(file_bytes)
+    document.name = file.name
+    resume_text = extract_text_from_document(document)
+    if file.name.lower().endswith('.pdf') and not resume_text.startswith("Error extracting text"):
+        resume_text, extracted_details = extract_with_layout(file_bytes, resume_text)
+    else:
+        extracted_details = extract_resume_details(resume_text)
+    # Failed extractions return an error string; do not pin it in the cache
+    if not resume_text.startswith("Error extracting text"):
+        extraction_cache.set(key, {"resume_text": resume_text, "extracted_details": extracted_details})
+    return resume_text, extracted_details, False
+
+
+# Process-wide cache shared by every Streamlit session
+extraction_cache = LLMResponseCache(
+    cache_dir=EXTRACTION_CACHE_DIR,
+    max_entries=EXTRACTION_CACHE_MAX_ENTRIES,
+    ttl_seconds=EXTRACTION_CACHE_TTL_SECONDS,
+    max_disk_bytes=EXTRACTION_CACHE_MAX_DISK_MB * 1024 * 1024
+)
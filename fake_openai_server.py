@@ -0,0 +1,294 @@
+# fake_openai_server.py
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from local_analyzer import analyze_resume_local
+
+FAKE_REWRITE_RESUME = """# NAME
+Alex Example
+
+# CONTACT
+Email: alex@example.com | Phone: (555) 010-0000 | LinkedIn: linkedin.com/in/alexexample
+
+# PROFESSIONAL SUMMARY
+Impact-focused professional with 6 years of experience delivering measurable results for cross-functional teams.
+
+# SKILLS
+- Python
+- SQL
+- Stakeholder Management
+
+# PROFESSIONAL EXPERIENCE
+## Senior Analyst, Example Corp (2020-Present)
+- Cut reporting turnaround by 40% by automating data pipelines.
+- Led a team of 4 analysts delivering weekly executive dashboards.
+
+## Analyst, Sample Inc (2017-2020)
+- Grew campaign conversion by 18% through A/B testing.
+
+# EDUCATION
+- B.S. Economics, State University, 2017
+
+# CERTIFICATIONS
+- Google Analytics Certified, 2021
+
+# PROJECTS
+- Forecast Model: Built a demand forecast that reduced stockouts by 25%.
+
+# HOBBIES & INTERESTS
+- Running
+"""
+
+
+class FakeServerConfig:
+    """
+    Behaviour of the fake server. Latency follows a lognormal distribution
+    with the given median; each injection rate is a probability per request.
+    """
+
+    def __init__(self, latency_median=1.0, latency_sigma=0.5, ttfb_fraction=0.1, stream_chunk_chars=24,
+                 error_rate=0.0, rate_limit_rate=0.0, timeout_rate=0.0, timeout_seconds=300.0,
+                 malformed_rate=0.0, seed=None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.ttfb_fraction = ttfb_fraction
+        self.stream_chunk_chars = stream_chunk_chars
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.malformed_rate = malformed_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+
+    def sample_latency(self):
+        with self.rng_lock:
+            if self.latency_median <= 0:
+                return 0.0
+            return self.rng.lognormvariate(math.log(self.latency_median), self.latency_sigma)
+
+    def roll(self, rate):
+        with self.rng_lock:
+            return rate > 0 and self.rng.random() < rate
+
+
+def classify_request(messages):
+    """Work out which analyzer prompt a request came from."""
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    user = next((m["content"] for m in messages if m["role"] == "user"), "")
+    if "resume reviewer" in system:
+        return "analysis", user
+    if "resume advisor" in system:
+        return "tips", user
+    if "one resume section" in system:
+        return "section", user
+    if "markdown template" in system:
+        return "rewrite", user
+    return "text", user
+
+
+def fake_content(kind, user_prompt):
+    """
+    Produce schema-valid content for each analyzer prompt.
+
+    Args:
+        kind (str): Prompt kind from classify_request
+        user_prompt (str): The user message
+
+    Returns:
+        str: Completion content
+    """
+    if kind == "analysis":
+        resume_text = user_prompt.split("Resume:\n", 1)[-1]
+        role = user_prompt.split(" position", 1)[0].rsplit("for a ", 1)[-1]
+        return json.dumps(analyze_resume_local(resume_text, role, {}))
+    if kind == "tips":
+        return json.dumps([
+            "Quantify achievements in the experience section with percentages or counts.",
+            "Add the missing role keywords to the skills section where they are accurate."
+        ])
+    if kind == "rewrite":
+        return json.dumps({
+            "full_optimized_resume": FAKE_REWRITE_RESUME,
+            "improvements_made": [{"section": "summary", "original": "", "improved": "Impact-focused summary",
+                                   "reason": "Stronger opening", "impact": "Better first impression"}]
+        })
+    if kind == "section":
+        if '"summary"' in user_prompt:
+            return json.dumps({"summary": "Impact-focused professional with measurable results."})
+        if '"title"' in user_prompt:
+            entry = user_prompt.split("Entry: ", 1)[-1].split("\n", 1)[0]
+            return json.dumps({"title": entry, "bullets": ["Improved a key metric by 20% through automation."]})
+        return json.dumps({"items": ["Python", "SQL", "Communication"]})
+    return FAKE_REWRITE_RESUME
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip('/').endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+        with config.rng_lock:
+            config.requests += 1
+
+        if config.roll(config.timeout_rate):
+            time.sleep(config.timeout_seconds)
+            self.close_connection = True
+            return
+        if config.roll(config.rate_limit_rate):
+            self._send_json(429, {"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_error"}},
+                            headers={"Retry-After": "1"})
+            return
+        if config.roll(config.error_rate):
+            self._send_json(500, {"error": {"message": "Internal error (injected)", "type": "server_error"}})
+            return
+
+        kind, user_prompt = classify_request(request.get("messages", []))
+        content = fake_content(kind, user_prompt)
+        if config.roll(config.malformed_rate):
+            content = content[:max(1, len(content) // 2)]
+
+        prompt_tokens = sum(len(m.get("content", "")) for m in request.get("messages", [])) // 4
+        completion_tokens = len(content) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        latency = config.sample_latency()
+        completion_id = f"chatcmpl-fake{config.requests}"
+        model = request.get("model", "gpt-4o")
+
+        if request.get("stream"):
+            self._stream(completion_id, model, content, usage, latency, request)
+            return
+
+        time.sleep(latency)
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    def _stream(self, completion_id, model, content, usage, latency, request):
+        config = self.server.config
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None, usage_payload=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [] if usage_payload else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            if usage_payload:
+                chunk["usage"] = usage_payload
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        pieces = [content[i:i + config.stream_chunk_chars]
+                  for i in range(0, len(content), config.stream_chunk_chars)] or [""]
+        time.sleep(latency * config.ttfb_fraction)
+        per_chunk = latency * (1 - config.ttfb_fraction) / len(pieces)
+        try:
+            event({"role": "assistant", "content": ""})
+            for piece in pieces:
+                event({"content": piece})
+                time.sleep(per_chunk)
+            event({}, finish_reason="stop")
+            if (request.get("stream_options") or {}).get("include_usage"):
+                event(None, usage_payload=usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_fake_server(config=None, host="127.0.0.1", port=0):
+    """
+    Start the fake server on a daemon thread.
+
+    Args:
+        config (FakeServerConfig): Server behaviour, defaults to FakeServerConfig()
+        host (str): Interface to bind
+        port (int): Port to bind, 0 for any free port
+
+    Returns:
+        tuple: (server, base_url) where base_url is suitable for OPENAI_BASE_URL
+    """
+    server = ThreadingHTTPServer((host, port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.config = config or FakeServerConfig()
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def add_config_arguments(parser):
+    """Add the FakeServerConfig options to an argparse parser."""
+    parser.add_argument("--latency-median", type=float, default=1.0, help="Median response latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Lognormal sigma of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of an HTTP 429")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Probability of hanging past the timeout")
+    parser.add_argument("--timeout-seconds", type=float, default=300.0, help="How long an injected hang lasts")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Probability of truncated JSON content")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+
+
+def config_from_args(args):
+    """Build a FakeServerConfig from parsed add_config_arguments options."""
+    return FakeServerConfig(
+        latency_median=args.latency_median, latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        timeout_rate=args.timeout_rate, timeout_seconds=args.timeout_seconds,
+        malformed_rate=args.malformed_rate, seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(config_from_args(args), host=args.host, port=args.port)
+    print(f"Fake OpenAI server listening; set OPENAI_BASE_URL={base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
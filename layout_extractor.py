@@ -0,0 +1,156 @@
+# layout_extractor.py
+import io
+import os
+import logging
+from collections import Counter
+
+from section_grammar import match_section
+from log_config import setup_logging
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# "auto" runs the layout pass only when plain-text section detection looks weak
+LAYOUT_EXTRACTION = os.environ.get("LAYOUT_EXTRACTION", "auto")
+# A line this much larger than the body font is a header even with an unknown name
+HEADER_SIZE_RATIO = 1.15
+HEADER_MAX_WORDS = 5
+# Gap between characters, in points, that counts as a space
+WORD_GAP = 1.5
+
+
+class LayoutBlock:
+    """
+    One line of a PDF page with its typography. Header blocks carry the
+    details section they open (None for a header with an unknown name).
+    """
+
+    __slots__ = ("text", "size", "bold", "x0", "top", "page", "is_header", "section")
+
+    def __init__(self, text, size, bold, x0, top, page):
+        self.text = text
+        self.size = size
+        self.bold = bold
+        self.x0 = x0
+        self.top = top
+        self.page = page
+        self.is_header = False
+        self.section = None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def is_bold(fontname):
+    name = fontname.lower()
+    return any(marker in name for marker in ("bold", "black", "heavy", "semibold"))
+
+
+def chars_text(chars):
+    """Join characters, inserting a space wherever there is a visible gap."""
+    parts = []
+    previous = None
+    for char in chars:
+        if previous is not None and char["x0"] - previous["x1"] > WORD_GAP and char["text"] != ' ':
+            parts.append(' ')
+        parts.append(char["text"])
+        previous = char
+    return ''.join(parts).strip()
+
+
+def style_runs(chars):
+    """Split a line's characters into runs of the same size and weight."""
+    runs = []
+    for char in chars:
+        if not char["text"].strip():
+            if runs:
+                runs[-1][2].append(char)
+            continue
+        style = (round(char["size"], 1), is_bold(char.get("fontname", "")))
+        if runs and runs[-1][0] == style[0] and runs[-1][1] == style[1]:
+            runs[-1][2].append(char)
+        else:
+            runs.append((style[0], style[1], [char]))
+    return runs
+
+
+def extract_layout_blocks(pdf_bytes):
+    """
+    Extract lines with font size, weight, position and page, and mark
+    section headers from typography in the same pass.
+
+    A line whose leading run is styled apart from the rest and names a
+    section (e.g. a bold "EXPERIENCE" run merged into the first job title)
+    is split into a header block and a body block.
+
+    Args:
+        pdf_bytes (bytes): PDF data
+
+    Returns:
+        list: LayoutBlock objects in reading order
+    """
+    blocks = []
+    size_weights = Counter()
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page_num, page in enumerate(pdf.pages):
+            for line in page.extract_text_lines(return_chars=True, strip=True):
+                runs = style_runs(line["chars"])
+                if not runs:
+                    continue
+                for size, _, chars in runs:
+                    size_weights[size] += len(chars)
+                first_size, first_bold, first_chars = runs[0]
+                lead = chars_text(first_chars)
+                lead_section = match_section(lead)
+                rest_chars = [char for _, _, chars in runs[1:] for char in chars]
+                if rest_chars and lead_section and (
+                        first_bold != runs[1][1] or first_size > runs[1][0]):
+                    header = LayoutBlock(lead, first_size, first_bold, first_chars[0]["x0"], line["top"], page_num)
+                    body = LayoutBlock(chars_text(rest_chars), runs[1][0], runs[1][1], rest_chars[0]["x0"],
+                                       line["top"], page_num)
+                    header.is_header = True
+                    header.section = lead_section
+                    blocks.extend([header, body])
+                    continue
+                dominant = max(runs, key=lambda run: len(run[2]))
+                blocks.append(LayoutBlock(line["text"], max(run[0] for run in runs),
+                                          dominant[1], line["x0"], line["top"], page_num))
+
+    body_size = size_weights.most_common(1)[0][0] if size_weights else 0
+    for block in blocks:
+        if block.is_header:
+            continue
+        section = match_section(block.text)
+        large = body_size and block.size >= body_size * HEADER_SIZE_RATIO
+        if section or (large and len(block.text.split()) <= HEADER_MAX_WORDS):
+            block.is_header = True
+            block.section = section
+    logger.debug(f"Layout extraction: {len(blocks)} blocks, body size {body_size}, "
+                  f"{sum(block.is_header for block in blocks)} headers")
+    return blocks
+
+
+def name_from_blocks(blocks):
+    """
+    Return the candidate's name: the largest line on the first page, when it
+    looks like a name rather than a title or contact line.
+    """
+    first_page = [block for block in blocks if block.page == 0]
+    if not first_page:
+        return None
+    largest = max(first_page, key=lambda block: (block.size, -block.top))
+    words = largest.text.split()
+    if largest.section is None and 1 < len(words) <= 4 and not any(ch.isdigit() or ch == '@' for ch in largest.text):
+        return largest.text
+    return None
+
+
+def blocks_to_text(blocks):
+    """Render blocks as plain text with every header on its own line."""
+    return '\n'.join(block.text for block in blocks) + '\n'
@@ -0,0 +1,239 @@
+# llm_cache.py
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Prompts and responses carry resume text, which is personal data, so the
+# disk tier is off unless a directory is configured
+DEFAULT_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", "")
+DEFAULT_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "256"))
+DEFAULT_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+DEFAULT_MAX_DISK_BYTES = int(os.environ.get("LLM_CACHE_MAX_DISK_MB", "100")) * 1024 * 1024
+
+
+def make_cache_key(model, system_prompt, user_prompt, response_format=None):
+    """
+    Build a content-addressed cache key for a chat completion request.
+
+    Args:
+        model (str): The model name
+        system_prompt (str): The system message content
+        user_prompt (str): The user message content
+        response_format (dict): The response_format argument, if any
+
+    Returns:
+        str: Hex SHA-256 digest identifying the request
+    """
+    payload = json.dumps(
+        [model, system_prompt, user_prompt, response_format],
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for LLM responses: an in-memory LRU in front of an optional
+    directory of JSON files (memory only when cache_dir is empty). Entries expire after ttl_seconds; the memory tier is bounded
+    by max_entries and the disk tier by max_disk_bytes (oldest files go first).
+
+    Values must be JSON-serializable. Both tiers hold them serialized, so
+    every get returns a fresh copy and callers may mutate what they get or set.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _expired(self, created):
+        return self.ttl_seconds > 0 and time.time() - created > self.ttl_seconds
+
+    def get(self, key, count=True):
+        """
+        Return the cached response for key, or None on a miss.
+
+        Args:
+            key (str): Cache key from make_cache_key
+            count (bool): Count the lookup in the hit/miss stats; re-checks of a
+                lookup that already missed pass False
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, serialized = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return json.loads(serialized)
+                del self._memory[key]
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            if count:
+                self.hits += 1
+                self.disk_hits += 1
+            self._remember(key, entry)
+        return json.loads(entry[1])
+
+    def set(self, key, value):
+        """Store a response under key in both tiers."""
+        entry = (time.time(), json.dumps(value, ensure_ascii=False))
+        with self._lock:
+            self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._disk_bytes = 0
+        for path, _, _ in self._disk_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Return hit/miss counters and current tier sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes or 0
+            }
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                record = json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable LLM cache entry {path}: {e}")
+            self._remove_disk(path)
+            return None
+        if self._expired(record.get("created", 0)):
+            self._remove_disk(path)
+            return None
+        return record["created"], json.dumps(record["value"], ensure_ascii=False)
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+                cache_file.write(f'{{"created": {json.dumps(entry[0])}, "value": {entry[1]}}}')
+            # An overwritten entry's file no longer counts towards the disk tier
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"Could not write LLM cache entry {path}: {e}")
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(s for _, s, _ in self._disk_files())
+            else:
+                self._disk_bytes += size - previous
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _remove_disk(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes = max(0, self._disk_bytes - size)
+
+    def _disk_files(self):
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return []
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict_disk(self):
+        files = sorted(self._disk_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        now = time.time()
+        for path, size, mtime in files:
+            expired = self.ttl_seconds > 0 and now - mtime > self.ttl_seconds
+            if total <= self.max_disk_bytes and not expired:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+        with self._lock:
+            self._disk_bytes = total
+
+
+# Process-wide cache shared by every Streamlit session
+llm_cache = LLMResponseCache()
@@ -0,0 +1,295 @@
+# llm_metrics.py
+import math
+import logging
+import threading
+import contextvars
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, math.inf)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, math.inf)
+
+# Per-run list of call records; set by start_run and shared with worker threads
+# that run inside a copied context
+_current_run = contextvars.ContextVar("llm_current_run", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if seen + count >= rank and count:
+                if math.isinf(bound):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound if not math.isinf(bound) else lower
+        return lower
+
+
+class LLMMetrics:
+    """
+    Process-wide accounting of LLM calls: latency, time to first token, token
+    counts, cache status and retries, aggregated per pipeline stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def _histogram(self, name, labels, buckets):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = Histogram(buckets)
+            self._histograms[key] = histogram
+        return histogram
+
+    def _increment(self, name, labels, amount=1):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, labels, value):
+        """Set a gauge such as the current rate limiter queue depth."""
+        with self._lock:
+            self._gauges[(name, labels)] = value
+
+    def record_queue_wait(self, priority, wait):
+        """
+        Record how long a request waited in the rate limiter queue.
+
+        Args:
+            priority (int): Queue priority of the request
+            wait (float): Seconds spent queued
+        """
+        with self._lock:
+            self._histogram("resume_llm_queue_wait_seconds", (("priority", priority),),
+                            LATENCY_BUCKETS).observe(wait)
+
+    def record_call(self, stage, latency, ttfb=None, prompt_tokens=0, completion_tokens=0,
+                    cache="miss", retries=0, queue_wait=0.0):
+        """
+        Record one LLM call.
+
+        Args:
+            stage (str): Pipeline stage (analysis, tips, rewrite, ...)
+            latency (float): Wall time in seconds
+            ttfb (float): Seconds until the first streamed token; None for non-streamed calls
+            prompt_tokens (int): Prompt tokens reported by the API
+            completion_tokens (int): Completion tokens reported by the API
+            cache (str): "miss", "hit", "coalesced" or "error"
+            retries (int): Retries needed before the call succeeded
+            queue_wait (float): Seconds spent in the rate limiter queue
+        """
+        record = {
+            "stage": stage,
+            "latency": latency,
+            "ttfb": ttfb,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cache": cache,
+            "retries": retries,
+            "queue_wait": queue_wait
+        }
+        with self._lock:
+            self._histogram("resume_llm_request_duration_seconds", (("stage", stage), ("cache", cache)),
+                            LATENCY_BUCKETS).observe(latency)
+            if ttfb is not None:
+                self._histogram("resume_llm_ttfb_seconds", (("stage", stage),), LATENCY_BUCKETS).observe(ttfb)
+            if cache == "miss":
+                self._histogram("resume_llm_prompt_tokens", (("stage", stage),), TOKEN_BUCKETS).observe(prompt_tokens)
+                self._histogram("resume_llm_completion_tokens", (("stage", stage),),
+                                TOKEN_BUCKETS).observe(completion_tokens)
+            self._increment("resume_llm_requests_total", (("stage", stage), ("cache", cache)))
+            self._increment("resume_llm_retries_total", (("stage", stage),), retries)
+
+        run = _current_run.get()
+        if run is not None:
+            run.append(record)
+        logger.debug(f"LLM call stage={stage} cache={cache} latency={latency:.3f}s "
+                      f"ttfb={ttfb if ttfb is None else round(ttfb, 3)} tokens={prompt_tokens}/{completion_tokens} "
+                      f"retries={retries} queue_wait={queue_wait:.3f}s")
+
+    def stage_quantiles(self, quantiles=(0.5, 0.95, 0.99)):
+        """
+        Estimate latency quantiles per stage across all cache statuses.
+
+        Returns:
+            dict: stage -> {"count": n, "p50": s, "p95": s, "p99": s}
+        """
+        with self._lock:
+            merged = {}
+            for (name, labels), histogram in self._histograms.items():
+                if name != "resume_llm_request_duration_seconds":
+                    continue
+                stage = dict(labels)["stage"]
+                target = merged.setdefault(stage, Histogram(LATENCY_BUCKETS))
+                target.counts = [a + b for a, b in zip(target.counts, histogram.counts)]
+                target.sum += histogram.sum
+                target.count += histogram.count
+        return {
+            stage: dict({"count": histogram.count},
+                        **{f"p{int(q * 100)}": round(histogram.quantile(q), 3) for q in quantiles})
+            for stage, histogram in merged.items()
+        }
+
+    def render_prometheus(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+        lines = []
+        with self._lock:
+            histogram_names = sorted({name for name, _ in self._histograms})
+            for name in histogram_names:
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if math.isinf(bound) else repr(float(bound))
+                        lines.append(f"{name}_bucket{label_text(labels, [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{label_text(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{label_text(labels)} {histogram.count}")
+            counter_names = sorted({name for name, _ in self._counters})
+            for name in counter_names:
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{label_text(labels)} {value}")
+            gauge_names = sorted({name for name, _ in self._gauges})
+            for name in gauge_names:
+                lines.append(f"# TYPE {name} gauge")
+                for (metric, labels), value in sorted(self._gauges.items()):
+                    if metric == name:
+                        lines.append(f"{name}{label_text(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def start_run():
+    """
+    Start collecting call records for the current pipeline run.
+
+    Worker threads must run inside contextvars.copy_context() to contribute.
+
+    Returns:
+        list: The run's call records, filled in as calls complete
+    """
+    run = []
+    _current_run.set(run)
+    return run
+
+
+def summarize_run(records):
+    """
+    Summarize a run's call records per stage.
+
+    Args:
+        records (list): Records collected since start_run
+
+    Returns:
+        list: One row per stage with call counts, latency, tokens and cache statuses
+    """
+    stages = {}
+    for record in records:
+        row = stages.setdefault(record["stage"], {
+            "stage": record["stage"], "calls": 0, "cache_hits": 0, "coalesced": 0, "retries": 0,
+            "total_latency_s": 0.0, "max_latency_s": 0.0, "max_ttfb_s": None, "queue_wait_s": 0.0,
+            "prompt_tokens": 0, "completion_tokens": 0
+        })
+        row["calls"] += 1
+        row["cache_hits"] += record["cache"] == "hit"
+        row["coalesced"] += record["cache"] == "coalesced"
+        row["retries"] += record["retries"]
+        row["total_latency_s"] = round(row["total_latency_s"] + record["latency"], 3)
+        row["max_latency_s"] = round(max(row["max_latency_s"], record["latency"]), 3)
+        row["queue_wait_s"] = round(row["queue_wait_s"] + record["queue_wait"], 3)
+        if record["ttfb"] is not None:
+            row["max_ttfb_s"] = round(max(row["max_ttfb_s"] or 0.0, record["ttfb"]), 3)
+        row["prompt_tokens"] += record["prompt_tokens"]
+        row["completion_tokens"] += record["completion_tokens"]
+    return list(stages.values())
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = llm_metrics.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """
+    Serve /metrics in the Prometheus text format from a daemon thread.
+    Safe to call on every Streamlit rerun; only the first call starts a server.
+
+    Args:
+        port (int): Port to listen on
+        host (str): Interface to bind
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.error(f"Could not start metrics server on port {port}: {e}")
+            return
+        threading.Thread(target=_server.serve_forever, name="llm-metrics", daemon=True).start()
+        logger.info(f"Serving LLM metrics on http://{host}:{port}/metrics")
+
+
+# Process-wide registry shared by every LLM call site
+llm_metrics = LLMMetrics()
@@ -0,0 +1,274 @@
+# local_analyzer.py
+import re
+import logging
+from collections import deque
+
+from section_grammar import BULLET_MARKERS
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Role family -> keywords an ATS would expect for it, most important first
+ROLE_KEYWORDS = {
+    "software": ["python", "java", "javascript", "sql", "git", "agile", "rest api", "cloud", "aws",
+                 "docker", "kubernetes", "ci/cd", "testing", "microservices", "code review"],
+    "data": ["python", "sql", "machine learning", "statistics", "pandas", "data visualization",
+             "tableau", "etl", "a/b testing", "data pipeline", "spark", "modeling", "excel"],
+    "marketing": ["seo", "sem", "content strategy", "social media", "google analytics", "campaign",
+                  "email marketing", "conversion", "brand", "ppc", "crm", "roi", "copywriting"],
+    "product": ["roadmap", "stakeholder", "user research", "agile", "kpi", "prioritization",
+                "a/b testing", "product strategy", "cross-functional", "requirements", "jira", "launch"],
+    "design": ["figma", "user experience", "ui", "prototyping", "wireframes", "user research",
+               "design system", "accessibility", "usability testing", "adobe"],
+    "sales": ["pipeline", "quota", "crm", "salesforce", "negotiation", "lead generation",
+              "account management", "closing", "revenue", "prospecting", "b2b"],
+    "finance": ["financial modeling", "forecasting", "budgeting", "excel", "variance analysis",
+                "gaap", "reporting", "valuation", "audit", "reconciliation"],
+    "management": ["leadership", "team building", "strategy", "budget", "stakeholder",
+                   "performance management", "hiring", "mentoring", "kpi", "operations"]
+}
+
+# Words in a job title that point at a role family
+ROLE_HINTS = {
+    "software": ["software", "developer", "engineer", "backend", "frontend", "full stack", "devops", "programmer"],
+    "data": ["data", "analyst", "analytics", "scientist", "machine learning", "ml", "bi"],
+    "marketing": ["marketing", "seo", "content", "growth", "brand", "social media"],
+    "product": ["product"],
+    "design": ["design", "designer", "ux", "ui"],
+    "sales": ["sales", "account executive", "business development"],
+    "finance": ["finance", "financial", "accountant", "accounting", "controller"],
+    "management": ["manager", "director", "head", "lead", "chief"]
+}
+
+GENERIC_KEYWORDS = ["communication", "collaboration", "problem solving", "leadership", "project management"]
+
+# Weak phrase -> (suggestion, reason)
+WEAK_PHRASES = {
+    "responsible for": ("Start with an action verb such as 'Led', 'Owned' or 'Delivered'",
+                        "Describes duties rather than achievements"),
+    "duties included": ("List concrete results instead of duties", "Reads like a job description"),
+    "worked on": ("Say what you built or changed and its effect", "Too vague to show impact"),
+    "helped with": ("Describe your specific contribution", "Understates your role"),
+    "assisted in": ("Describe your specific contribution", "Understates your role"),
+    "involved in": ("State what you did and the outcome", "Too vague to show ownership"),
+    "participated in": ("State what you did and the outcome", "Too vague to show ownership"),
+    "team player": ("Give an example of successful collaboration", "Cliché that recruiters skip"),
+    "hard worker": ("Show results that demonstrate your work ethic", "Unsupported claim"),
+    "detail-oriented": ("Show a result that required precision", "Unsupported claim"),
+    "results-driven": ("Lead with a measurable result instead", "Cliché without evidence"),
+    "go-getter": ("Replace with a concrete achievement", "Informal cliché"),
+    "think outside the box": ("Describe the creative solution you delivered", "Overused cliché"),
+    "various tasks": ("Name the most important tasks", "Too vague"),
+    "etc": ("List the items that matter and drop the rest", "Signals an incomplete list"),
+    "familiar with": ("State your proficiency level or a project using it", "Signals weak skills"),
+    "tried to": ("Describe what you achieved", "Suggests failure"),
+    "in charge of": ("Start with an action verb such as 'Led' or 'Managed'", "Describes duties, not results")
+}
+
+_DIGIT_RE = re.compile(r'\d')
+_WORD_CHAR_RE = re.compile(r'\w')
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every occurrence of every pattern in a single
+    pass over the text, independent of how many patterns there are.
+    Matching is case-insensitive and only whole-word matches are reported.
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for pattern in patterns:
+            self._add(pattern.lower())
+        self._build()
+
+    def _add(self, pattern):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text):
+        """
+        Find whole-word pattern occurrences.
+
+        Args:
+            text (str): Text to search
+
+        Returns:
+            list: (start, end, pattern) tuples in text order
+        """
+        lowered = text.lower()
+        matches = []
+        state = 0
+        for index, char in enumerate(lowered):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._output[state]:
+                start = index - len(pattern) + 1
+                end = index + 1
+                before_ok = start == 0 or not _WORD_CHAR_RE.match(lowered[start - 1])
+                after_ok = end == len(lowered) or not _WORD_CHAR_RE.match(lowered[end])
+                if before_ok and after_ok:
+                    matches.append((start, end, pattern))
+        return matches
+
+
+_weak_phrase_matcher = AhoCorasick(WEAK_PHRASES)
+_keyword_matchers = {}
+
+
+def role_keywords(job_role):
+    """
+    Pick the keyword lexicon for a job role.
+
+    Args:
+        job_role (str): The target job role
+
+    Returns:
+        list: Keywords, most important first
+    """
+    role = job_role.lower()
+    keywords = []
+    for family, hints in ROLE_HINTS.items():
+        if any(re.search(rf'\b{re.escape(hint)}\b', role) for hint in hints):
+            keywords.extend(k for k in ROLE_KEYWORDS[family] if k not in keywords)
+    keywords.extend(k for k in GENERIC_KEYWORDS if k not in keywords)
+    return keywords
+
+
+def keyword_matcher(keywords):
+    """Return a cached matcher for a keyword list."""
+    key = tuple(keywords)
+    matcher = _keyword_matchers.get(key)
+    if matcher is None:
+        matcher = AhoCorasick(keywords)
+        _keyword_matchers[key] = matcher
+    return matcher
+
+
+def resume_bullets(details):
+    """Return the achievement-style lines from extract_resume_details output."""
+    lines = details.get('experience', []) + details.get('projects', [])
+    return [line for line in lines if line.startswith(BULLET_MARKERS) or len(line.split()) > 6]
+
+
+def analyze_resume_local(resume_text, job_role, details):
+    """
+    Analyze a resume without a network call, producing the same schema as
+    resume_analyzer.analyze_resume.
+
+    Args:
+        resume_text (str): The original resume text
+        job_role (str): The target job role
+        details (dict): Output of extract_resume_details for the same text
+
+    Returns:
+        dict: Analysis results
+    """
+    keywords = role_keywords(job_role)
+    found = {pattern for _, _, pattern in keyword_matcher(keywords).find_all(resume_text)}
+    missing = [k for k in keywords if k not in found]
+    score = len(found) / len(keywords) if keywords else 0.0
+
+    weak_phrases = []
+    seen_phrases = set()
+    for start, end, pattern in _weak_phrase_matcher.find_all(resume_text):
+        if pattern in seen_phrases:
+            continue
+        seen_phrases.add(pattern)
+        line_start = resume_text.rfind('\n', 0, start) + 1
+        line_end = resume_text.find('\n', end)
+        context = resume_text[line_start:line_end if line_end != -1 else len(resume_text)].strip()
+        suggestion, reason = WEAK_PHRASES[pattern]
+        weak_phrases.append({"phrase": context or pattern, "suggestion": suggestion, "reason": reason})
+
+    quantification = []
+    for line in resume_bullets(details):
+        if not _DIGIT_RE.search(line):
+            quantification.append({
+                "current_text": line.lstrip(''.join(BULLET_MARKERS) + ' '),
+                "suggestion": "Add a number: team size, percentage change, revenue, time saved or volume handled",
+                "reason": "Quantified achievements are more credible and easier to scan"
+            })
+
+    strengths = []
+    if found:
+        strengths.append(f"Mentions relevant keywords: {', '.join(sorted(found)[:8])}")
+    if details.get('experience'):
+        strengths.append("Includes a work experience section")
+    if len(details.get('skills', [])) >= 5:
+        strengths.append("Lists a broad set of skills")
+
+    weaknesses = []
+    if missing:
+        weaknesses.append(f"Missing {len(missing)} common {job_role} keywords")
+    if quantification:
+        weaknesses.append(f"{len(quantification)} achievement lines have no measurable results")
+    if weak_phrases:
+        weaknesses.append(f"Uses {len(weak_phrases)} weak or generic phrases")
+    if not details.get('summary'):
+        weaknesses.append("No professional summary detected")
+
+    high_priority = max(3, len(keywords) // 3)
+    return {
+        "job_match_score": round(min(0.95, max(0.05, score)), 2),
+        "strengths": strengths,
+        "weaknesses": weaknesses,
+        "weak_phrases": weak_phrases,
+        "missing_keywords": [
+            {
+                "keyword": keyword,
+                "importance": "high" if index < high_priority else "medium",
+                "suggestion": f"Mention '{keyword}' where it reflects your actual experience",
+                "context": f"'{keyword}' commonly appears in {job_role} job descriptions"
+            }
+            for index, keyword in enumerate(missing)
+        ],
+        "quantification_opportunities": quantification
+    }
+
+
+def merge_analysis(llm_results, local_results):
+    """
+    Combine LLM and local analyses: the LLM result wins, and any list it left
+    empty, or a job_match_score it left as None, is filled from the local
+    analysis. A job_match_score of 0 is a real score and is kept.
+
+    Args:
+        llm_results (dict): Analysis from the LLM
+        local_results (dict): Analysis from analyze_resume_local
+
+    Returns:
+        dict: Merged analysis results
+    """
+    merged = dict(local_results)
+    for key, value in llm_results.items():
+        missing = value is None if key == "job_match_score" else not value
+        if not missing or key not in merged:
+            merged[key] = value
+    return merged
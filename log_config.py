@@ -0,0 +1,155 @@
+# log_config.py
+import os
+import sys
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# The Debug tab reads warnings and errors back from this file
+LOG_FILE = os.environ.get("LOG_FILE", "resume_enhancer.log")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+# Per-logger overrides, e.g. "resume_analyzer=DEBUG,pdf_utils=WARNING"
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "pdfminer=WARNING")
+LOG_MAX_MB = int(os.environ.get("LOG_MAX_MB", "10"))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", "5"))
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+WORKER_LOG_FORMAT = '%(asctime)s - %(levelname)s - [worker %(process)d] %(message)s'
+
+_listener = None
+_handler = None
+_setup_lock = threading.Lock()
+
+
+class Lazy:
+    """
+    Defer building a log argument until a handler actually formats it:
+    logger.debug("Details: %s", Lazy(json.dumps, details, indent=2)) costs
+    nothing when DEBUG is off.
+    """
+
+    __slots__ = ("fn", "args", "kwargs")
+
+    def __init__(self, fn, *args, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return str(self.fn(*self.args, **self.kwargs))
+
+
+def parse_levels(spec):
+    """
+    Parse per-logger level overrides.
+
+    Args:
+        spec (str): Comma-separated name=LEVEL pairs
+
+    Returns:
+        dict: Logger name -> level name, or number when given as digits
+    """
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        level = level.strip().upper()
+        if name.strip() and level:
+            levels[name.strip()] = int(level) if level.isdigit() else level
+    return levels
+
+
+def _file_handler():
+    handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_MB * 1024 * 1024,
+                                  backupCount=LOG_BACKUP_COUNT, encoding='utf-8', delay=True)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def _worker_handler():
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(WORKER_LOG_FORMAT))
+    return handler
+
+
+def _in_worker_process():
+    """
+    True in multiprocessing children, including while they re-import the
+    main module (before parent_process() is set) and in the forkserver.
+    """
+    process = multiprocessing.current_process()
+    return (multiprocessing.parent_process() is not None or process.name != 'MainProcess'
+            or getattr(process, '_inheriting', False))
+
+
+def setup_logging():
+    """
+    Route the root logger through a queue to a background thread that owns the
+    log file, so request threads never wait on disk writes. Safe to call from
+    every module; only the first call configures anything.
+
+    Worker processes (the PDF page and bulk render pools) write straight to
+    stderr instead: they exit without stopping a listener, so queued records
+    would be lost, and only the main process may rotate the file.
+    """
+    global _listener, _handler
+    with _setup_lock:
+        if _handler is not None:
+            return
+        root = logging.getLogger()
+        # Every module configures logging on import, so a typo must not stop the app from starting
+        invalid = []
+        try:
+            root.setLevel(int(LOG_LEVEL) if LOG_LEVEL.strip().isdigit() else LOG_LEVEL.strip().upper())
+        except ValueError:
+            root.setLevel(logging.INFO)
+            invalid.append(f"LOG_LEVEL={LOG_LEVEL}")
+        for name, level in parse_levels(LOG_LEVELS).items():
+            try:
+                logging.getLogger(name).setLevel(level)
+            except ValueError:
+                invalid.append(f"{name}={level}")
+        if _in_worker_process():
+            _handler = _worker_handler()
+        else:
+            log_queue = queue.SimpleQueue()
+            _handler = QueueHandler(log_queue)
+            _listener = QueueListener(log_queue, _file_handler(), respect_handler_level=True)
+            _listener.start()
+        root.addHandler(_handler)
+    for entry in invalid:
+        logging.getLogger(__name__).warning(f"Ignoring invalid log level {entry}")
+
+
+def stop_logging():
+    """Write out queued records and stop the background writer."""
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger().removeHandler(_handler)
+        _listener = None
+        _handler = None
+
+
+def _after_fork_in_child():
+    """
+    A forked child inherits the queue handler but not the writer thread, so
+    switch it to stderr like the pool workers.
+    """
+    global _listener, _handler, _setup_lock
+    _setup_lock = threading.Lock()
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_handler)
+    _listener = None
+    _handler = _worker_handler()
+    root.addHandler(_handler)
+
+
+atexit.register(stop_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,266 @@
+# openai_client.py
+import os
+import time
+import random
+import logging
+import threading
+
+import httpx
+import openai as openai_sdk
+from openai import OpenAI
+
+from llm_metrics import llm_metrics
+from rate_limiter import llm_limiter, estimate_request_tokens
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+# Point at a compatible server (e.g. a local stand-in); None means api.openai.com
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL")
+CONNECT_TIMEOUT = float(os.environ.get("OPENAI_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("OPENAI_READ_TIMEOUT", "120"))
+MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "50"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.environ.get("OPENAI_KEEPALIVE_EXPIRY", "60"))
+MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.environ.get("OPENAI_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.environ.get("OPENAI_RETRY_MAX_DELAY", "20"))
+# How long every queued request is held after a 429 without a Retry-After header
+RATE_LIMIT_PAUSE = float(os.environ.get("OPENAI_RATE_LIMIT_PAUSE", "2"))
+
+# Errors worth retrying; anything else (bad request, auth) fails immediately
+RETRYABLE_ERRORS = (
+    openai_sdk.APIConnectionError,
+    openai_sdk.APITimeoutError,
+    openai_sdk.RateLimitError,
+    openai_sdk.InternalServerError
+)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def build_http_client():
+    """
+    Build the pooled httpx client used underneath the OpenAI SDK.
+
+    Returns:
+        httpx.Client: Keep-alive client with explicit timeouts and pool limits
+    """
+    if not HTTP2_AVAILABLE:
+        logger.warning("h2 is not installed, OpenAI client falls back to HTTP/1.1")
+    return httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        )
+    )
+
+
+def get_openai_client():
+    """
+    Return the process-wide OpenAI client, creating it on first use.
+
+    Every Streamlit session shares it, so concurrent requests reuse warm
+    TLS connections from one pool. SDK-level retries are disabled because
+    with_retries applies its own jittered backoff.
+
+    Returns:
+        OpenAI: The shared client
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(
+                    api_key=OPENAI_API_KEY,
+                    base_url=OPENAI_BASE_URL,
+                    max_retries=0,
+                    http_client=build_http_client()
+                )
+    return _client
+
+
+def configure_openai_client(base_url=None, api_key=None):
+    """
+    Replace the shared client, e.g. to point it at a local stand-in server.
+
+    Args:
+        base_url (str): API base URL, None for the default
+        api_key (str): API key, None to keep OPENAI_API_KEY
+    """
+    global _client
+    with _client_lock:
+        _client = OpenAI(
+            api_key=api_key or OPENAI_API_KEY,
+            base_url=base_url,
+            max_retries=0,
+            http_client=build_http_client()
+        )
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff delay for a zero-based retry attempt."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+def with_retries(fn, description="OpenAI request", max_retries=MAX_RETRIES, stats=None):
+    """
+    Call fn, retrying transient OpenAI errors with jittered exponential backoff.
+
+    Args:
+        fn (callable): Zero-argument function performing the request
+        description (str): Label used in log messages
+        max_retries (int): Retries after the first attempt
+        stats (dict): Optional dict whose "retries" entry is incremented per retry
+
+    Returns:
+        The result of fn
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except RETRYABLE_ERRORS as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"{description} failed ({type(e).__name__}), retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+            if stats is not None:
+                stats["retries"] = stats.get("retries", 0) + 1
+
+
+def retry_after_seconds(error):
+    """Read the Retry-After header of a rate limit error, or fall back to RATE_LIMIT_PAUSE."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return RATE_LIMIT_PAUSE
+
+
+def rate_limited(fn, estimated_tokens, stats):
+    """
+    Wrap one request attempt so it first waits its turn in the shared rate
+    limiter, and pauses the limiter for everyone when the provider returns 429.
+
+    Args:
+        fn (callable): Zero-argument function performing the request
+        estimated_tokens (int): Tokens to charge against the token bucket
+        stats (dict): Dict whose "queue_wait" entry accumulates seconds queued
+
+    Returns:
+        callable: Zero-argument function for with_retries
+    """
+    def attempt():
+        stats["queue_wait"] = stats.get("queue_wait", 0.0) + llm_limiter.acquire(estimated_tokens)
+        try:
+            return fn()
+        except openai_sdk.RateLimitError as e:
+            llm_limiter.pause(retry_after_seconds(e))
+            raise
+    return attempt
+
+
+class InstrumentedStream:
+    """
+    Wraps a streamed chat completion and records its metrics once the stream
+    has been consumed: time to the first content token, total latency and the
+    token usage reported in the final chunk.
+    """
+
+    def __init__(self, stream, stage, start, stats, estimated_tokens):
+        self._stream = stream
+        self._stage = stage
+        self._start = start
+        self._stats = stats
+        self._estimated_tokens = estimated_tokens
+
+    def __iter__(self):
+        ttfb = None
+        usage = None
+        outcome = "error"
+        try:
+            for chunk in self._stream:
+                if ttfb is None and chunk.choices and chunk.choices[0].delta.content:
+                    ttfb = time.perf_counter() - self._start - self._stats["queue_wait"]
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                yield chunk
+            outcome = "miss"
+        finally:
+            if usage:
+                llm_limiter.settle(self._estimated_tokens, usage.total_tokens)
+            llm_metrics.record_call(
+                self._stage, time.perf_counter() - self._start - self._stats["queue_wait"], ttfb,
+                usage.prompt_tokens if usage else 0, usage.completion_tokens if usage else 0,
+                cache=outcome, retries=self._stats["retries"], queue_wait=self._stats["queue_wait"]
+            )
+
+
+def create_chat_completion(stage="llm", **request):
+    """
+    Create a chat completion on the shared client with retries, after waiting
+    its turn in the shared rate limiter, recording latency, time to first
+    token (streamed calls only), token usage, retries and queue wait for the stage.
+
+    Args:
+        stage (str): Pipeline stage label for metrics
+        **request: Arguments for chat.completions.create
+
+    Returns:
+        The SDK response (an instrumented stream when stream=True)
+    """
+    stats = {"retries": 0, "queue_wait": 0.0}
+    estimated_tokens = estimate_request_tokens(request)
+    start = time.perf_counter()
+
+    def record_error():
+        llm_metrics.record_call(stage, time.perf_counter() - start - stats["queue_wait"], cache="error",
+                                retries=stats["retries"], queue_wait=stats["queue_wait"])
+
+    if request.get("stream"):
+        request.setdefault("stream_options", {"include_usage": True})
+        try:
+            stream = with_retries(
+                rate_limited(lambda: get_openai_client().chat.completions.create(**request), estimated_tokens, stats),
+                description="Chat completion stream", stats=stats
+            )
+        except Exception:
+            record_error()
+            raise
+        return InstrumentedStream(stream, stage, start, stats, estimated_tokens)
+
+    # A non-streamed response's headers only arrive once the whole completion
+    # is generated, so its time to first byte is its latency: record none
+    try:
+        response = with_retries(
+            rate_limited(lambda: get_openai_client().chat.completions.create(**request), estimated_tokens, stats),
+            description="Chat completion", stats=stats
+        )
+    except Exception:
+        record_error()
+        raise
+    usage = getattr(response, "usage", None)
+    if usage:
+        llm_limiter.settle(estimated_tokens, usage.total_tokens)
+    llm_metrics.record_call(
+        stage, time.perf_counter() - start - stats["queue_wait"], None,
+        usage.prompt_tokens if usage else 0, usage.completion_tokens if usage else 0,
+        cache="miss", retries=stats["retries"], queue_wait=stats["queue_wait"]
+    )
+    return response
@@ -0,0 +1,214 @@
+# pdf_backends.py
+import io
+import os
+import logging
+import threading
+
+import PyPDF2
+
+from section_grammar import count_section_headers
+from log_config import setup_logging
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Backends tried in order; later ones only run when earlier output looks degraded
+PDF_BACKEND_ORDER = [name.strip() for name in
+                     os.environ.get("PDF_BACKEND_ORDER", "pypdfium2,pdfplumber,pypdf2").split(',') if name.strip()]
+# Text with fewer recognizable section headers than this counts as degraded
+MIN_SECTION_HEADERS = int(os.environ.get("PDF_MIN_SECTION_HEADERS", "2"))
+# Mean word length above this means spaces were lost during extraction
+MAX_MEAN_WORD_LENGTH = 12
+
+class PDFBackend:
+    """
+    A PDF text extractor. Backends work on raw bytes and page ranges so the
+    same backend can run in this process or in a worker process.
+    """
+
+    name = None
+
+    def available(self):
+        return True
+
+    def page_count(self, pdf_bytes):
+        raise NotImplementedError
+
+    def extract_pages(self, pdf_bytes, start=0, stop=None):
+        """
+        Extract the text of pages [start, stop).
+
+        Args:
+            pdf_bytes (bytes): PDF data
+            start (int): First page
+            stop (int): Page after the last one, None for the end
+
+        Returns:
+            list: Text of each page
+        """
+        raise NotImplementedError
+
+
+class PypdfiumBackend(PDFBackend):
+    """PDFium via pypdfium2: fast, good reading order for most single-column resumes."""
+
+    name = "pypdfium2"
+    # PDFium is not thread-safe; Streamlit sessions share the process
+    _lock = threading.Lock()
+
+    def available(self):
+        return pdfium is not None
+
+    def page_count(self, pdf_bytes):
+        with self._lock:
+            document = pdfium.PdfDocument(pdf_bytes)
+            try:
+                return len(document)
+            finally:
+                document.close()
+
+    def extract_pages(self, pdf_bytes, start=0, stop=None):
+        pages = []
+        with self._lock:
+            document = pdfium.PdfDocument(pdf_bytes)
+            try:
+                for page_num in range(start, len(document) if stop is None else stop):
+                    page = document[page_num]
+                    text_page = page.get_textpage()
+                    text = text_page.get_text_bounded().replace('\r\n', '\n').replace('\r', '\n')
+                    pages.append(text if text.endswith('\n') else text + '\n')
+                    text_page.close()
+                    page.close()
+            finally:
+                document.close()
+        return pages
+
+
+class PdfplumberBackend(PDFBackend):
+    """pdfminer via pdfplumber: slower, layout-aware, copes with multi-column layouts."""
+
+    name = "pdfplumber"
+
+    def available(self):
+        return pdfplumber is not None
+
+    def page_count(self, pdf_bytes):
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as document:
+            return len(document.pages)
+
+    def extract_pages(self, pdf_bytes, start=0, stop=None):
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as document:
+            return [(page.extract_text() or "") + "\n" for page in document.pages[start:stop]]
+
+
+class PyPDF2Backend(PDFBackend):
+    """Pure-Python PyPDF2, the last resort."""
+
+    name = "pypdf2"
+
+    def page_count(self, pdf_bytes):
+        return len(PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+    def extract_pages(self, pdf_bytes, start=0, stop=None):
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        stop = len(pdf_reader.pages) if stop is None else stop
+        return [pdf_reader.pages[page_num].extract_text() or "" for page_num in range(start, stop)]
+
+
+PDF_BACKENDS = {}
+
+
+def register_backend(backend):
+    """Add a backend to the registry under its name."""
+    PDF_BACKENDS[backend.name] = backend
+
+
+def get_backend(name):
+    """Return a registered backend by name."""
+    return PDF_BACKENDS[name]
+
+
+def available_backends(order=None):
+    """
+    Return the usable backends in preference order.
+
+    Args:
+        order (list): Backend names, defaults to PDF_BACKEND_ORDER
+
+    Returns:
+        list: PDFBackend instances whose libraries are installed
+    """
+    backends = []
+    for name in order or PDF_BACKEND_ORDER:
+        backend = PDF_BACKENDS.get(name)
+        if backend is None:
+            logger.warning(f"Unknown PDF backend '{name}'")
+        elif backend.available():
+            backends.append(backend)
+    return backends
+
+
+def looks_degraded(text):
+    """
+    Heuristic check for extraction output that lost structure: empty text,
+    too few section headers, or words run together.
+
+    Args:
+        text (str): Extracted text
+
+    Returns:
+        bool: True when another backend should be tried
+    """
+    words = text.split()
+    if not words:
+        return True
+    if count_section_headers(text) < MIN_SECTION_HEADERS:
+        return True
+    return sum(len(word) for word in words) / len(words) > MAX_MEAN_WORD_LENGTH
+
+
+class BackendStats:
+    """Per-backend call counts, timings and fallback outcomes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, backend, seconds, pages=0, failed=False, degraded=False):
+        with self._lock:
+            row = self._stats.setdefault(backend, {"calls": 0, "pages": 0, "seconds": 0.0,
+                                                   "failures": 0, "degraded": 0})
+            row["calls"] += 1
+            row["pages"] += pages
+            row["seconds"] += seconds
+            row["failures"] += failed
+            row["degraded"] += degraded
+
+    def stats(self):
+        """Return per-backend totals with mean latency and pages per second."""
+        with self._lock:
+            return {
+                name: dict(row, seconds=round(row["seconds"], 3),
+                           mean_ms=round(row["seconds"] / row["calls"] * 1000, 2) if row["calls"] else 0.0,
+                           pages_per_s=round(row["pages"] / row["seconds"], 1) if row["seconds"] else 0.0)
+                for name, row in self._stats.items()
+            }
+
+
+register_backend(PypdfiumBackend())
+register_backend(PdfplumberBackend())
+register_backend(PyPDF2Backend())
+
+# Process-wide timings shown in the Debug tab
+pdf_backend_stats = BackendStats()
@@ -0,0 +1,304 @@
+# pdf_layout.py
+import logging
+import threading
+from fpdf import FPDF
+
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+FONT_FAMILY = "Arial"
+MARGIN = 15
+SIDEBAR_WIDTH = 50
+MAIN_X = 70
+# FPDF's default automatic page break margin
+BOTTOM_MARGIN = 20
+# FPDF's horizontal padding inside a cell
+CELL_MARGIN = 1
+# Distinct (style, size, word) measurements kept before the cache starts over
+WIDTH_CACHE_MAX_ENTRIES = 50000
+
+# (style, size in points, line height in mm)
+HEADER_STYLE = ('B', 12, 8)
+NAME_STYLE = ('B', 18, 12)
+TITLE_STYLE = ('B', 10, 5)
+BODY_STYLE = ('', 10, 5)
+SIDEBAR_STYLE = ('', 9, 5)
+
+BULLET = '•'
+EXTRA_SECTIONS = ['certifications', 'projects', 'awards', 'publications', 'hobbies_interests']
+SECTION_LABELS = {
+    'contact': "CONTACT",
+    'skills': "SKILLS",
+    'summary': "PROFESSIONAL SUMMARY",
+    'experience': "PROFESSIONAL EXPERIENCE",
+    'education': "EDUCATION",
+    'hobbies_interests': "HOBBIES & INTERESTS"
+}
+
+
+def pdf_text(text):
+    """
+    Map text onto the code points the core fonts can show. They use the
+    cp1252 character set, so e.g. '•' and '–' work once re-encoded;
+    anything else becomes '?'.
+    """
+    return text.encode('cp1252', 'replace').decode('latin-1')
+
+
+def pdf_bytes(pdf):
+    """Return a finished FPDF document as bytes (fpdf 1.7 returns str, fpdf2 bytearray)."""
+    output = pdf.output(dest='S')
+    return bytes(output) if isinstance(output, (bytes, bytearray)) else output.encode('latin-1')
+
+
+def strip_marker(line):
+    """Drop a leading bullet or markdown header marker from a line."""
+    return line.lstrip('#•-* \t')
+
+
+class _Flow:
+    """
+    One column of text flowing down the pages. Each column keeps its own page
+    and y position, so an overflowing sidebar continues in the sidebar of the
+    next page instead of pushing the main column down.
+    """
+
+    __slots__ = ("template", "x", "width", "y", "page", "placed")
+
+    def __init__(self, template, x, width, placed):
+        self.template = template
+        self.x = x
+        self.width = width
+        self.y = MARGIN
+        self.page = 0
+        self.placed = placed
+
+    def _room(self, height):
+        if self.y + height > self.template.bottom:
+            self.page += 1
+            self.y = MARGIN
+
+    def lines(self, text, style, indent=0, bullet=False):
+        """Wrap text to the column and place each line, breaking pages as needed."""
+        font_style, size, height = style
+        wrapped = self.template.wrap(text, font_style, size, self.width - indent)
+        for number, line in enumerate(wrapped):
+            self._room(height)
+            baseline = self.y + height / 2 + 0.3 * size * 25.4 / 72
+            if bullet and number == 0:
+                self.placed.append((self.page, font_style, size, self.x + indent - 5 + CELL_MARGIN, baseline,
+                                    self.template.bullet))
+            if line:
+                self.placed.append((self.page, font_style, size, self.x + indent + CELL_MARGIN, baseline, line))
+            self.y += height
+
+    def header(self, key):
+        """Place a section header, keeping it on the same page as the first body line."""
+        self._room(HEADER_STYLE[2] + BODY_STYLE[2])
+        self.lines(self.template.labels[key], HEADER_STYLE)
+
+    def gap(self, height):
+        self.y += height
+
+
+class PDFTemplate:
+    """
+    The resume's two-column PDF layout with everything that does not depend
+    on the resume worked out once: page geometry, styles, the section header
+    labels and the divider. Word widths are measured once per font and
+    cached across renders, so a render only wraps and places the content.
+    """
+
+    def __init__(self):
+        probe = FPDF(orientation='P', unit='mm', format='A4')
+        probe.add_page()
+        self._probe = probe
+        self.page_width = probe.w
+        self.bottom = probe.h - BOTTOM_MARGIN
+        self.main_width = probe.w - MARGIN - MAIN_X
+        self.labels = {key: pdf_text(SECTION_LABELS.get(key, key.upper())) for key in
+                       ['contact', 'skills', 'summary', 'experience', 'education'] + EXTRA_SECTIONS}
+        self.bullet = pdf_text(BULLET)
+        self._widths = {}
+        self._lock = threading.Lock()
+        self.width_hits = 0
+        self.width_misses = 0
+
+    def width(self, text, style, size):
+        """Return the width of text in mm, measuring it only the first time."""
+        key = (style, size, text)
+        width = self._widths.get(key)
+        if width is not None:
+            self.width_hits += 1
+            return width
+        with self._lock:
+            self._probe.set_font(FONT_FAMILY, style, size)
+            width = self._probe.get_string_width(text)
+            if len(self._widths) >= WIDTH_CACHE_MAX_ENTRIES:
+                self._widths.clear()
+            self._widths[key] = width
+            self.width_misses += 1
+        return width
+
+    def wrap(self, text, style, size, width):
+        """
+        Break text into lines that fit a cell of the given width, like
+        FPDF.multi_cell but with cached word widths.
+
+        Args:
+            text (str): Text already passed through pdf_text; newlines are kept
+            style (str): Font style
+            size (float): Font size in points
+            width (float): Cell width in mm
+
+        Returns:
+            list: Lines of text
+        """
+        usable = width - 2 * CELL_MARGIN
+        space = self.width(' ', style, size)
+        lines = []
+        for paragraph in text.split('\n'):
+            line = []
+            line_width = 0.0
+            for word in paragraph.split():
+                word_width = self.width(word, style, size)
+                if word_width > usable:
+                    # Longer than a whole line: break it between characters
+                    if line:
+                        lines.append(' '.join(line))
+                    line, line_width = [], 0.0
+                    chunk, chunk_width = '', 0.0
+                    for char in word:
+                        char_width = self.width(char, style, size)
+                        if chunk and chunk_width + char_width > usable:
+                            lines.append(chunk)
+                            chunk, chunk_width = '', 0.0
+                        chunk += char
+                        chunk_width += char_width
+                    line, line_width = [chunk], chunk_width
+                elif line and line_width + space + word_width > usable:
+                    lines.append(' '.join(line))
+                    line, line_width = [word], word_width
+                else:
+                    line_width += (space if line else 0.0) + word_width
+                    line.append(word)
+            lines.append(' '.join(line))
+        return lines
+
+    def layout(self, sections):
+        """
+        Flow the sections into the sidebar and main columns.
+
+        Args:
+            sections (dict): Parsed sections from parse_markdown_resume
+
+        Returns:
+            tuple: (placed text runs as (page, style, size, x, baseline, text),
+                y of the divider under the name, page count)
+        """
+        placed = []
+        sidebar = _Flow(self, MARGIN, SIDEBAR_WIDTH, placed)
+        main = _Flow(self, MAIN_X, self.main_width, placed)
+
+        if 'contact' in sections:
+            sidebar.header('contact')
+            contact = ' | '.join(line.strip() for line in sections['contact'].split('\n') if line.strip())
+            sidebar.lines(pdf_text(contact), SIDEBAR_STYLE)
+            sidebar.gap(5)
+
+        if 'skills' in sections:
+            sidebar.header('skills')
+            for skill in sections['skills'].split('\n'):
+                if strip_marker(skill):
+                    sidebar.lines(pdf_text(f"{BULLET} {strip_marker(skill)}"), SIDEBAR_STYLE)
+            sidebar.gap(5)
+
+        if 'name' in sections:
+            main.lines(pdf_text(sections['name'].upper()), NAME_STYLE)
+            main.gap(3)
+        divider_y = main.y
+        main.gap(3)
+
+        if 'summary' in sections:
+            main.header('summary')
+            main.lines(pdf_text(sections['summary']), BODY_STYLE)
+            main.gap(5)
+
+        for key in ('experience', 'education'):
+            if key not in sections:
+                continue
+            main.header(key)
+            for entry in sections[key].split('\n\n'):
+                if not entry.strip():
+                    continue
+                entry_parts = entry.strip().split('\n', 1)
+                main.lines(pdf_text(strip_marker(entry_parts[0])), TITLE_STYLE)
+                if len(entry_parts) > 1:
+                    for line in entry_parts[1].split('\n'):
+                        if not line.strip():
+                            continue
+                        if key == 'experience':
+                            main.lines(pdf_text(strip_marker(line)), BODY_STYLE, indent=10, bullet=True)
+                        else:
+                            main.lines(pdf_text(line.strip()), BODY_STYLE)
+                main.gap(3)
+
+        for key in EXTRA_SECTIONS:
+            if key in sections:
+                main.header(key)
+                main.lines(pdf_text(sections[key]), BODY_STYLE)
+                main.gap(5)
+
+        return placed, divider_y, max(sidebar.page, main.page) + 1
+
+    def render(self, sections):
+        """
+        Render parsed sections to a PDF.
+
+        Args:
+            sections (dict): Parsed sections from parse_markdown_resume
+
+        Returns:
+            bytes: PDF file as bytes
+        """
+        placed, divider_y, pages = self.layout(sections)
+        placed.sort(key=lambda run: run[0])
+
+        pdf = FPDF(orientation='P', unit='mm', format='A4')
+        pdf.set_margins(MARGIN, MARGIN, MARGIN)
+        # Pagination is done in layout()
+        pdf.set_auto_page_break(False)
+        current_page = -1
+        current_font = None
+        for page, style, size, x, baseline, text in placed:
+            while current_page < page:
+                pdf.add_page()
+                current_page += 1
+                current_font = None
+                if current_page == 0:
+                    pdf.line(MAIN_X, divider_y, self.page_width - MARGIN, divider_y)
+            if current_font != (style, size):
+                pdf.set_font(FONT_FAMILY, style, size)
+                current_font = (style, size)
+            pdf.text(x, baseline, text)
+        while current_page < pages - 1:
+            pdf.add_page()
+            current_page += 1
+        return pdf_bytes(pdf)
+
+    def stats(self):
+        """Return width cache counters."""
+        lookups = self.width_hits + self.width_misses
+        return {
+            "width_hits": self.width_hits,
+            "width_misses": self.width_misses,
+            "width_hit_rate": self.width_hits / lookups if lookups else 0.0,
+            "width_entries": len(self._widths)
+        }
+
+
+# Process-wide layout shared by every render
+pdf_template = PDFTemplate()
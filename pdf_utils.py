@@ -1,17 +1,51 @@
 # pdf_utils.py
-import PyPDF2
 import io
 from fpdf import FPDF
 import tempfile
 import textwrap
 from docx import Document
+from lxml import etree
+from section_grammar import tokenize_sections
+from pdf_layout import pdf_template, pdf_text, pdf_bytes
 import os
-import re
 import logging
+import time
+import zipfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pdf_backends import (
+    get_backend, available_backends, looks_degraded, count_section_headers, pdf_backend_stats
+)
+from log_config import setup_logging
 
 # Set up logging
-logging.basicConfig(filename='resume_enhancer.log', level=logging.DEBUG, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# PDFs with more pages than this are extracted in a process pool
+PDF_PARALLEL_PAGE_THRESHOLD = int(os.environ.get("PDF_PARALLEL_PAGE_THRESHOLD", "16"))
+PDF_EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Seconds to wait for one page range before extracting it in this process instead
+PDF_EXTRACT_TIMEOUT_SECONDS = float(os.environ.get("PDF_EXTRACT_TIMEOUT_SECONDS", "30"))
+# Worker processes must not be forked from the threaded server: a child forked while
+# another thread holds a lock (PDFium's, logging's) waits on it forever
+PROCESS_START_METHOD = os.environ.get(
+    "PROCESS_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+# parse_markdown_resume keys that differ from the section grammar's
+MARKDOWN_SECTION_KEYS = {'hobbies': 'hobbies_interests'}
+
+# WordprocessingML tags used by the streaming DOCX reader
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY, W_P, W_R, W_T, W_TAB, W_BR, W_CR = (W_NS + tag for tag in ('body', 'p', 'r', 't', 'tab', 'br', 'cr'))
+W_TBL, W_TC, W_TCPR, W_VMERGE, W_VAL = (W_NS + tag for tag in ('tbl', 'tc', 'tcPr', 'vMerge', 'val'))
 
 def extract_text_from_document(file):
     """
@@ -32,23 +66,184 @@ def extract_text_from_document(file):
         else:
             raise ValueError(f"Unsupported file format: {file_extension}")
     except Exception as e:
-        logging.error(f"Error extracting text from document: {e}")
+        logger.error(f"Error extracting text from document: {e}")
         return "Error extracting text from document"
 
+def process_context():
+    """Return the multiprocessing context worker pools are started with."""
+    return multiprocessing.get_context(PROCESS_START_METHOD)
+
+def terminate_pool(pool):
+    """Shut a process pool down without waiting, killing workers that are stuck."""
+    processes = list((getattr(pool, '_processes', None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+def _get_page_pool():
+    """Return the shared page extraction pool, starting it on first use."""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS, mp_context=process_context())
+        return _page_pool
+
+def _reset_page_pool(pool):
+    """Discard a broken or stuck pool so the next large PDF starts a fresh one."""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is pool:
+            _page_pool = None
+    terminate_pool(pool)
+
+def _extract_page_range(backend_name, pdf_bytes, start, stop):
+    """Extract pages [start, stop) with the named backend in a worker process."""
+    return get_backend(backend_name).extract_pages(pdf_bytes, start, stop)
+
+def iter_pdf_pages(pdf_file, backend=None):
+    """
+    Yield the text of each PDF page in order.
+
+    Small documents are read in this process. Documents with more than
+    PDF_PARALLEL_PAGE_THRESHOLD pages are split into contiguous page ranges
+    extracted in a process pool; ranges are yielded as soon as they and all
+    earlier ranges are done. A range that takes longer than
+    PDF_EXTRACT_TIMEOUT_SECONDS, or a pool that breaks, is picked up here.
+
+    Args:
+        pdf_file: File object of the PDF, or its bytes
+        backend (PDFBackend): Extraction backend, defaults to the first available one
+
+    Yields:
+        str: Text of one page
+    """
+    backend = backend or available_backends()[0]
+    pdf_bytes = pdf_file if isinstance(pdf_file, bytes) else pdf_file.read()
+    page_count = backend.page_count(pdf_bytes)
+    if page_count <= PDF_PARALLEL_PAGE_THRESHOLD or PDF_EXTRACT_WORKERS < 2:
+        yield from backend.extract_pages(pdf_bytes)
+        return
+
+    chunk_size = -(-page_count // PDF_EXTRACT_WORKERS)
+    try:
+        pool = _get_page_pool()
+        futures = [pool.submit(_extract_page_range, backend.name, pdf_bytes, start,
+                               min(start + chunk_size, page_count))
+                   for start in range(0, page_count, chunk_size)]
+    except Exception as e:
+        logger.warning(f"Parallel PDF extraction unavailable ({e}), extracting {page_count} pages sequentially")
+        yield from backend.extract_pages(pdf_bytes)
+        return
+    logger.debug(f"Extracting {page_count} PDF pages with {backend.name} in {len(futures)} ranges")
+    yielded = 0
+    try:
+        for future in futures:
+            for text in future.result(timeout=PDF_EXTRACT_TIMEOUT_SECONDS):
+                yield text
+                yielded += 1
+    except (BrokenProcessPool, FutureTimeoutError) as e:
+        reason = str(e) or f"no result in {PDF_EXTRACT_TIMEOUT_SECONDS:g}s"
+        logger.warning(f"PDF extraction pool failed ({reason}), extracting remaining pages sequentially")
+        _reset_page_pool(pool)
+        yield from backend.extract_pages(pdf_bytes, yielded, page_count)
+
 def extract_text_from_pdf(pdf_file):
+    """
+    Extract text with the first backend whose output does not look degraded.
+
+    Backends are tried in PDF_BACKEND_ORDER. When every backend's output
+    looks degraded, the one with the most section headers wins.
+
+    Args:
+        pdf_file: File object of the PDF
+
+    Returns:
+        str: Extracted text
+    """
     try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text += page.extract_text() or ""
-        return text
+        pdf_bytes = pdf_file.read()
+        candidates = []
+        for backend in available_backends():
+            start = time.perf_counter()
+            try:
+                pages = list(iter_pdf_pages(pdf_bytes, backend))
+            except Exception as e:
+                pdf_backend_stats.record(backend.name, time.perf_counter() - start, failed=True)
+                logger.warning(f"PDF backend {backend.name} failed: {e}")
+                continue
+            text = "".join(pages)
+            degraded = looks_degraded(text)
+            pdf_backend_stats.record(backend.name, time.perf_counter() - start, pages=len(pages), degraded=degraded)
+            if not degraded:
+                logger.debug(f"Extracted {len(pages)} PDF pages with {backend.name}")
+                return text
+            logger.info(f"PDF backend {backend.name} output looks degraded, trying the next backend")
+            candidates.append(text)
+        if not candidates:
+            raise ValueError("No PDF backend could read the document")
+        return max(candidates, key=lambda text: (count_section_headers(text), len(text.split())))
     except Exception as e:
-        logging.error(f"Error extracting text from PDF: {e}")
+        logger.error(f"Error extracting text from PDF: {e}")
         return "Error extracting text from PDF"
 
+def iter_docx_text(docx_file):
+    """
+    Stream the text of a DOCX body in document order.
+
+    word/document.xml is decompressed and parsed incrementally, and each
+    element is cleared once handled, so memory stays flat on large files.
+    A table cell is yielded once even when it is merged across columns or
+    rows; vertical-merge continuation cells are skipped.
+
+    Args:
+        docx_file: File object of the DOCX
+
+    Yields:
+        str: Text of one body paragraph or table cell
+    """
+    with zipfile.ZipFile(docx_file) as archive:
+        with archive.open('word/document.xml') as document_xml:
+            # Paragraph texts of each open table cell, innermost last
+            cells = []
+            for event, elem in etree.iterparse(document_xml, events=('start', 'end'), tag=(W_P, W_TC, W_TBL)):
+                if event == 'start':
+                    if elem.tag == W_TC:
+                        cells.append([])
+                    continue
+                if elem.tag == W_P:
+                    text = ''.join(
+                        node.text or '' if node.tag == W_T else '\t' if node.tag == W_TAB else '\n'
+                        for node in elem.iter(W_T, W_TAB, W_BR, W_CR) if node.getparent().tag == W_R
+                    )
+                    if cells:
+                        cells[-1].append(text)
+                    else:
+                        yield text
+                elif elem.tag == W_TC:
+                    paragraphs = cells.pop()
+                    v_merge = elem.find(f'{W_TCPR}/{W_VMERGE}')
+                    continued = v_merge is not None and v_merge.get(W_VAL) != 'restart'
+                    if not continued:
+                        text = '\n'.join(paragraphs)
+                        if cells:
+                            cells[-1].append(text)
+                        else:
+                            yield text
+                # Handled elements are dropped, along with body-level siblings already seen
+                elem.clear()
+                parent = elem.getparent()
+                if parent is not None and parent.tag == W_BODY:
+                    while elem.getprevious() is not None:
+                        del parent[0]
+
 def extract_text_from_docx(docx_file):
     try:
+        try:
+            return ''.join(text + "\n" for text in iter_docx_text(docx_file))
+        except (KeyError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+            logger.warning(f"Streaming DOCX extraction failed ({e}), falling back to python-docx")
+            docx_file.seek(0)
         doc = Document(docx_file)
         text = ""
         for paragraph in doc.paragraphs:
@@ -59,189 +254,86 @@ def extract_text_from_docx(docx_file):
                     text += cell.text + "\n"
         return text
     except Exception as e:
-        logging.error(f"Error extracting text from DOCX: {e}")
+        logger.error(f"Error extracting text from DOCX: {e}")
         return "Error extracting text from DOCX"
 
-def create_document(resume_text, output_format='pdf'):
+def create_document(resume_text, output_format='pdf', sections=None):
     if output_format.lower() == 'pdf':
-        return create_pdf(resume_text)
+        return create_pdf(resume_text, sections)
     elif output_format.lower() == 'docx':
-        return create_docx(resume_text)
+        return create_docx(resume_text, sections)
+    elif output_format.lower() == 'txt':
+        return resume_text.encode('utf-8')
     else:
         raise ValueError(f"Unsupported output format: {output_format}")
 
-def create_pdf(resume_text):
+def create_pdf(resume_text, sections=None):
     """
     Create a professionally formatted PDF document with a modern two-column layout.
     Falls back to basic formatting if parsing fails.
     
     Args:
         resume_text (str): The optimized resume text
+        sections (dict): Already parsed sections (e.g. ResumeDocument.render_sections), to skip parsing
         
     Returns:
         bytes: PDF file as bytes
     """
     try:
         # Log the input resume text for debugging
-        logging.debug(f"Input resume text:\n{resume_text}")
-
-        pdf = FPDF(orientation='P', unit='mm', format='A4')
-        pdf.add_page()
-        pdf.set_margins(15, 15, 15)
-        sidebar_width = 50
-        main_content_x = 70
-        main_content_width = pdf.w - pdf.r_margin - main_content_x
+        logger.debug("Input resume text:\n%s", resume_text)
 
-        sections = parse_markdown_resume(resume_text)
+        if sections is None:
+            sections = parse_markdown_resume(resume_text)
 
         # Check if parsing was successful
         required_sections = ['name', 'contact', 'summary', 'skills', 'experience', 'education']
         missing_sections = [s for s in required_sections if s not in sections or not sections[s].strip()]
         if missing_sections:
-            logging.warning(f"Missing or empty sections: {missing_sections}")
+            logger.warning(f"Missing or empty sections: {missing_sections}")
             return create_fallback_pdf(resume_text)
 
-        # Sidebar: Contact and Skills
-        pdf.set_xy(15, 15)
-        if 'contact' in sections:
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(sidebar_width, 8, "CONTACT", ln=True)
-            pdf.set_font("Arial", size=9)
-            contact_lines = sections['contact'].split('\n')
-            contact_text = ' | '.join(line.strip() for line in contact_lines if line.strip())
-            pdf.multi_cell(sidebar_width, 5, contact_text)
-            pdf.ln(5)
-
-        if 'skills' in sections:
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(sidebar_width, 8, "SKILLS", ln=True)
-            pdf.set_font("Arial", size=9)
-            skills = sections['skills'].split('\n')
-            for skill in skills:
-                if skill.strip():
-                    pdf.multi_cell(sidebar_width, 5, f"• {skill.strip()}")
-            pdf.ln(5)
-
-        # Main Content: Name, Summary, Experience, Education, etc.
-        pdf.set_xy(main_content_x, 15)
-        if 'name' in sections:
-            pdf.set_font("Arial", 'B', 18)
-            pdf.cell(0, 12, sections['name'].upper(), ln=True)
-            pdf.ln(3)
-
-        pdf.line(main_content_x, pdf.get_y(), pdf.w - pdf.r_margin, pdf.get_y())
-        pdf.ln(3)
-
-        if 'summary' in sections:
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(0, 8, "PROFESSIONAL SUMMARY", ln=True)
-            pdf.set_font("Arial", size=10)
-            pdf.multi_cell(main_content_width, 5, sections['summary'])
-            pdf.ln(5)
-
-        if 'experience' in sections:
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(0, 8, "PROFESSIONAL EXPERIENCE", ln=True)
-            jobs = sections['experience'].split('\n\n')
-            for job in jobs:
-                if job.strip():
-                    job_parts = job.split('\n', 1)
-                    pdf.set_font("Arial", 'B', 10)
-                    pdf.cell(0, 5, job_parts[0].strip(), ln=True)
-                    if len(job_parts) > 1:
-                        pdf.set_font("Arial", size=10)
-                        details = job_parts[1].strip()
-                        for line in details.split('\n'):
-                            if line.strip():
-                                pdf.cell(5, 5, '', ln=0)
-                                pdf.cell(5, 5, '•', ln=0)
-                                pdf.multi_cell(main_content_width - 10, 5, line.strip()[1:] if line.strip().startswith('•') else line.strip())
-                    pdf.ln(3)
-
-        if 'education' in sections:
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(0, 8, "EDUCATION", ln=True)
-            edu_entries = sections['education'].split('\n\n')
-            for entry in edu_entries:
-                if entry.strip():
-                    entry_parts = entry.split('\n', 1)
-                    pdf.set_font("Arial", 'B', 10)
-                    pdf.cell(0, 5, entry_parts[0].strip(), ln=True)
-                    if len(entry_parts) > 1:
-                        pdf.set_font("Arial", size=10)
-                        details = entry_parts[1].strip()
-                        for line in details.split('\n'):
-                            if line.strip():
-                                pdf.multi_cell(main_content_width, 5, line.strip())
-                    pdf.ln(3)
-
-        for section_name in ['certifications', 'projects', 'awards', 'publications', 'hobbies_interests']:
-            if section_name in sections:
-                pdf.set_font("Arial", 'B', 12)
-                pdf.cell(0, 8, section_name.upper(), ln=True)
-                pdf.set_font("Arial", size=10)
-                pdf.multi_cell(main_content_width, 5, sections[section_name])
-                pdf.ln(5)
-
-        pdf_output = pdf.output(dest='S')
-        return pdf_output if isinstance(pdf_output, bytes) else pdf_output.encode('latin-1')
+        # Geometry, fonts and word widths are shared across renders by the template
+        return pdf_template.render(sections)
     except Exception as e:
-        logging.error(f"Error creating PDF: {e}")
+        logger.error(f"Error creating PDF: {e}")
         return create_fallback_pdf(resume_text)
 
-def parse_markdown_resume(markdown_text):
+def markdown_sections(sections):
     """
-    Parse a markdown-formatted resume into sections with flexible header matching.
+    Build the renderer's section dict from tokenized sections.
     
     Args:
-        markdown_text (str): The markdown-formatted resume
+        sections: (section key, stripped lines) pairs, key None for text before the first header
     Returns:
         dict: Dictionary of sections
     """
-    sections = {}
-    current_section = None
-    current_content = []
-    lines = markdown_text.split('\n')
-    section_patterns = [
-        ('name', r'NAME'),
-        ('contact', r'CONTACT'),
-        ('summary', r'PROFESSIONAL SUMMARY|SUMMARY'),
-        ('skills', r'SKILLS'),
-        ('experience', r'PROFESSIONAL EXPERIENCE|EXPERIENCE|WORK EXPERIENCE'),
-        ('education', r'EDUCATION'),
-        ('certifications', r'CERTIFICATIONS'),
-        ('projects', r'PROJECTS'),
-        ('hobbies_interests', r'HOBBIES\s*&\s*INTERESTS|HOBBIES|INTERESTS'),
-        ('awards', r'AWARDS'),
-        ('publications', r'PUBLICATIONS')
-    ]
-
-    for line in lines:
-        line = line.strip()
-        matched = False
-        for section_key, pattern in section_patterns:
-            if re.match(rf'^(#+)?\s*{pattern}[\s:]*$', line, re.IGNORECASE):
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = section_key
-                current_content = []
-                matched = True
-                break
-        if not matched:
-            current_content.append(line)
-    
-    if current_section:
-        sections[current_section] = '\n'.join(current_content).strip()
+    rendered = {}
+    for section, lines in sections:
+        # Lines before the first header are not part of any section
+        if section is not None:
+            rendered[MARKDOWN_SECTION_KEYS.get(section, section)] = '\n'.join(lines).strip()
 
     # Ensure all required sections exist
     required_sections = ['name', 'contact', 'summary', 'skills', 'experience', 'education']
     for section in required_sections:
-        if section not in sections or not sections[section].strip():
-            sections[section] = f"[Missing {section.capitalize()} Section]"
-            logging.warning(f"{section.capitalize()} section not found or empty in parsed resume")
+        if section not in rendered or not rendered[section].strip():
+            rendered[section] = f"[Missing {section.capitalize()} Section]"
+            logger.warning(f"{section.capitalize()} section not found or empty in parsed resume")
+
+    logger.debug(f"Parsed sections: {rendered.keys()}")
+    return rendered
 
-    logging.debug(f"Parsed sections: {sections.keys()}")
-    return sections
+def parse_markdown_resume(markdown_text):
+    """
+    Parse a markdown-formatted resume into sections with flexible header matching.
+    
+    Args:
+        markdown_text (str): The markdown-formatted resume
+    Returns:
+        dict: Dictionary of sections
+    """
+    return markdown_sections((section, body) for section, _, body in tokenize_sections(markdown_text))
 
 def create_fallback_pdf(resume_text):
     """
@@ -263,17 +355,17 @@ def create_fallback_pdf(resume_text):
         lines = resume_text.split('\n')
         for line in lines:
             if line.strip():
-                pdf.multi_cell(0, 5, line.strip())
-        pdf_output = pdf.output(dest='S')
-        return pdf_output if isinstance(pdf_output, bytes) else pdf_output.encode('latin-1')
+                pdf.multi_cell(0, 5, pdf_text(line.strip()))
+        return pdf_bytes(pdf)
     except Exception as e:
-        logging.error(f"Error creating fallback PDF: {e}")
+        logger.error(f"Error creating fallback PDF: {e}")
         return create_error_document('PDF')
 
-def create_docx(resume_text):
+def create_docx(resume_text, sections=None):
     try:
         doc = Document()
-        sections = parse_markdown_resume(resume_text)
+        if sections is None:
+            sections = parse_markdown_resume(resume_text)
         
         for section_name, content in sections.items():
             if section_name == 'name':
@@ -289,7 +381,7 @@ def create_docx(resume_text):
         docx_bytes.seek(0)
         return docx_bytes.getvalue()
     except Exception as e:
-        logging.error(f"Error creating DOCX: {e}")
+        logger.error(f"Error creating DOCX: {e}")
         return create_error_document('DOCX')
 
 def create_error_document(format_type):
@@ -301,8 +393,7 @@ def create_error_document(format_type):
             error_pdf.cell(0, 10, "Error creating optimized resume PDF", ln=True)
             error_pdf.cell(0, 10, "Possible issues: Invalid markdown format or missing sections.", ln=True)
             error_pdf.cell(0, 10, "Please check the resume text and try again.", ln=True)
-            error_output = error_pdf.output(dest='S')
-            return error_output if isinstance(error_output, bytes) else error_output.encode('latin-1')
+            return pdf_bytes(error_pdf)
         elif format_type.upper() == 'DOCX':
             error_doc = Document()
             error_doc.add_heading("Error creating optimized resume DOCX", 0)
@@ -313,5 +404,5 @@ def create_error_document(format_type):
             error_bytes.seek(0)
             return error_bytes.getvalue()
     except Exception as e:
-        logging.error(f"Error creating error document: {e}")
+        logger.error(f"Error creating error document: {e}")
         return b""
@@ -0,0 +1,144 @@
+# prompt_budget.py
+import re
+import json
+import logging
+
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Roughly what the GPT-4 family tokenizers average on English prose
+CHARS_PER_TOKEN = 4
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def estimate_tokens(text):
+    """
+    Estimate the token count of a piece of text without a tokenizer.
+
+    Args:
+        text (str): The text to measure
+
+    Returns:
+        int: Approximate number of tokens
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_json(data):
+    """Serialize data as JSON without indentation or padding."""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace so duplicate content compares equal."""
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+
+def drop_empty_fields(data):
+    """Remove empty lists, dicts and strings from a JSON-like structure."""
+    if isinstance(data, dict):
+        cleaned = {key: drop_empty_fields(value) for key, value in data.items()}
+        return {key: value for key, value in cleaned.items() if value not in ([], {}, '', None)}
+    if isinstance(data, list):
+        return [drop_empty_fields(item) for item in data if item not in ([], {}, '', None)]
+    return data
+
+
+def truncate_lines_to_tokens(text, max_tokens):
+    """
+    Cut text at a line boundary so it fits within max_tokens.
+
+    Args:
+        text (str): The text to truncate
+        max_tokens (int): Token allowance for the text
+
+    Returns:
+        str: The truncated text, marked if anything was removed
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    marker = "\n[... truncated to fit the prompt budget ...]"
+    allowance = max(0, (max_tokens - estimate_tokens(marker)) * CHARS_PER_TOKEN)
+    kept = []
+    used = 0
+    for line in text.split('\n'):
+        if used + len(line) + 1 > allowance:
+            break
+        kept.append(line)
+        used += len(line) + 1
+    return '\n'.join(kept) + marker
+
+
+class PromptBlock:
+    """
+    One piece of a prompt. Blocks with a lower priority are shrunk or dropped
+    first when the prompt exceeds its budget; required blocks are never dropped,
+    and blocks that can be shrunk are dropped only as a last resort.
+    """
+
+    def __init__(self, name, text, priority=0, required=False, shrink=None):
+        self.name = name
+        self.text = text
+        self.priority = priority
+        self.required = required
+        # Optional callable(text, max_tokens) returning a smaller version
+        self.shrink = shrink
+
+    @property
+    def tokens(self):
+        return estimate_tokens(self.text)
+
+
+def fit_blocks(blocks, token_budget):
+    """
+    Trim prompt blocks to a token budget in priority order.
+
+    Blocks are visited from lowest to highest priority. Blocks that can be
+    shrunk are cut to whatever room is left, and the others are dropped
+    unless required. A block that can be shrunk is only dropped when the
+    prompt is still over budget after every block, required ones included,
+    has been shrunk.
+
+    Args:
+        blocks (list): PromptBlock objects in prompt order
+        token_budget (int): Maximum estimated tokens, or None for no limit
+
+    Returns:
+        str: The assembled prompt
+    """
+    if token_budget is None:
+        return ''.join(block.text for block in blocks)
+
+    kept = list(blocks)
+    total = sum(block.tokens for block in kept)
+    by_priority = sorted(blocks, key=lambda b: b.priority)
+    for block in by_priority:
+        if total <= token_budget:
+            break
+        if block.shrink is not None:
+            before = block.tokens
+            block.text = block.shrink(block.text, max(0, before - (total - token_budget)))
+            total -= before - block.tokens
+            logger.debug(f"Prompt block '{block.name}' shrunk from {before} to {block.tokens} tokens")
+        elif not block.required:
+            total -= block.tokens
+            kept.remove(block)
+            logger.debug(f"Prompt block '{block.name}' dropped to fit budget of {token_budget} tokens")
+
+    for block in by_priority:
+        if total <= token_budget:
+            break
+        if block in kept and not block.required:
+            total -= block.tokens
+            kept.remove(block)
+            logger.debug(f"Prompt block '{block.name}' dropped after shrinking to fit budget of {token_budget} tokens")
+
+    if total > token_budget:
+        logger.warning(f"Prompt still exceeds budget after trimming: {total} > {token_budget} tokens")
+    return ''.join(block.text for block in kept)
@@ -0,0 +1,264 @@
+# rate_limiter.py
+import os
+import time
+import logging
+import threading
+import contextvars
+from collections import deque, OrderedDict
+
+from llm_metrics import llm_metrics
+from prompt_budget import estimate_tokens
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Provider limits for the account; 0 disables that bucket
+REQUESTS_PER_MINUTE = int(os.environ.get("LLM_RATE_LIMIT_RPM", "500"))
+TOKENS_PER_MINUTE = int(os.environ.get("LLM_RATE_LIMIT_TPM", "30000"))
+# Completion size assumed when a request does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = int(os.environ.get("LLM_RATE_LIMIT_COMPLETION_TOKENS", "1000"))
+# Longest a request may wait in the queue before giving up
+QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", "120"))
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# Session and priority of the caller; worker threads inherit them through
+# contextvars.copy_context()
+_current_session = contextvars.ContextVar("llm_session", default="default")
+_current_priority = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+class QueueTimeout(Exception):
+    """Raised when a request waits in the limiter queue longer than its timeout."""
+
+
+class TokenBucket:
+    """Bucket holding up to capacity units, refilled continuously over a minute."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def cost(self, amount):
+        # A request larger than the bucket could never run otherwise
+        return min(float(amount), self.capacity)
+
+    def wait_time(self, amount):
+        """Seconds until amount units are available (0 if they are now)."""
+        missing = self.cost(amount) - self.level
+        return 0.0 if missing <= 0 else missing / self.rate
+
+
+class _Waiter:
+    __slots__ = ("session", "priority", "tokens", "enqueued")
+
+    def __init__(self, session, priority, tokens):
+        self.session = session
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+
+
+class RateLimiter:
+    """
+    Process-wide limiter in front of every chat completion call.
+
+    Two token buckets cap requests per minute and tokens per minute. Callers
+    that cannot proceed queue up; the queue is served strictly by priority
+    and round-robin across sessions within a priority, so one session
+    sending many requests cannot starve the others.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 queue_timeout=QUEUE_TIMEOUT):
+        self._cond = threading.Condition()
+        self.queue_timeout = queue_timeout
+        self._buckets = {}
+        self.configure(requests_per_minute, tokens_per_minute)
+        # priority -> OrderedDict(session -> deque of waiters); dict order is the round-robin order
+        self._queues = {}
+        self._paused_until = 0.0
+        self.granted = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_queue_depth = 0
+
+    def configure(self, requests_per_minute, tokens_per_minute):
+        """
+        Replace the bucket limits, e.g. for a benchmark run.
+
+        Args:
+            requests_per_minute (int): Request limit, 0 to disable
+            tokens_per_minute (int): Token limit, 0 to disable
+        """
+        buckets = {}
+        if requests_per_minute > 0:
+            buckets["requests"] = TokenBucket(requests_per_minute)
+        if tokens_per_minute > 0:
+            buckets["tokens"] = TokenBucket(tokens_per_minute)
+        with self._cond:
+            self._buckets = buckets
+            self._cond.notify_all()
+
+    def _queue_depth(self):
+        return sum(len(waiters) for sessions in self._queues.values() for waiters in sessions.values())
+
+    def _head(self):
+        """Return the waiter that should be served next."""
+        for priority in sorted(self._queues):
+            sessions = self._queues[priority]
+            for waiters in sessions.values():
+                return waiters[0]
+        return None
+
+    def _remove(self, waiter, served):
+        sessions = self._queues[waiter.priority]
+        waiters = sessions[waiter.session]
+        waiters.remove(waiter)
+        if not waiters:
+            del sessions[waiter.session]
+        elif served:
+            # Round robin: a session that was just served goes to the back
+            sessions.move_to_end(waiter.session)
+        if not sessions:
+            del self._queues[waiter.priority]
+
+    def _wait_time(self, waiter, now):
+        wait = max(0.0, self._paused_until - now)
+        amounts = {"requests": 1, "tokens": waiter.tokens}
+        for name, bucket in self._buckets.items():
+            bucket.refill(now)
+            wait = max(wait, bucket.wait_time(amounts[name]))
+        return wait
+
+    def acquire(self, tokens, session=None, priority=None):
+        """
+        Block until the request may be sent.
+
+        Args:
+            tokens (int): Estimated prompt plus completion tokens
+            session (str): Fairness key, defaults to the bound session
+            priority (int): Queue priority, defaults to the bound priority
+
+        Returns:
+            float: Seconds spent waiting in the queue
+        """
+        waiter = _Waiter(session or _current_session.get(),
+                         _current_priority.get() if priority is None else priority, tokens)
+        with self._cond:
+            self._queues.setdefault(waiter.priority, OrderedDict()).setdefault(waiter.session, deque()).append(waiter)
+            self.max_queue_depth = max(self.max_queue_depth, self._queue_depth())
+            llm_metrics.set_gauge("resume_llm_queue_depth", (), self._queue_depth())
+            try:
+                while True:
+                    now = time.monotonic()
+                    waited = now - waiter.enqueued
+                    if self._head() is waiter:
+                        delay = self._wait_time(waiter, now)
+                        if delay <= 0:
+                            break
+                    else:
+                        delay = None
+                    remaining = self.queue_timeout - waited
+                    if remaining <= 0:
+                        self._remove(waiter, served=False)
+                        self.timeouts += 1
+                        self._cond.notify_all()
+                        raise QueueTimeout(f"LLM request waited {waited:.1f}s in the rate limiter queue")
+                    self._cond.wait(remaining if delay is None else min(delay, remaining))
+                amounts = {"requests": 1, "tokens": tokens}
+                for name, bucket in self._buckets.items():
+                    bucket.level -= bucket.cost(amounts[name])
+                self._remove(waiter, served=True)
+                self.granted += 1
+                self.total_wait += waited
+                self._cond.notify_all()
+            finally:
+                llm_metrics.set_gauge("resume_llm_queue_depth", (), self._queue_depth())
+        llm_metrics.record_queue_wait(waiter.priority, waited)
+        if waited > 1:
+            logger.debug(f"LLM request from session {waiter.session} waited {waited:.2f}s (priority {waiter.priority})")
+        return waited
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """
+        Correct the token bucket once the real usage is known. Overruns leave
+        the bucket in debt, which delays the next requests accordingly.
+
+        Args:
+            estimated_tokens (int): Tokens charged by acquire
+            actual_tokens (int): Tokens reported by the API
+        """
+        bucket = self._buckets.get("tokens")
+        if bucket is None or not actual_tokens:
+            return
+        with self._cond:
+            bucket.level = min(bucket.capacity, bucket.level + bucket.cost(estimated_tokens) - actual_tokens)
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """Hold every queued request for seconds, e.g. after the provider returned 429."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"LLM rate limiter paused for {seconds:.1f}s")
+
+    def stats(self):
+        """Return queue depth, waiting sessions and wait-time figures."""
+        with self._cond:
+            now = time.monotonic()
+            for bucket in self._buckets.values():
+                bucket.refill(now)
+            return {
+                "queue_depth": self._queue_depth(),
+                "queue_depth_by_priority": {priority: sum(len(w) for w in sessions.values())
+                                            for priority, sessions in sorted(self._queues.items())},
+                "waiting_sessions": len({session for sessions in self._queues.values() for session in sessions}),
+                "max_queue_depth": self.max_queue_depth,
+                "granted": self.granted,
+                "timeouts": self.timeouts,
+                "mean_wait_s": round(self.total_wait / self.granted, 3) if self.granted else 0.0,
+                "available": {name: round(bucket.level) for name, bucket in self._buckets.items()}
+            }
+
+
+def bind(session=None, priority=None):
+    """
+    Set the session and priority used for LLM calls made from the current
+    context (and from worker threads started with a copy of it).
+
+    Args:
+        session (str): Fairness key, e.g. the Streamlit session id
+        priority (int): PRIORITY_INTERACTIVE, PRIORITY_BATCH or any int
+    """
+    if session is not None:
+        _current_session.set(session)
+    if priority is not None:
+        _current_priority.set(priority)
+
+
+def estimate_request_tokens(request):
+    """
+    Estimate the tokens a chat completion request will use.
+
+    Args:
+        request (dict): Arguments for chat.completions.create
+
+    Returns:
+        int: Prompt tokens plus the expected completion size
+    """
+    prompt = sum(estimate_tokens(m.get("content") or "") for m in request.get("messages", []))
+    return prompt + (request.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+
+# Process-wide limiter shared by every LLM call site
+llm_limiter = RateLimiter()
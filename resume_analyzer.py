@@ -1,30 +1,140 @@
 # resume_analyzer.py
 import os
 import json
-from openai import OpenAI
 import re
 import logging
 import difflib
+import time
+import jiter
+
+from llm_cache import llm_cache, make_cache_key
+from singleflight import llm_singleflight
+from openai_client import create_chat_completion
+from llm_metrics import llm_metrics
+from layout_extractor import name_from_blocks
+from section_grammar import match_section, tokenize_sections, SECTION_HEADERS
+from local_analyzer import analyze_resume_local, merge_analysis
+from prompt_budget import (
+    PromptBlock, fit_blocks, estimate_tokens, compact_json, drop_empty_fields,
+    normalize_text, truncate_lines_to_tokens
+)
+from log_config import setup_logging, Lazy
 
 # Set up logging
-logging.basicConfig(filename='resume_enhancer.log', level=logging.DEBUG, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+setup_logging()
+logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-openai = OpenAI(api_key=OPENAI_API_KEY)
+# "llm" asks gpt-4o, "local" uses the offline heuristics, "hybrid" runs local first and lets the LLM refine it
+ANALYSIS_MODE = os.environ.get("ANALYSIS_MODE", "hybrid")
 
-def extract_resume_details(resume_text):
+def cached_chat_completion(system_prompt, user_prompt, response_format=None, model="gpt-4o", stage="llm"):
     """
-    Extract key details from the original resume text using heuristics.
+    Run a chat completion through the shared LLM response cache.
     
     Args:
-        resume_text (str): The original resume text
+        system_prompt (str): The system message content
+        user_prompt (str): The user message content
+        response_format (dict): Optional response_format passed to the API
+        model (str): The model name
+        stage (str): Pipeline stage label for metrics
         
     Returns:
-        dict: Extracted details (name, contact, experience, etc.)
+        str: The message content of the (possibly cached) response
+    """
+    start = time.perf_counter()
+    key = make_cache_key(model, system_prompt, user_prompt, response_format)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        logger.debug(f"LLM cache hit for {key[:12]}")
+        llm_metrics.record_call(stage, time.perf_counter() - start, cache="hit")
+        return cached
+    led = False
+
+    def fetch():
+        nonlocal led
+        led = True
+        # Another caller may have filled the cache while we waited to lead;
+        # the lookup above already counted this request
+        cached = llm_cache.get(key, count=False)
+        if cached is not None:
+            llm_metrics.record_call(stage, time.perf_counter() - start, cache="hit")
+            return cached
+        request = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+        }
+        if response_format:
+            request["response_format"] = response_format
+        response = create_chat_completion(stage=stage, **request)
+        content = response.choices[0].message.content
+
+        # Only cache responses the callers can actually use
+        if response_format and response_format.get("type") == "json_object":
+            json.loads(content)
+        llm_cache.set(key, content)
+        logger.debug(f"LLM cache miss for {key[:12]}, stored response")
+        return content
+
+    # Identical requests already in flight from other sessions share one call
+    content = llm_singleflight.do(key, fetch)
+    if not led:
+        llm_metrics.record_call(stage, time.perf_counter() - start, cache="coalesced")
+    return content
+
+# Regex patterns for common resume elements
+EMAIL_PATTERN = r'[\w\.-]+@[\w\.-]+\.\w+'
+PHONE_PATTERN = r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
+LINKEDIN_PATTERN = r'linkedin\.com/in/[\w-]+'
+
+def add_detail_line(details, current_section, line):
+    """
+    File one stripped, non-header resume line under its section.
+    
+    Args:
+        details (dict): Details being built by extract_resume_details
+        current_section (str): Section the line belongs to, or None
+        line (str): The line
     """
-    details = {
+    if current_section == "name":
+        if details["name"] == "Unknown Name":
+            details["name"] = line
+    elif current_section == "contact":
+        contact_parts = []
+        email = re.search(EMAIL_PATTERN, line)
+        phone = re.search(PHONE_PATTERN, line)
+        linkedin = re.search(LINKEDIN_PATTERN, line)
+        if email:
+            contact_parts.append(f"Email: {email.group()}")
+        if phone:
+            contact_parts.append(f"Phone: {phone.group()}")
+        if linkedin:
+            contact_parts.append(f"LinkedIn: {linkedin.group()}")
+        if contact_parts:
+            details["contact"] = " | ".join(contact_parts)
+    elif current_section == "summary":
+        if not details["summary"]:
+            details["summary"] = line
+    elif current_section == "skills" and (line.startswith('-') or re.match(r'^\w+', line)):
+        skill = line.lstrip('- ').strip()
+        if skill:
+            details["skills"].append(skill)
+    elif current_section == "experience" and line:
+        details["experience"].append(line)
+    elif current_section == "education" and line:
+        details["education"].append(line)
+    elif current_section == "certifications" and line:
+        details["certifications"].append(line)
+    elif current_section == "projects" and line:
+        details["projects"].append(line)
+    elif current_section == "hobbies" and line:
+        details["hobbies"].append(line)
+
+def new_details():
+    """Return the details dict with every field at its placeholder value."""
+    return {
         "name": "Unknown Name",
         "contact": "Email: unknown@example.com | Phone: Unknown | LinkedIn: Unknown",
         "summary": "",
@@ -36,97 +146,74 @@ def extract_resume_details(resume_text):
         "hobbies": []
     }
 
-    lines = resume_text.split('\n')
-    current_section = None
+def details_from_sections(sections):
+    """
+    Build resume details from already tokenized sections.
+    
+    Args:
+        sections: (section key, stripped lines) pairs, e.g. from tokenize_sections
+        
+    Returns:
+        dict: Extracted details (name, contact, experience, etc.)
+    """
+    details = new_details()
+    for section, lines in sections:
+        for line in lines:
+            if line:
+                add_detail_line(details, section, line)
+    return details
 
-    # Regex patterns for common resume elements
-    email_pattern = r'[\w\.-]+@[\w\.-]+\.\w+'
-    phone_pattern = r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-    linkedin_pattern = r'linkedin\.com/in/[\w-]+'
+def extract_resume_details(resume_text, layout_blocks=None):
+    """
+    Extract key details from the original resume text using heuristics.
+    
+    When layout blocks are given (see layout_extractor), sections come from
+    their typography-based header marks in one pass instead of matching
+    every line against the header patterns.
+    
+    Args:
+        resume_text (str): The original resume text
+        layout_blocks (list): Optional LayoutBlock objects for the same document
+        
+    Returns:
+        dict: Extracted details (name, contact, experience, etc.)
+    """
+    if layout_blocks:
+        details = new_details()
+        details["name"] = name_from_blocks(layout_blocks) or details["name"]
+        current_section = None
+        for block in layout_blocks:
+            if block.is_header:
+                current_section = block.section
+                continue
+            line = block.text.strip()
+            if line:
+                # Lines above the first header on page one are the contact block
+                section = current_section or ("contact" if block.page == 0 else None)
+                add_detail_line(details, section, line)
+        logger.debug("Extracted resume details from layout: %s", Lazy(json.dumps, details, indent=2))
+        return details
+
+    details = details_from_sections((section, body) for section, _, body in tokenize_sections(resume_text))
+    logger.debug("Extracted resume details: %s", Lazy(json.dumps, details, indent=2))
+    return details
 
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+ANALYSIS_SYSTEM_PROMPT = "You are an expert resume reviewer specializing in optimizing resumes for specific job roles. You provide detailed, actionable feedback to improve resumes for both ATS and human readers."
 
-        # Detect name (first non-empty line, often at the top)
-        if not details["name"] and re.match(r'^[A-Z][a-z]+ [A-Z][a-z]+$', line, re.IGNORECASE):
-            details["name"] = line
-            continue
-
-        # Detect sections
-        if re.match(r'^(contact|personal information|info):?$', line, re.IGNORECASE):
-            current_section = "contact"
-            continue
-        elif re.match(r'^(summary|objective|professional summary):?$', line, re.IGNORECASE):
-            current_section = "summary"
-            continue
-        elif re.match(r'^(skills|key skills|technical skills):?$', line, re.IGNORECASE):
-            current_section = "skills"
-            continue
-        elif re.match(r'^(experience|work experience|professional experience):?$', line, re.IGNORECASE):
-            current_section = "experience"
-            continue
-        elif re.match(r'^(education|academic background):?$', line, re.IGNORECASE):
-            current_section = "education"
-            continue
-        elif re.match(r'^(certifications|certificates):?$', line, re.IGNORECASE):
-            current_section = "certifications"
-            continue
-        elif re.match(r'^(projects|portfolio):?$', line, re.IGNORECASE):
-            current_section = "projects"
-            continue
-        elif re.match(r'^(hobbies|interests|hobbies & interests):?$', line, re.IGNORECASE):
-            current_section = "hobbies"
-            continue
-
-        # Process content under sections
-        if current_section == "contact":
-            contact_parts = []
-            email = re.search(email_pattern, line)
-            phone = re.search(phone_pattern, line)
-            linkedin = re.search(linkedin_pattern, line)
-            if email:
-                contact_parts.append(f"Email: {email.group()}")
-            if phone:
-                contact_parts.append(f"Phone: {phone.group()}")
-            if linkedin:
-                contact_parts.append(f"LinkedIn: {linkedin.group()}")
-            if contact_parts:
-                details["contact"] = " | ".join(contact_parts)
-        elif current_section == "summary":
-            if not details["summary"]:
-                details["summary"] = line
-        elif current_section == "skills" and (line.startswith('-') or re.match(r'^\w+', line)):
-            skill = line.lstrip('- ').strip()
-            if skill:
-                details["skills"].append(skill)
-        elif current_section == "experience" and line:
-            details["experience"].append(line)
-        elif current_section == "education" and line:
-            details["education"].append(line)
-        elif current_section == "certifications" and line:
-            details["certifications"].append(line)
-        elif current_section == "projects" and line:
-            details["projects"].append(line)
-        elif current_section == "hobbies" and line:
-            details["hobbies"].append(line)
-
-    logging.debug(f"Extracted resume details: {json.dumps(details, indent=2)}")
-    return details
+TIPS_SYSTEM_PROMPT = "You are an expert resume advisor providing concise, actionable tips to improve resumes for specific job roles."
 
-def analyze_resume(resume_text, job_role):
+def build_analysis_prompt(resume_text, job_role):
     """
-    Analyze the resume for strengths, weaknesses, and job match score.
+    Build the user prompt for the resume analysis.
     
     Args:
         resume_text (str): The original resume text
         job_role (str): The target job role
         
     Returns:
-        dict: Analysis results including strengths, weaknesses, and job match
+        str: The analysis prompt
     """
-    prompt = f"""Analyze the following resume for a {job_role} position. Evaluate its strengths, weaknesses, and overall job match score (0 to 1 scale). Identify specific areas for improvement, such as weak phrases, missing keywords, and opportunities for better quantification. Provide detailed feedback in the following JSON format:
+    return f"""Analyze the following resume for a {job_role} position. Evaluate its strengths, weaknesses, and overall job match score (0 to 1 scale). Identify specific areas for improvement, such as weak phrases, missing keywords, and opportunities for better quantification. Provide detailed feedback in the following JSON format:
 
 {{
     "job_match_score": 0.8,
@@ -146,43 +233,76 @@ def analyze_resume(resume_text, job_role):
 Resume:
 {resume_text}
 """
+
+def default_analysis_results():
+    """
+    Return the analysis used when the analysis call fails.
+    
+    Returns:
+        dict: Neutral analysis results in the analyze_resume schema
+    """
+    return {
+        "job_match_score": 0.5,
+        "strengths": [],
+        "weaknesses": ["Unable to analyze resume due to processing error"],
+        "weak_phrases": [],
+        "missing_keywords": [],
+        "quantification_opportunities": []
+    }
+
+def analyze_resume(resume_text, job_role, mode=None, document=None):
+    """
+    Analyze the resume for strengths, weaknesses, and job match score.
+    
+    Args:
+        resume_text (str): The original resume text
+        job_role (str): The target job role
+        mode (str): "llm", "local" or "hybrid"; defaults to ANALYSIS_MODE
+        document (ResumeDocument): The parsed resume, so its details are not extracted again
+        
+    Returns:
+        dict: Analysis results including strengths, weaknesses, and job match
+    """
+    mode = mode or ANALYSIS_MODE
+    local_results = None
+    if mode in ("local", "hybrid"):
+        details = document.details if document is not None else extract_resume_details(resume_text)
+        local_results = analyze_resume_local(resume_text, job_role, details)
+        if mode == "local":
+            return local_results
+
+    prompt = build_analysis_prompt(resume_text, job_role)
     
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an expert resume reviewer specializing in optimizing resumes for specific job roles. You provide detailed, actionable feedback to improve resumes for both ATS and human readers."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
+        content = cached_chat_completion(
+            ANALYSIS_SYSTEM_PROMPT,
+            prompt,
+            response_format={"type": "json_object"},
+            stage="analysis"
         )
-        analysis_results = json.loads(response.choices[0].message.content)
-        logging.debug(f"Analysis results: {json.dumps(analysis_results, indent=2)}")
+        analysis_results = json.loads(content)
+        if local_results is not None:
+            analysis_results = merge_analysis(analysis_results, local_results)
+        logger.debug("Analysis results: %s", Lazy(json.dumps, analysis_results, indent=2))
         return analysis_results
     except Exception as e:
-        logging.error(f"Error analyzing resume: {e}")
-        return {
-            "job_match_score": 0.5,
-            "strengths": [],
-            "weaknesses": ["Unable to analyze resume due to processing error"],
-            "weak_phrases": [],
-            "missing_keywords": [],
-            "quantification_opportunities": []
-        }
+        logger.error(f"Error analyzing resume: {e}")
+        if local_results is not None:
+            return local_results
+        return default_analysis_results()
 
-def generate_improvement_tips(analysis_results, job_role):
+def build_tips_prompt(analysis_results, job_role):
     """
-    Generate specific improvement tips based on analysis results.
+    Build the user prompt for the improvement tips.
     
     Args:
         analysis_results (dict): Analysis results from analyze_resume
         job_role (str): The target job role
         
     Returns:
-        list: List of improvement tips
+        str: The tips prompt
     """
-    try:
-        prompt = f"""Based on the following resume analysis for a {job_role} position, provide a list of concise, actionable improvement tips (each 1-2 sentences long) to enhance the resume. Focus on addressing weaknesses, weak phrases, missing keywords, and quantification opportunities. Return the tips as a JSON array of strings.
+    return f"""Based on the following resume analysis for a {job_role} position, provide a list of concise, actionable improvement tips (each 1-2 sentences long) to enhance the resume. Focus on addressing weaknesses, weak phrases, missing keywords, and quantification opportunities. Return the tips as a JSON array of strings.
 
 Analysis:
 {json.dumps(analysis_results, indent=2)}
@@ -193,53 +313,56 @@ Example output:
     "Incorporate missing keywords like 'Agile' in the skills or experience section to improve ATS compatibility."
 ]
 """
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an expert resume advisor providing concise, actionable tips to improve resumes for specific job roles."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        tips = json.loads(response.choices[0].message.content)
-        logging.debug(f"Improvement tips: {tips}")
-        return tips if isinstance(tips, list) else []
-    except Exception as e:
-        logging.error(f"Error generating improvement tips: {e}")
-        return [
-            "Quantify achievements to demonstrate impact.",
-            "Ensure all relevant keywords for the job role are included."
-        ]
 
-def rewrite_resume_sections(resume_text, analysis_results, job_role):
+def default_improvement_tips():
     """
-    Rewrite resume sections to be more impactful and aligned with the target job.
+    Return the tips used when the tips call fails.
+    
+    Returns:
+        list: Generic improvement tips
+    """
+    return [
+        "Quantify achievements to demonstrate impact.",
+        "Ensure all relevant keywords for the job role are included."
+    ]
+
+def generate_improvement_tips(analysis_results, job_role):
+    """
+    Generate specific improvement tips based on analysis results.
     
     Args:
-        resume_text (str): The original resume text
         analysis_results (dict): Analysis results from analyze_resume
         job_role (str): The target job role
         
     Returns:
-        dict: Rewritten sections and full optimized resume
+        list: List of improvement tips
     """
-    # Extract details from the original resume
-    extracted_details = extract_resume_details(resume_text)
+    try:
+        prompt = build_tips_prompt(analysis_results, job_role)
+        content = cached_chat_completion(
+            TIPS_SYSTEM_PROMPT,
+            prompt,
+            response_format={"type": "json_object"},
+            stage="tips"
+        )
+        tips = json.loads(content)
+        logger.debug("Improvement tips: %s", tips)
+        return tips if isinstance(tips, list) else []
+    except Exception as e:
+        logger.error(f"Error generating improvement tips: {e}")
+        return default_improvement_tips()
 
-    prompt = f"""Rewrite the following resume to optimize it for a {job_role} position. Use the strict markdown template below for your output. Each section MUST be present, even if you need to infer or improve content. Use exactly one '#' for top-level headers, followed by a space, and the exact section names shown below (no colons, no variations). Use bullet points ('-') for lists under SKILLS, PROFESSIONAL EXPERIENCE, EDUCATION, CERTIFICATIONS, PROJECTS, and HOBBIES & INTERESTS. Use '##' for subheaders under PROFESSIONAL EXPERIENCE (e.g., job titles). Ensure all sections are populated with relevant, impactful content tailored to the job role. Incorporate missing keywords and quantify achievements where possible based on the analysis results. Avoid generic phrases like 'Relevant Skill 1' or 'Unknown Role'. If specific details are missing, infer plausible details based on the job role and extracted information.
+REWRITE_SYSTEM_PROMPT = "You are an expert resume writer who creates impactful, achievement-oriented content optimized for both ATS and human readers. You strictly follow the provided markdown template, using exact header names and formats. You ensure all sections are present and populated with relevant, job-specific content, avoiding generic phrases like 'Relevant Skill 1' or 'Unknown Role'. You infer plausible details if specific information is missing, based on the job role and extracted details."
 
-**Extracted Details from Original Resume:**
-- Name: {extracted_details['name']}
-- Contact: {extracted_details['contact']}
-- Summary: {extracted_details['summary']}
-- Skills: {', '.join(extracted_details['skills']) if extracted_details['skills'] else 'None'}
-- Experience: {', '.join(extracted_details['experience']) if extracted_details['experience'] else 'None'}
-- Education: {', '.join(extracted_details['education']) if extracted_details['education'] else 'None'}
-- Certifications: {', '.join(extracted_details['certifications']) if extracted_details['certifications'] else 'None'}
-- Projects: {', '.join(extracted_details['projects']) if extracted_details['projects'] else 'None'}
-- Hobbies & Interests: {', '.join(extracted_details['hobbies']) if extracted_details['hobbies'] else 'None'}
+REQUIRED_REWRITE_SECTIONS = ['# NAME', '# CONTACT', '# PROFESSIONAL SUMMARY', '# SKILLS',
+                             '# PROFESSIONAL EXPERIENCE', '# EDUCATION', '# CERTIFICATIONS',
+                             '# PROJECTS', '# HOBBIES & INTERESTS']
+
+REWRITE_PROMPT_TOKEN_BUDGET = int(os.environ.get("REWRITE_PROMPT_TOKEN_BUDGET", "6000"))
+# Items of each analysis list kept however tight the budget; the original resume is truncated first
+REWRITE_ANALYSIS_MIN_ITEMS = 3
 
-**Template (follow exactly):**
+REWRITE_TEMPLATE_BLOCK = """**Template (follow exactly):**
 
 # NAME
 Full Name Here
@@ -280,7 +403,9 @@ A concise, impactful summary (2-3 sentences) tailored to the target job.
 - Hobby 1
 - Hobby 2
 
-**Example Output for a Digital Marketing Role:**
+"""
+
+REWRITE_EXAMPLE_BLOCK = """**Example Output for a Digital Marketing Role:**
 
 # NAME
 Jane Doe
@@ -318,131 +443,402 @@ Dynamic Digital Marketing Specialist with over 5 years of experience in SEO, con
 - Digital photography
 - Traveling
 
-**Original Resume:**
-{resume_text}
-
-**Analysis Results:**
-{json.dumps(analysis_results, indent=2)}
+"""
 
-Return your response in the following JSON format:
-{{
+REWRITE_RESPONSE_FORMAT_BLOCK = """Return your response in the following JSON format:
+{
     "full_optimized_resume": "the complete rewritten resume in the above markdown template",
     "improvements_made": [
-        {{
+        {
             "section": "section name",
             "original": "original text",
             "improved": "improved text",
             "reason": "why this improvement was made",
             "impact": "how this improves the resume"
-        }},
+        },
         ...
     ]
-}}
+}
+"""
+
+def format_extracted_details(extracted_details, resume_text=None):
+    """
+    Render the extracted details block of the rewrite prompt.
+    
+    When the original resume text is given, list fields whose entries already
+    appear verbatim in it are replaced by a pointer instead of being repeated.
+    
+    Args:
+        extracted_details (dict): Output of extract_resume_details
+        resume_text (str): The original resume text included in the same prompt
+        
+    Returns:
+        str: The extracted details block
+    """
+    normalized_resume = normalize_text(resume_text) if resume_text else ''
+
+    def render(items):
+        if not items:
+            return 'None'
+        unique = list(dict.fromkeys(items))
+        if normalized_resume and all(normalize_text(item) in normalized_resume for item in unique):
+            return 'as listed in the Original Resume'
+        return ', '.join(unique)
+
+    summary = extracted_details['summary']
+    if summary and normalized_resume and normalize_text(summary) in normalized_resume:
+        summary = 'as in the Original Resume'
+    return f"""**Extracted Details from Original Resume:**
+- Name: {extracted_details['name']}
+- Contact: {extracted_details['contact']}
+- Summary: {summary}
+- Skills: {render(extracted_details['skills'])}
+- Experience: {render(extracted_details['experience'])}
+- Education: {render(extracted_details['education'])}
+- Certifications: {render(extracted_details['certifications'])}
+- Projects: {render(extracted_details['projects'])}
+- Hobbies & Interests: {render(extracted_details['hobbies'])}
+
 """
+
+def build_rewrite_prompt(resume_text, analysis_results, job_role, extracted_details,
+                         token_budget=REWRITE_PROMPT_TOKEN_BUDGET):
+    """
+    Build the user prompt for the full-resume rewrite.
+    
+    Extracted details that duplicate the original resume are elided, the
+    analysis is serialized compactly, and if the prompt is still over
+    token_budget the example and extracted details are dropped, the analysis
+    is cut to its top items (at least REWRITE_ANALYSIS_MIN_ITEMS per list)
+    and the original resume is truncated, in that order. The analysis is
+    only dropped if the prompt still does not fit.
+    
+    Args:
+        resume_text (str): The original resume text
+        analysis_results (dict): Analysis results from analyze_resume
+        job_role (str): The target job role
+        extracted_details (dict): Output of extract_resume_details
+        token_budget (int): Maximum estimated prompt tokens, or None for no limit
+        
+    Returns:
+        str: The rewrite prompt
+    """
+    instructions = f"""Rewrite the following resume to optimize it for a {job_role} position. Use the strict markdown template below for your output. Each section MUST be present, even if you need to infer or improve content. Use exactly one '#' for top-level headers, followed by a space, and the exact section names shown below (no colons, no variations). Use bullet points ('-') for lists under SKILLS, PROFESSIONAL EXPERIENCE, EDUCATION, CERTIFICATIONS, PROJECTS, and HOBBIES & INTERESTS. Use '##' for subheaders under PROFESSIONAL EXPERIENCE (e.g., job titles). Ensure all sections are populated with relevant, impactful content tailored to the job role. Incorporate missing keywords and quantify achievements where possible based on the analysis results. Avoid generic phrases like 'Relevant Skill 1' or 'Unknown Role'. If specific details are missing, infer plausible details based on the job role and extracted information.
+
+"""
+    compact_analysis = drop_empty_fields(analysis_results)
+    actionable_analysis = {
+        key: compact_analysis[key]
+        for key in ('missing_keywords', 'weak_phrases', 'quantification_opportunities')
+        if key in compact_analysis
+    }
+
+    def shrink_analysis(text, max_tokens):
+        # Keep the first (most important) items of each actionable list, as many as fit
+        longest = max((len(value) for value in actionable_analysis.values() if isinstance(value, list)), default=1)
+        for limit in range(longest, min(longest, REWRITE_ANALYSIS_MIN_ITEMS) - 1, -1):
+            shrunk = {key: value[:limit] if isinstance(value, list) else value
+                      for key, value in actionable_analysis.items()}
+            text = f"**Analysis Results:**\n{compact_json(shrunk)}\n\n"
+            if estimate_tokens(text) <= max_tokens:
+                break
+        return text
+
+    example = REWRITE_EXAMPLE_BLOCK.format(job_role=job_role)
+    original = f"**Original Resume:**\n{resume_text}\n\n"
+    blocks = [
+        PromptBlock("instructions", instructions, priority=100, required=True),
+        PromptBlock("extracted_details", format_extracted_details(extracted_details, resume_text), priority=20),
+        PromptBlock("template", REWRITE_TEMPLATE_BLOCK, priority=90, required=True),
+        PromptBlock("example", example, priority=10),
+        PromptBlock("original_resume", original, priority=80, required=True, shrink=truncate_lines_to_tokens),
+        PromptBlock("analysis", f"**Analysis Results:**\n{compact_json(compact_analysis)}\n\n", priority=50,
+                    shrink=shrink_analysis),
+        PromptBlock("response_format", REWRITE_RESPONSE_FORMAT_BLOCK, priority=100, required=True)
+    ]
+    prompt = fit_blocks(blocks, token_budget)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        uncompacted = (instructions + format_extracted_details(extracted_details) + REWRITE_TEMPLATE_BLOCK
+                       + example + original + f"**Analysis Results:**\n{json.dumps(analysis_results, indent=2)}\n\n"
+                       + REWRITE_RESPONSE_FORMAT_BLOCK)
+        logger.debug("Rewrite prompt size: ~%s tokens before compaction, ~%s after (budget %s)",
+                     estimate_tokens(uncompacted), estimate_tokens(prompt), token_budget)
+    return prompt
+
+def postprocess_rewrite(rewritten_sections, resume_text, extracted_details, job_role):
+    """
+    Normalize a rewrite response so every required section is present.
+    
+    Args:
+        rewritten_sections (dict): Parsed JSON response from the rewrite call
+        resume_text (str): The original resume text
+        extracted_details (dict): Output of extract_resume_details
+        job_role (str): The target job role
+        
+    Returns:
+        dict: The rewrite response with a fixed-up full_optimized_resume
+    """
+    full_resume = rewritten_sections.get('full_optimized_resume', '')
+
+    # Post-process to ensure all sections are present
+    lines = full_resume.split('\n')
+    fixed_lines = []
+    current_section = None
+    required_sections = REQUIRED_REWRITE_SECTIONS
+    section_content = {header: [] for header in required_sections}
+
+    for line in lines:
+        line = line.strip()
+        section = match_section(line)
+        if section:
+            # Sections outside the template (awards, publications) are kept after the required ones
+            current_section = SECTION_HEADERS[section]
+            section_content.setdefault(current_section, [])
+            fixed_lines.append(current_section)
+        elif line:
+            if current_section:
+                section_content[current_section].append(line)
+            fixed_lines.append(line)
+
+    # Ensure all required sections are present, using extracted details as fallback
+    for header in required_sections:
+        if not section_content[header]:
+            if header == '# NAME':
+                section_content[header] = [extracted_details['name']]
+            elif header == '# CONTACT':
+                section_content[header] = [extracted_details['contact']]
+            elif header == '# PROFESSIONAL SUMMARY':
+                section_content[header] = [f"Professional with experience relevant to {job_role}." if not extracted_details['summary'] else extracted_details['summary']]
+            elif header == '# SKILLS':
+                section_content[header] = [f"- {skill}" for skill in extracted_details['skills']] or [f"- {job_role}-specific skill"]
+            elif header == '# PROFESSIONAL EXPERIENCE':
+                section_content[header] = extracted_details['experience'] or [f"## {job_role}-related Role, Company (Recent)", f"- Contributed to {job_role} initiatives."]
+            elif header == '# EDUCATION':
+                section_content[header] = extracted_details['education'] or ["- Relevant Degree, University, Year"]
+            elif header == '# CERTIFICATIONS':
+                section_content[header] = extracted_details['certifications'] or ["- None"]
+            elif header == '# PROJECTS':
+                section_content[header] = extracted_details['projects'] or ["- None"]
+            elif header == '# HOBBIES & INTERESTS':
+                section_content[header] = extracted_details['hobbies'] or ["- None"]
+            logger.warning(f"Section {header} missing in OpenAI output, using fallback content")
+
+    # Reconstruct the full resume
+    fixed_resume = []
+    extra_sections = [header for header in section_content if header not in required_sections]
+    for header in required_sections + extra_sections:
+        fixed_resume.append(header)
+        fixed_resume.extend(section_content[header])
+        fixed_resume.append('')
+
+    rewritten_sections['full_optimized_resume'] = '\n'.join(fixed_resume)
+
+    # Log differences to confirm changes
+    logger.debug("Diff between original and rewritten resume:\n%s",
+                 Lazy(lambda: list(difflib.ndiff(resume_text.splitlines(),
+                                                 rewritten_sections['full_optimized_resume'].splitlines()))))
+
+    logger.debug("Rewritten resume:\n%s", rewritten_sections['full_optimized_resume'])
+    return rewritten_sections
+
+def fallback_rewrite(resume_text, extracted_details, job_role):
+    """
+    Construct a resume from the extracted details when the rewrite call fails.
+    
+    Args:
+        resume_text (str): The original resume text
+        extracted_details (dict): Output of extract_resume_details
+        job_role (str): The target job role
+        
+    Returns:
+        dict: Rewrite response built from the original details
+    """
+    # Construct a resume using extracted details instead of generic fallback
+    full_resume = [
+        "# NAME",
+        extracted_details['name'],
+        "",
+        "# CONTACT",
+        extracted_details['contact'],
+        "",
+        "# PROFESSIONAL SUMMARY",
+        extracted_details['summary'] or f"Professional with experience relevant to {job_role}.",
+        "",
+        "# SKILLS"
+    ]
+    full_resume.extend([f"- {skill}" for skill in extracted_details['skills']] or [f"- {job_role}-specific skill"])
+    full_resume.extend(["", "# PROFESSIONAL EXPERIENCE"])
+    full_resume.extend(extracted_details['experience'] or [f"## {job_role}-related Role, Company (Recent)", f"- Contributed to {job_role} initiatives."])
+    full_resume.extend(["", "# EDUCATION"])
+    full_resume.extend(extracted_details['education'] or ["- Relevant Degree, University, Year"])
+    full_resume.extend(["", "# CERTIFICATIONS"])
+    full_resume.extend(extracted_details['certifications'] or ["- None"])
+    full_resume.extend(["", "# PROJECTS"])
+    full_resume.extend(extracted_details['projects'] or ["- None"])
+    full_resume.extend(["", "# HOBBIES & INTERESTS"])
+    full_resume.extend(extracted_details['hobbies'] or ["- None"])
+
+    return {
+        "full_optimized_resume": "\n".join(full_resume),
+        "improvements_made": [{"section": "all", "original": resume_text, "improved": "extracted details", "reason": "Error occurred during OpenAI call", "impact": "Uses original details to ensure a valid resume"}]
+    }
+
+def rewrite_resume_sections(resume_text, analysis_results, job_role, document=None):
+    """
+    Rewrite resume sections to be more impactful and aligned with the target job.
+    
+    Args:
+        resume_text (str): The original resume text
+        analysis_results (dict): Analysis results from analyze_resume
+        job_role (str): The target job role
+        document (ResumeDocument): The parsed resume, so its details are not extracted again
+        
+    Returns:
+        dict: Rewritten sections and full optimized resume
+    """
+    # Extract details from the original resume unless the caller already has them
+    extracted_details = document.details if document is not None else extract_resume_details(resume_text)
+    prompt = build_rewrite_prompt(resume_text, analysis_results, job_role, extracted_details)
     
     try:
-        response = openai.chat.completions.create(
+        content = cached_chat_completion(
+            REWRITE_SYSTEM_PROMPT,
+            prompt,
+            response_format={"type": "json_object"},
+            stage="rewrite"
+        )
+        rewritten_sections = json.loads(content)
+        return postprocess_rewrite(rewritten_sections, resume_text, extracted_details, job_role)
+    except Exception as e:
+        logger.error(f"Error rewriting resume sections: {e}")
+        return fallback_rewrite(resume_text, extracted_details, job_role)
+
+def split_completed_sections(markdown_text, final=False):
+    """
+    Split (possibly partial) markdown resume text into top-level sections.
+    
+    A section counts as complete once the next '# ' header has started, so a
+    partially streamed resume only yields the blocks that can no longer change.
+    
+    Args:
+        markdown_text (str): Markdown resume text, possibly truncated
+        final (bool): Whether the text is complete, so the last block counts too
+        
+    Returns:
+        list: (header, body) tuples in document order
+    """
+    sections = []
+    header = None
+    body = []
+    for line in markdown_text.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith('# '):
+            if header:
+                sections.append((header, '\n'.join(body).strip()))
+            header = stripped
+            body = []
+        elif header:
+            body.append(line)
+    if final and header:
+        sections.append((header, '\n'.join(body).strip()))
+    return sections
+
+def rewrite_resume_sections_streaming(resume_text, analysis_results, job_role, on_section=None, document=None):
+    """
+    Rewrite the resume like rewrite_resume_sections, but consume the completion
+    as a token stream and report each markdown section as soon as it is complete.
+    
+    Args:
+        resume_text (str): The original resume text
+        analysis_results (dict): Analysis results from analyze_resume
+        job_role (str): The target job role
+        on_section (callable): Called with (header, body) for each completed section
+        document (ResumeDocument): The parsed resume, so its details are not extracted again
+        
+    Returns:
+        dict: Rewritten sections and full optimized resume
+    """
+    extracted_details = document.details if document is not None else extract_resume_details(resume_text)
+    prompt = build_rewrite_prompt(resume_text, analysis_results, job_role, extracted_details)
+    response_format = {"type": "json_object"}
+    key = make_cache_key("gpt-4o", REWRITE_SYSTEM_PROMPT, prompt, response_format)
+    # Headers already reported, by name: postprocessing may add, reorder or rename sections
+    emitted = set()
+    led = False
+    start = time.perf_counter()
+
+    def emit(sections):
+        for header, body in sections:
+            name = header.lstrip('# ').strip().upper()
+            if name not in emitted:
+                emitted.add(name)
+                on_section(header, body)
+
+    def stream_rewrite():
+        nonlocal led
+        led = True
+        cached = llm_cache.get(key, count=False)
+        if cached is not None:
+            llm_metrics.record_call("rewrite", time.perf_counter() - start, cache="hit")
+            return cached
+        chunks = []
+        header_pending = False
+        stream = create_chat_completion(
+            stage="rewrite",
             model="gpt-4o",
             messages=[
-                {"role": "system", "content": "You are an expert resume writer who creates impactful, achievement-oriented content optimized for both ATS and human readers. You strictly follow the provided markdown template, using exact header names and formats. You ensure all sections are present and populated with relevant, job-specific content, avoiding generic phrases like 'Relevant Skill 1' or 'Unknown Role'. You infer plausible details if specific information is missing, based on the job role and extracted details."},
+                {"role": "system", "content": REWRITE_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            response_format={"type": "json_object"}
+            response_format=response_format,
+            stream=True
         )
-        
-        rewritten_sections = json.loads(response.choices[0].message.content)
-        full_resume = rewritten_sections.get('full_optimized_resume', '')
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            chunks.append(delta)
+            # A new header is the only thing that can complete a section. Parse
+            # once per header, as soon as text follows its '#' marker
+            if on_section is None:
+                continue
+            header_pending = header_pending or '#' in delta
+            if not header_pending:
+                continue
+            streamed = ''.join(chunks)
+            if not streamed[streamed.rfind('#') + 1:].strip():
+                continue
+            header_pending = False
+            try:
+                partial = jiter.from_json(streamed.encode('utf-8'), partial_mode='trailing-strings')
+            except ValueError:
+                continue
+            if isinstance(partial, dict):
+                emit(split_completed_sections(partial.get('full_optimized_resume', '')))
+        content = ''.join(chunks)
+        json.loads(content)
+        llm_cache.set(key, content)
+        return content
 
-        # Post-process to ensure all sections are present
-        lines = full_resume.split('\n')
-        fixed_lines = []
-        current_section = None
-        required_sections = ['# NAME', '# CONTACT', '# PROFESSIONAL SUMMARY', '# SKILLS', 
-                            '# PROFESSIONAL EXPERIENCE', '# EDUCATION', '# CERTIFICATIONS', 
-                            '# PROJECTS', '# HOBBIES & INTERESTS']
-        section_content = {header: [] for header in required_sections}
-
-        for line in lines:
-            line = line.strip()
-            matched_header = None
-            for header in required_sections:
-                if re.match(rf'^{header}$', line, re.IGNORECASE):
-                    matched_header = header
-                    break
-            if matched_header:
-                current_section = matched_header
-                fixed_lines.append(matched_header)
-            elif line:
-                if current_section:
-                    section_content[current_section].append(line)
-                fixed_lines.append(line)
-
-        # Ensure all required sections are present, using extracted details as fallback
-        for header in required_sections:
-            if not section_content[header]:
-                if header == '# NAME':
-                    section_content[header] = [extracted_details['name']]
-                elif header == '# CONTACT':
-                    section_content[header] = [extracted_details['contact']]
-                elif header == '# PROFESSIONAL SUMMARY':
-                    section_content[header] = [f"Professional with experience relevant to {job_role}." if not extracted_details['summary'] else extracted_details['summary']]
-                elif header == '# SKILLS':
-                    section_content[header] = [f"- {skill}" for skill in extracted_details['skills']] or [f"- {job_role}-specific skill"]
-                elif header == '# PROFESSIONAL EXPERIENCE':
-                    section_content[header] = extracted_details['experience'] or [f"## {job_role}-related Role, Company (Recent)", f"- Contributed to {job_role} initiatives."]
-                elif header == '# EDUCATION':
-                    section_content[header] = extracted_details['education'] or ["- Relevant Degree, University, Year"]
-                elif header == '# CERTIFICATIONS':
-                    section_content[header] = extracted_details['certifications'] or ["- None"]
-                elif header == '# PROJECTS':
-                    section_content[header] = extracted_details['projects'] or ["- None"]
-                elif header == '# HOBBIES & INTERESTS':
-                    section_content[header] = extracted_details['hobbies'] or ["- None"]
-                logging.warning(f"Section {header} missing in OpenAI output, using fallback content")
-
-        # Reconstruct the full resume
-        fixed_resume = []
-        for header in required_sections:
-            fixed_resume.append(header)
-            fixed_resume.extend(section_content[header])
-            fixed_resume.append('')
-
-        rewritten_sections['full_optimized_resume'] = '\n'.join(fixed_resume)
-
-        # Log differences to confirm changes
-        diff = list(difflib.ndiff(resume_text.splitlines(), rewritten_sections['full_optimized_resume'].splitlines()))
-        logging.debug(f"Diff between original and rewritten resume:\n{diff}")
-
-        logging.debug(f"Rewritten resume:\n{rewritten_sections['full_optimized_resume']}")
-        return rewritten_sections
+    try:
+        content = llm_cache.get(key)
+        if content is None:
+            # Callers that join an in-flight stream get every section at the end
+            content = llm_singleflight.do(key, stream_rewrite)
+            if not led:
+                llm_metrics.record_call("rewrite", time.perf_counter() - start, cache="coalesced")
+        else:
+            logger.debug(f"LLM cache hit for {key[:12]}")
+            llm_metrics.record_call("rewrite", time.perf_counter() - start, cache="hit")
+        rewritten_sections = json.loads(content)
+        result = postprocess_rewrite(rewritten_sections, resume_text, extracted_details, job_role)
     except Exception as e:
-        logging.error(f"Error rewriting resume sections: {e}")
-        # Construct a resume using extracted details instead of generic fallback
-        full_resume = [
-            "# NAME",
-            extracted_details['name'],
-            "",
-            "# CONTACT",
-            extracted_details['contact'],
-            "",
-            "# PROFESSIONAL SUMMARY",
-            extracted_details['summary'] or f"Professional with experience relevant to {job_role}.",
-            "",
-            "# SKILLS"
-        ]
-        full_resume.extend([f"- {skill}" for skill in extracted_details['skills']] or [f"- {job_role}-specific skill"])
-        full_resume.extend(["", "# PROFESSIONAL EXPERIENCE"])
-        full_resume.extend(extracted_details['experience'] or [f"## {job_role}-related Role, Company (Recent)", f"- Contributed to {job_role} initiatives."])
-        full_resume.extend(["", "# EDUCATION"])
-        full_resume.extend(extracted_details['education'] or ["- Relevant Degree, University, Year"])
-        full_resume.extend(["", "# CERTIFICATIONS"])
-        full_resume.extend(extracted_details['certifications'] or ["- None"])
-        full_resume.extend(["", "# PROJECTS"])
-        full_resume.extend(extracted_details['projects'] or ["- None"])
-        full_resume.extend(["", "# HOBBIES & INTERESTS"])
-        full_resume.extend(extracted_details['hobbies'] or ["- None"])
-
-        return {
-            "full_optimized_resume": "\n".join(full_resume),
-            "improvements_made": [{"section": "all", "original": resume_text, "improved": "extracted details", "reason": "Error occurred during OpenAI call", "impact": "Uses original details to ensure a valid resume"}]
-        }
+        logger.error(f"Error streaming resume rewrite: {e}")
+        result = fallback_rewrite(resume_text, extracted_details, job_role)
+
+    if on_section is not None:
+        emit(split_completed_sections(result['full_optimized_resume'], final=True))
+    return result
@@ -1,10 +1,14 @@
-import os
 import json
-from openai import OpenAI
+import logging
 
-# Initialize OpenAI client
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-openai = OpenAI(api_key=OPENAI_API_KEY)
+from llm_cache import make_cache_key
+from singleflight import llm_singleflight
+from openai_client import create_chat_completion
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
 
 def generate_optimized_resume(resume_text, job_role, analysis_results, rewritten_sections):
     """
@@ -44,18 +48,25 @@ def generate_optimized_resume(resume_text, job_role, analysis_results, rewritten
     """
     
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an expert resume writer who creates professional, ATS-friendly resumes."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        system_prompt = "You are an expert resume writer who creates professional, ATS-friendly resumes."
+        
+        def fetch():
+            response = create_chat_completion(
+                stage="generate",
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            return response.choices[0].message.content
         
-        optimized_resume = response.choices[0].message.content
+        # Concurrent identical requests share one in-flight call
+        key = make_cache_key("gpt-4o", system_prompt, prompt)
+        optimized_resume = llm_singleflight.do(key, fetch)
         return optimized_resume
     except Exception as e:
-        print(f"Error generating optimized resume: {e}")
+        logger.error(f"Error generating optimized resume: {e}", exc_info=True)
         
         # If there's an error, use the original text as fallback
         return resume_text
@@ -0,0 +1,62 @@
+# resume_model.py
+from section_grammar import tokenize_sections
+from resume_analyzer import details_from_sections, extract_resume_details
+from pdf_utils import markdown_sections
+
+
+class ResumeDocument:
+    """
+    A resume with the derived views each pipeline stage needs computed on
+    first use and then reused: the details dict for analysis and rewriting,
+    and the section dict for rendering.
+
+    Only the text and the views actually used are kept. Each view tokenizes
+    the text in one pass when it is built, so a document that is only
+    analyzed never holds the render view, and neither holds the tokens.
+
+    Build one for the uploaded resume and one for the optimized resume per
+    run and pass them along instead of re-parsing the text in every stage.
+    """
+
+    __slots__ = ("text", "layout_blocks", "_details", "_render_sections")
+
+    def __init__(self, text, layout_blocks=None, details=None):
+        self.text = text
+        self.layout_blocks = layout_blocks
+        self._details = details
+        self._render_sections = None
+
+    @classmethod
+    def parse(cls, text, layout_blocks=None, details=None):
+        """
+        Wrap resume text or markdown; its views are built on first use.
+
+        Args:
+            text (str): Resume text or markdown
+            layout_blocks (list): Optional LayoutBlock objects for the same document
+            details (dict): Details already extracted for this text (e.g. from the extraction cache)
+
+        Returns:
+            ResumeDocument: The document
+        """
+        return cls(text, layout_blocks, details)
+
+    def _sections(self):
+        return ((key, lines) for key, _, lines in tokenize_sections(self.text))
+
+    @property
+    def details(self):
+        """The extract_resume_details view, built once."""
+        if self._details is None:
+            if self.layout_blocks:
+                self._details = extract_resume_details(self.text, self.layout_blocks)
+            else:
+                self._details = details_from_sections(self._sections())
+        return self._details
+
+    @property
+    def render_sections(self):
+        """The parse_markdown_resume view used by the PDF and DOCX renderers, built once."""
+        if self._render_sections is None:
+            self._render_sections = markdown_sections(self._sections())
+        return self._render_sections
@@ -0,0 +1,92 @@
+# section_grammar.py
+import re
+
+# Section key -> header spellings, longest first. Every resume parser in the
+# app resolves headers through this table, so they agree on boundaries.
+SECTION_ALIASES = [
+    ("name", [r"name"]),
+    ("contact", [r"personal information", r"contact", r"info"]),
+    ("summary", [r"professional summary", r"summary", r"objective"]),
+    ("skills", [r"technical skills", r"key skills", r"skills"]),
+    ("experience", [r"professional experience", r"work experience", r"experience"]),
+    ("education", [r"academic background", r"education"]),
+    ("certifications", [r"certifications", r"certificates"]),
+    ("projects", [r"projects", r"portfolio"]),
+    ("hobbies", [r"hobbies\s*&\s*interests", r"hobbies", r"interests"]),
+    ("awards", [r"awards"]),
+    ("publications", [r"publications"])
+]
+
+# Line prefixes the parsers treat as list bullets
+BULLET_MARKERS = ('-', '•', '*')
+
+# Markdown header the rewrite template uses for each section
+SECTION_HEADERS = {
+    "name": "# NAME",
+    "contact": "# CONTACT",
+    "summary": "# PROFESSIONAL SUMMARY",
+    "skills": "# SKILLS",
+    "experience": "# PROFESSIONAL EXPERIENCE",
+    "education": "# EDUCATION",
+    "certifications": "# CERTIFICATIONS",
+    "projects": "# PROJECTS",
+    "hobbies": "# HOBBIES & INTERESTS",
+    "awards": "# AWARDS",
+    "publications": "# PUBLICATIONS"
+}
+
+# One alternation with a named group per section: an optional markdown '#'
+# prefix, the header, an optional colon, and nothing else on the line.
+# MULTILINE lets the same pattern scan a whole document with finditer.
+SECTION_PATTERN = re.compile(
+    r'^[ \t]*(?:#{1,6}[ \t]*)?(?:'
+    + '|'.join(f"(?P<{key}>{'|'.join(aliases)})" for key, aliases in SECTION_ALIASES)
+    + r')[ \t]*:?[ \t]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def match_section(line):
+    """
+    Return the section key a line opens, or None for an ordinary line.
+
+    Args:
+        line (str): One line of resume text or markdown
+
+    Returns:
+        str: Section key such as "experience", or None
+    """
+    match = SECTION_PATTERN.match(line)
+    return match.lastgroup if match else None
+
+
+def count_section_headers(text):
+    """Count the section header lines in a whole document in one scan."""
+    return sum(1 for _ in SECTION_PATTERN.finditer(text))
+
+
+def tokenize_sections(text):
+    """
+    Split text into sections in a single pass.
+
+    Args:
+        text (str): Resume text or markdown
+
+    Yields:
+        tuple: (section key, header line, stripped body lines). Lines before
+            the first header come first with key and header None.
+    """
+    key = None
+    header = None
+    body = []
+    for line in text.split('\n'):
+        line = line.strip()
+        section = match_section(line)
+        if section is None:
+            body.append(line)
+            continue
+        if key is not None or body:
+            yield key, header, body
+        key, header, body = section, line, []
+    if key is not None or body:
+        yield key, header, body
@@ -0,0 +1,294 @@
+# section_rewriter.py
+import os
+import json
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from resume_analyzer import (
+    cached_chat_completion, extract_resume_details, postprocess_rewrite, fallback_rewrite,
+    split_completed_sections, REQUIRED_REWRITE_SECTIONS
+)
+from section_grammar import BULLET_MARKERS
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+SECTION_REWRITE_WORKERS = int(os.environ.get("SECTION_REWRITE_WORKERS", "8"))
+
+SECTION_SYSTEM_PROMPT = "You are an expert resume writer who rewrites one resume section at a time into impactful, achievement-oriented content optimized for both ATS and human readers. You only use facts present in the section you are given and answer in the requested JSON format."
+
+# Details key -> markdown header for the list-style sections
+LIST_SECTIONS = [
+    ('skills', '# SKILLS'),
+    ('education', '# EDUCATION'),
+    ('certifications', '# CERTIFICATIONS'),
+    ('projects', '# PROJECTS'),
+    ('hobbies', '# HOBBIES & INTERESTS')
+]
+
+
+def strip_bullet(line):
+    """Remove a leading bullet marker from a line."""
+    return line.lstrip(''.join(BULLET_MARKERS) + ' ').strip()
+
+
+def split_experience_entries(experience_lines):
+    """
+    Group experience lines into entries: a non-bullet line starts a new entry
+    and the bullet lines after it belong to that entry.
+
+    Args:
+        experience_lines (list): Experience lines from extract_resume_details
+
+    Returns:
+        list: (title, bullets) tuples
+    """
+    entries = []
+    for line in experience_lines:
+        if line.startswith(BULLET_MARKERS) and entries:
+            entries[-1][1].append(strip_bullet(line))
+        elif line.startswith(BULLET_MARKERS):
+            entries.append(("", [strip_bullet(line)]))
+        else:
+            entries.append((line.lstrip('#').strip(), []))
+    return entries
+
+
+def keyword_hint(analysis_results):
+    """Return the missing keywords from the analysis as a short comma list."""
+    keywords = [item.get('keyword') for item in analysis_results.get('missing_keywords', [])
+                if isinstance(item, dict) and item.get('keyword')]
+    return ', '.join(keywords) if keywords else 'None'
+
+
+def build_section_tasks(extracted_details, analysis_results, job_role):
+    """
+    Build one small rewrite task per resume section.
+
+    Args:
+        extracted_details (dict): Output of extract_resume_details
+        analysis_results (dict): Analysis results from analyze_resume
+        job_role (str): The target job role
+
+    Returns:
+        list: (task_id, prompt) tuples; task ids are 'summary', 'experience:<n>' or a details key
+    """
+    keywords = keyword_hint(analysis_results)
+    tasks = []
+
+    context = ', '.join(extracted_details['skills'][:15]) or 'None'
+    tasks.append(("summary", f"""Write a concise, impactful professional summary (2-3 sentences) for a {job_role} position.
+Current summary: {extracted_details['summary'] or 'None'}
+Skills: {context}
+Keywords worth including if truthful: {keywords}
+
+Return JSON: {{"summary": "..."}}
+"""))
+
+    for index, (title, bullets) in enumerate(split_experience_entries(extracted_details['experience'])):
+        bullet_text = '\n'.join(f"- {bullet}" for bullet in bullets) or 'None'
+        tasks.append((f"experience:{index}", f"""Rewrite this work experience entry for a {job_role} position. Keep the job title, company and dates; rewrite the bullets to be achievement-oriented and quantified where the facts allow.
+Entry: {title or 'Unknown'}
+Bullets:
+{bullet_text}
+Keywords worth including if truthful: {keywords}
+
+Return JSON: {{"title": "Job Title, Company (Dates)", "bullets": ["...", "..."]}}
+"""))
+
+    for key, header in LIST_SECTIONS:
+        items = extracted_details[key]
+        if not items:
+            continue
+        item_text = '\n'.join(f"- {strip_bullet(item)}" for item in items)
+        tasks.append((key, f"""Rewrite the {header.lstrip('# ').title()} section of a resume for a {job_role} position as a clean bullet list. Merge duplicates and tighten the wording.
+{item_text}
+Keywords worth including if truthful: {keywords}
+
+Return JSON: {{"items": ["...", "..."]}}
+"""))
+    return tasks
+
+
+def rewrite_section(task_id, prompt):
+    """
+    Rewrite one section through the shared LLM cache, so unchanged sections
+    are served by content hash on later runs.
+
+    Returns:
+        dict: Parsed JSON response for the section
+    """
+    content = cached_chat_completion(SECTION_SYSTEM_PROMPT, prompt, response_format={"type": "json_object"},
+                                     stage="rewrite_section")
+    result = json.loads(content)
+    if not isinstance(result, dict):
+        raise ValueError(f"Unexpected response for section {task_id}")
+    return result
+
+
+def task_header(task_id):
+    """Return the markdown header of the section a task belongs to."""
+    if task_id == "summary":
+        return '# PROFESSIONAL SUMMARY'
+    if task_id.startswith("experience:"):
+        return '# PROFESSIONAL EXPERIENCE'
+    return dict(LIST_SECTIONS)[task_id]
+
+
+def section_markdown(task_id, result):
+    """Render one rewritten section result as markdown lines."""
+    if task_id == "summary":
+        return [result.get("summary", "").strip()] if result.get("summary") else []
+    if task_id.startswith("experience:"):
+        lines = [f"## {result.get('title', '').strip()}"] if result.get('title') else []
+        lines.extend(f"- {strip_bullet(bullet)}" for bullet in result.get("bullets", []) if bullet)
+        return lines
+    return [f"- {strip_bullet(item)}" for item in result.get("items", []) if item]
+
+
+def original_section_lines(task_id, extracted_details):
+    """
+    Render a section's original content as markdown lines, used in place of
+    a rewrite that failed so the resume never loses an entry.
+
+    Args:
+        task_id (str): 'summary', 'experience:<n>' or a details key
+        extracted_details (dict): Output of extract_resume_details
+
+    Returns:
+        list: Markdown lines
+    """
+    if task_id == "summary":
+        return [extracted_details['summary'].strip()] if extracted_details['summary'] else []
+    if task_id.startswith("experience:"):
+        title, bullets = split_experience_entries(extracted_details['experience'])[int(task_id.split(':')[1])]
+        return ([f"## {title}"] if title else []) + [f"- {bullet}" for bullet in bullets if bullet]
+    return [f"- {strip_bullet(item)}" for item in extracted_details[task_id] if strip_bullet(item)]
+
+
+def experience_lines(section_lines):
+    """Join the rewritten experience entries, in resume order, into the PROFESSIONAL EXPERIENCE body."""
+    experience_ids = sorted((task_id for task_id in section_lines if task_id.startswith("experience:")),
+                            key=lambda task_id: int(task_id.split(':')[1]))
+    lines = []
+    for task_id in experience_ids:
+        if lines:
+            lines.append('')
+        lines.extend(section_lines[task_id])
+    return lines
+
+
+def assemble_resume(extracted_details, section_lines):
+    """
+    Reassemble rewritten sections into the markdown template used by
+    rewrite_resume_sections and parse_markdown_resume.
+
+    Args:
+        extracted_details (dict): Output of extract_resume_details
+        section_lines (dict): Task id -> markdown lines
+
+    Returns:
+        str: Full markdown resume
+    """
+    content = {
+        '# NAME': [extracted_details['name']],
+        '# CONTACT': [extracted_details['contact']],
+        '# PROFESSIONAL SUMMARY': section_lines.get("summary", []),
+        '# PROFESSIONAL EXPERIENCE': experience_lines(section_lines)
+    }
+    for key, header in LIST_SECTIONS:
+        content[header] = section_lines.get(key, [])
+
+    resume = []
+    for header in REQUIRED_REWRITE_SECTIONS:
+        resume.append(header)
+        resume.extend(content.get(header, []))
+        resume.append('')
+    return '\n'.join(resume)
+
+
+def rewrite_resume_sections_parallel(resume_text, analysis_results, job_role, on_section=None,
+                                     max_workers=SECTION_REWRITE_WORKERS, document=None):
+    """
+    Rewrite the resume section by section with small parallel prompts.
+
+    Wall time tracks the largest section instead of the whole document, and
+    each section is cached independently. The output matches
+    rewrite_resume_sections.
+
+    Args:
+        resume_text (str): The original resume text
+        analysis_results (dict): Analysis results from analyze_resume
+        job_role (str): The target job role
+        on_section (callable): Called once per section with (header, body) in the calling
+            thread: as sections finish, PROFESSIONAL EXPERIENCE once all its entries
+            are done, and anything postprocessing added at the end
+        max_workers (int): Maximum concurrent section rewrites
+        document (ResumeDocument): The parsed resume, so its details are not extracted again
+
+    Returns:
+        dict: Rewritten sections and full optimized resume
+    """
+    extracted_details = document.details if document is not None else extract_resume_details(resume_text)
+    tasks = build_section_tasks(extracted_details, analysis_results, job_role)
+    section_lines = {}
+    improvements = []
+    experience_pending = sum(1 for task_id, _ in tasks if task_id.startswith("experience:"))
+    # Headers already reported, by name: postprocessing may add, reorder or rename sections
+    emitted = set()
+
+    def emit(sections):
+        for header, body in sections:
+            name = header.lstrip('# ').strip().upper()
+            if name not in emitted:
+                emitted.add(name)
+                on_section(header, body)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+            # Each task runs in a copy of our context so its LLM calls count towards this run
+            futures = {
+                executor.submit(contextvars.copy_context().run, rewrite_section, task_id, prompt): task_id
+                for task_id, prompt in tasks
+            }
+            for future in as_completed(futures):
+                task_id = futures[future]
+                try:
+                    lines = section_markdown(task_id, future.result())
+                    if not lines:
+                        raise ValueError("empty rewrite")
+                except Exception as e:
+                    logger.error(f"Error rewriting section {task_id}, keeping the original: {e}")
+                    lines = original_section_lines(task_id, extracted_details)
+                else:
+                    improvements.append({
+                        "section": task_id,
+                        "original": '\n'.join(original_section_lines(task_id, extracted_details)),
+                        "improved": '\n'.join(lines),
+                        "reason": "Section rewritten for the target role",
+                        "impact": "Clearer, achievement-oriented wording"
+                    })
+                section_lines[task_id] = lines
+                if on_section is None:
+                    continue
+                if not task_id.startswith("experience:"):
+                    emit([(task_header(task_id), '\n'.join(lines))])
+                    continue
+                experience_pending -= 1
+                if not experience_pending:
+                    emit([('# PROFESSIONAL EXPERIENCE', '\n'.join(experience_lines(section_lines)))])
+        rewritten_sections = {
+            "full_optimized_resume": assemble_resume(extracted_details, section_lines),
+            "improvements_made": improvements
+        }
+        result = postprocess_rewrite(rewritten_sections, resume_text, extracted_details, job_role)
+    except Exception as e:
+        logger.error(f"Error rewriting resume sections in parallel: {e}")
+        result = fallback_rewrite(resume_text, extracted_details, job_role)
+
+    if on_section is not None:
+        emit(split_completed_sections(result['full_optimized_resume'], final=True))
+    return result
@@ -0,0 +1,346 @@
+# session_store.py
+import os
+import time
+import zlib
+import atexit
+import pickle
+import itertools
+import shutil
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+from log_config import setup_logging
+
+# Set up logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Memory all sessions' artifacts may use together before the least recently used spill to disk
+SESSION_MEMORY_BUDGET_MB = int(os.environ.get("SESSION_MEMORY_BUDGET_MB", "256"))
+# Spill directory; empty uses a private temporary directory removed at exit
+SESSION_SPILL_DIR = os.environ.get("SESSION_SPILL_DIR", "")
+SESSION_SPILL_MAX_MB = int(os.environ.get("SESSION_SPILL_MAX_MB", "1024"))
+# Artifacts of sessions untouched this long are dropped
+SESSION_ARTIFACT_TTL_SECONDS = int(os.environ.get("SESSION_ARTIFACT_TTL_SECONDS", str(4 * 3600)))
+# Serialized artifacts at least this large are compressed
+SESSION_COMPRESS_MIN_BYTES = 1024
+SWEEP_INTERVAL_SECONDS = 60
+
+
+class _Artifact:
+    __slots__ = ("blob", "size", "stored", "compressed", "path", "spilling")
+
+    def __init__(self, blob, size, compressed):
+        self.blob = blob
+        self.size = size
+        self.stored = len(blob)
+        self.compressed = compressed
+        self.path = None
+        # Counted against the disk tier while its blob is being written out
+        self.spilling = False
+
+
+class SessionArtifactStore:
+    """
+    Per-session artifacts (resume text, analysis, rewritten resume, ...) kept
+    out of st.session_state and under one memory budget for the process.
+
+    Artifacts are pickled, and compressed when large. Once the budget is
+    exceeded the least recently used ones are written to the spill directory
+    and read back on their next access; the spill directory is itself an LRU
+    bounded by max_disk_bytes. Victims are picked and the budgets updated
+    under the lock, but files are written, read and removed outside it, so a
+    slow disk only stalls the session that touches it.
+    """
+
+    def __init__(self, max_memory_bytes, spill_dir=SESSION_SPILL_DIR, max_disk_bytes=SESSION_SPILL_MAX_MB * 1024 * 1024,
+                 ttl_seconds=SESSION_ARTIFACT_TTL_SECONDS):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self._spill_dir = spill_dir
+        self._spill_dir_lock = threading.Lock()
+        self._spill_ids = itertools.count()
+        self._entries = OrderedDict()
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._last_sweep = time.time()
+        self.spills = 0
+        self.rehydrations = 0
+        self.evictions = 0
+        self.spill_failures = 0
+        self.last_spill_error = None
+
+    def _spill_path(self, key):
+        with self._spill_dir_lock:
+            if not self._spill_dir:
+                self._spill_dir = tempfile.mkdtemp(prefix="resume_sessions_")
+                atexit.register(shutil.rmtree, self._spill_dir, True)
+        session_id, name = key
+        session_dir = os.path.join(self._spill_dir, session_id)
+        os.makedirs(session_dir, exist_ok=True)
+        # Unique per spill, so removing a replaced artifact's file never hits its successor's
+        return os.path.join(session_dir, f"{name}.{next(self._spill_ids)}.bin")
+
+    def put(self, session_id, name, value):
+        """
+        Store an artifact for a session, replacing any previous value.
+
+        Args:
+            session_id (str): Session the artifact belongs to
+            name (str): Artifact name, e.g. "resume_text"
+            value: Any picklable value
+        """
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        size = len(data)
+        compressed = False
+        if size >= SESSION_COMPRESS_MIN_BYTES:
+            packed = zlib.compress(data, 1)
+            if len(packed) < size:
+                data, compressed = packed, True
+        key = (session_id, name)
+        with self._lock:
+            removals = self._drop(key)
+            artifact = _Artifact(data, size, compressed)
+            self._entries[key] = artifact
+            self._memory_bytes += artifact.stored
+            self._touch(session_id)
+            spills, evicted = self._enforce_budget(keep=key)
+            removals.extend(evicted)
+            removals.extend(self._sweep())
+        self._write_spills(spills)
+        self._remove_files(removals)
+
+    def get(self, session_id, name, default=None):
+        """Return an artifact, reading it back from disk if it was spilled."""
+        key = (session_id, name)
+        with self._lock:
+            artifact = self._entries.get(key)
+            if artifact is None:
+                return default
+            self._entries.move_to_end(key)
+            self._touch(session_id)
+            blob, compressed, path = artifact.blob, artifact.compressed, artifact.path
+        if blob is None:
+            blob = self._rehydrate(key, artifact, path)
+            if blob is None:
+                return default
+        return pickle.loads(zlib.decompress(blob) if compressed else blob)
+
+    def contains(self, session_id, name):
+        """Return whether an artifact is stored, without reading it."""
+        with self._lock:
+            return (session_id, name) in self._entries
+
+    def drop_session(self, session_id):
+        """Forget every artifact of a session, in memory and on disk."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                self._drop(key)
+            self._sessions.pop(session_id, None)
+            spill_dir = self._spill_dir
+        if spill_dir:
+            shutil.rmtree(os.path.join(spill_dir, session_id), ignore_errors=True)
+
+    def footprint(self, session_id):
+        """
+        Describe a session's artifacts.
+
+        Returns:
+            list: One dict per artifact with its pickled size, stored size and tier
+        """
+        with self._lock:
+            return [{"artifact": name, "bytes": artifact.size, "stored_bytes": artifact.stored,
+                     "compressed": artifact.compressed,
+                     "tier": "memory" if artifact.blob is not None and not artifact.spilling else "disk"}
+                    for (owner, name), artifact in self._entries.items() if owner == session_id]
+
+    def stats(self):
+        """Return tier sizes against their budgets and spill counters."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "artifacts": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                # Stays true while spills fail; the next put tries again
+                "over_budget": self._memory_bytes > self.max_memory_bytes,
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "spills": self.spills,
+                "spill_failures": self.spill_failures,
+                "last_spill_error": self.last_spill_error,
+                "rehydrations": self.rehydrations,
+                "evictions": self.evictions
+            }
+
+    def _touch(self, session_id):
+        self._sessions[session_id] = time.time()
+
+    def _drop(self, key):
+        """Forget an artifact; returns spill files to remove once the lock is released."""
+        artifact = self._entries.pop(key, None)
+        if artifact is None:
+            return []
+        if artifact.blob is not None and not artifact.spilling:
+            self._memory_bytes -= artifact.stored
+            return []
+        # A spill still being written is cleaned up by its writer
+        self._disk_bytes -= artifact.stored
+        return [artifact.path] if artifact.path else []
+
+    def _remove_files(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _enforce_budget(self, keep):
+        """
+        Pick least recently used artifacts to spill until memory fits the
+        budget, and evict the oldest spilled ones once the disk tier is full.
+
+        Returns:
+            tuple: (artifacts to write out as (key, artifact), files to remove)
+        """
+        spills = []
+        for key, artifact in self._entries.items():
+            if self._memory_bytes <= self.max_memory_bytes:
+                break
+            if key == keep or artifact.blob is None or artifact.spilling:
+                continue
+            artifact.spilling = True
+            self._memory_bytes -= artifact.stored
+            self._disk_bytes += artifact.stored
+            spills.append((key, artifact))
+        removals = []
+        for key in list(self._entries):
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            if self._entries[key].blob is None:
+                logger.warning(f"Evicting spilled session artifact {key[1]} to stay within the disk budget")
+                removals.extend(self._drop(key))
+                self.evictions += 1
+        return spills, removals
+
+    def _write_spills(self, spills):
+        """Write picked artifacts to disk and release their memory; runs without the lock."""
+        for position, (key, artifact) in enumerate(spills):
+            try:
+                path = self._spill_path(key)
+                with open(path, 'wb') as spill_file:
+                    spill_file.write(artifact.blob)
+            except OSError as e:
+                logger.warning(f"Could not spill session artifact {key[1]}, memory stays over budget: {e}")
+                with self._lock:
+                    # Keep this and the remaining picks in memory; the next put retries
+                    for pending_key, pending in spills[position:]:
+                        if self._entries.get(pending_key) is pending and pending.spilling:
+                            pending.spilling = False
+                            self._memory_bytes += pending.stored
+                            self._disk_bytes -= pending.stored
+                    self.spill_failures += 1
+                    self.last_spill_error = str(e)
+                return
+            with self._lock:
+                if self._entries.get(key) is artifact and artifact.spilling:
+                    artifact.spilling = False
+                    artifact.path = path
+                    artifact.blob = None
+                    self.spills += 1
+                    continue
+            # Dropped or replaced while it was being written
+            self._remove_files([path])
+
+    def _rehydrate(self, key, artifact, path):
+        """Read a spilled artifact back into memory; runs without the lock."""
+        try:
+            with open(path, 'rb') as spill_file:
+                data = spill_file.read()
+        except OSError as e:
+            data, error = None, e
+        with self._lock:
+            if artifact.blob is not None:
+                # Another reader brought it back first
+                return artifact.blob
+            if self._entries.get(key) is not artifact:
+                return data
+            retry_path = artifact.path if data is None and artifact.path != path else None
+            if data is None and retry_path is None:
+                logger.error(f"Lost spilled session artifact {key[1]}: {error}")
+                del self._entries[key]
+                self._disk_bytes -= artifact.stored
+                return None
+            if data is not None:
+                artifact.blob = data
+                artifact.path = None
+                self._disk_bytes -= artifact.stored
+                self._memory_bytes += artifact.stored
+                self.rehydrations += 1
+                spills, removals = self._enforce_budget(keep=key)
+        if retry_path is not None:
+            # Another reader read it back and it was spilled again while this read failed
+            return self._rehydrate(key, artifact, retry_path)
+        self._write_spills(spills)
+        self._remove_files(removals + [path])
+        return data
+
+    def _sweep(self):
+        """
+        Drop sessions idle for longer than the TTL (Streamlit does not say when one ends).
+
+        Returns:
+            list: Spill files to remove once the lock is released
+        """
+        now = time.time()
+        if self.ttl_seconds <= 0 or now - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+            return []
+        self._last_sweep = now
+        expired = {session_id for session_id, seen in self._sessions.items() if now - seen > self.ttl_seconds}
+        if not expired:
+            return []
+        removals = []
+        for key in [key for key in self._entries if key[0] in expired]:
+            removals.extend(self._drop(key))
+        for session_id in expired:
+            del self._sessions[session_id]
+        logger.info(f"Dropped artifacts of {len(expired)} idle sessions")
+        return removals
+
+    def session(self, session_id):
+        """Return a view of one session's artifacts."""
+        return SessionArtifacts(self, session_id)
+
+
+class SessionArtifacts:
+    """One session's view of the artifact store."""
+
+    __slots__ = ("store", "session_id")
+
+    def __init__(self, store, session_id):
+        self.store = store
+        self.session_id = session_id
+
+    def get(self, name, default=None):
+        return self.store.get(self.session_id, name, default)
+
+    def set(self, name, value):
+        self.store.put(self.session_id, name, value)
+
+    def has(self, name):
+        return self.store.contains(self.session_id, name)
+
+    def clear(self):
+        self.store.drop_session(self.session_id)
+
+    def footprint(self):
+        return self.store.footprint(self.session_id)
+
+
+# Process-wide store shared by every Streamlit session
+session_artifacts = SessionArtifactStore(SESSION_MEMORY_BUDGET_MB * 1024 * 1024)
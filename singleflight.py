@@ -0,0 +1,81 @@
+# singleflight.py
+import threading
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the
+    function, later callers with the same key block until it finishes and
+    receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.deduplicated = 0
+
+    def do(self, key, fn):
+        """
+        Run fn once for all concurrent callers of key.
+
+        Args:
+            key (str): Identity of the call
+            fn (callable): Zero-argument function to run
+
+        Returns:
+            The result of fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.deduplicated += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self):
+        """Return how many calls ran and how many were served by another caller."""
+        with self._lock:
+            total = self.executed + self.deduplicated
+            return {
+                "executed": self.executed,
+                "deduplicated": self.deduplicated,
+                "dedup_rate": self.deduplicated / total if total else 0.0,
+                "in_flight": len(self._calls)
+            }
+
+
+# Process-wide group shared by every LLM call site
+llm_singleflight = SingleFlight()